@@ -1,11 +1,14 @@
 import streamlit as st
-from components.task_form import show_task_manager
+from components.task_form import show_task_manager, show_dependency_manager, show_task_import, show_task_archive
 from components.free_time_form import show_free_time_manager
 from components.scheduler import run_scheduler
 from components.backlog_form import show_backlog_manager
 from components.wizard import run_wizard
 from components.task_intake import show_task_intake_wizard  # Add this import
+from components.history import show_history_controls
+from components.dev_panel import show_dev_panel
 from utils.session_state import initialize_session_state
+from utils.instrumentation import rerun_metrics, DEV_PANEL_ENABLED, MEMORY_PROFILING_ENABLED
 
 def main():
     """Main entry point for the Task Scheduler application."""
@@ -22,30 +25,41 @@ def main():
     
     st.title("Dynamic Task Scheduler V8")
     
-    # Initialize session state
-    initialize_session_state()
-    
-    # Check if wizard mode is active
-    if st.session_state.wizard_mode:
-        run_wizard()
-    else:
-        # Create tabs for the main app interface with the new tab
-        tab1, tab2, tab3, tab4, tab5 = st.tabs(["Manage Tasks", "Manage Free Time", "Run Scheduler", "Idea Backlog", "New Task Intake"])
-        
-        with tab1:
-            show_task_manager()
+    # Time every rerun; the panel shows the one that just finished
+    with rerun_metrics('app') as metrics:
+        # Initialize session state
+        initialize_session_state()
         
-        with tab2:
-            show_free_time_manager()
+        # Undo and redo work in every mode
+        show_history_controls()
         
-        with tab3:
-            run_scheduler()
-        
-        with tab4:
-            show_backlog_manager()
+        # Check if wizard mode is active
+        if st.session_state.wizard_mode:
+            run_wizard()
+        else:
+            # Create tabs for the main app interface with the new tab
+            tab1, tab2, tab3, tab4, tab5 = st.tabs(["Manage Tasks", "Manage Free Time", "Run Scheduler", "Idea Backlog", "New Task Intake"])
+            
+            with tab1:
+                show_task_manager()
+                show_dependency_manager()
+                show_task_import()
+                show_task_archive()
             
-        with tab5:
-            show_task_intake_wizard()  # Add this new tab content
+            with tab2:
+                show_free_time_manager()
+            
+            with tab3:
+                run_scheduler()
+            
+            with tab4:
+                show_backlog_manager()
+                
+            with tab5:
+                show_task_intake_wizard()  # Add this new tab content
+    
+    if DEV_PANEL_ENABLED or MEMORY_PROFILING_ENABLED:
+        show_dev_panel(metrics)
 
 if __name__ == "__main__":
     main()
@@ -1,22 +1,23 @@
 import streamlit as st
 import pandas as pd
-from models.backlog import load_backlog, save_backlog, add_backlog_item, delete_backlog_item
-from models.task import add_task
+from models.backlog import (
+    add_backlog_item, delete_backlog_item, convert_backlog_item_to_task,
+    filter_backlog, get_backlog_filter_options, backlog_is_empty, search_backlog
+)
+from utils.instrumentation import instrumented
 
+@instrumented
 def show_backlog_manager():
     """
     Display and manage idea backlog in the Backlog tab.
     """
     st.header("Idea Backlog")
     
-    # Load backlog data
-    backlog_df = load_backlog()
-    
     # Initialize session state for backlog conversion
     if 'converting_item' not in st.session_state:
         st.session_state.converting_item = None
-    if 'converting_idx' not in st.session_state:
-        st.session_state.converting_idx = None
+    if 'converting_id' not in st.session_state:
+        st.session_state.converting_id = None
     
     # Add form for new backlog items
     with st.form("add_backlog_item"):
@@ -57,7 +58,7 @@ def show_backlog_manager():
     # Handle conversion of backlog items to tasks
     if st.session_state.converting_item is not None:
         item = st.session_state.converting_item
-        idx = st.session_state.converting_idx
+        item_id = st.session_state.converting_id
         
         st.subheader(f"Convert '{item['Idea']}' to Task")
         
@@ -86,7 +87,7 @@ def show_backlog_manager():
             
             if cancel:
                 st.session_state.converting_item = None
-                st.session_state.converting_idx = None
+                st.session_state.converting_id = None
                 st.rerun()
             
             if submit:
@@ -100,62 +101,72 @@ def show_backlog_manager():
                     'Complexity': complexity
                 }
                 
-                # Add to tasks
-                add_task(new_task)
-                
-                # Remove from backlog
-                delete_backlog_item(idx)
-                
-                st.success(f"Successfully converted '{task_name}' to a task!")
+                # Add to tasks and remove from backlog in one transaction
+                if convert_backlog_item_to_task(item_id, new_task) is None:
+                    st.warning(f"'{item['Idea']}' is no longer in the backlog.")
+                else:
+                    st.success(f"Successfully converted '{task_name}' to a task!")
                 st.session_state.converting_item = None
-                st.session_state.converting_idx = None
+                st.session_state.converting_id = None
                 st.rerun()
     
     # Display and manage existing backlog items
-    if not backlog_df.empty:
+    if not backlog_is_empty():
         st.subheader("Current Backlog")
         
+        search_text = st.text_input("Search ideas", placeholder="Search idea names and descriptions")
+        
         # Add filtering options
-        filter_col1, filter_col2 = st.columns(2)
+        category_options, status_options = get_backlog_filter_options()
+        filter_col1, filter_col2, filter_col3 = st.columns(3)
         with filter_col1:
             filter_category = st.multiselect(
                 "Filter by Category",
-                options=backlog_df['Category'].unique()
+                options=category_options
             )
         with filter_col2:
             filter_status = st.multiselect(
                 "Filter by Status",
-                options=backlog_df['Status'].unique()
+                options=status_options
             )
+        with filter_col3:
+            filter_dates = st.date_input("Created between", value=())
         
-        # Apply filters
-        filtered_df = backlog_df
-        if filter_category:
-            filtered_df = filtered_df[filtered_df['Category'].isin(filter_category)]
-        if filter_status:
-            filtered_df = filtered_df[filtered_df['Status'].isin(filter_status)]
+        # Apply search or filters in the database
+        if search_text.strip():
+            filtered_df = search_backlog(search_text, limit=50)
+            if filtered_df.empty:
+                st.info(f"No ideas match '{search_text}'.")
+        else:
+            start_date, end_date = (filter_dates if len(filter_dates) == 2 else (None, None))
+            filtered_df = filter_backlog(filter_category, filter_status, start_date, end_date)
         
         # Display the backlog items with actions
-        for idx, item in filtered_df.iterrows():
+        for _, item in filtered_df.iterrows():
+            item_id = int(item['id'])
             with st.expander(f"{item['Idea']} ({item['Category']})"):
                 cols = st.columns([3, 1, 1])
                 
                 with cols[0]:
+                    if item.get('Snippet'):
+                        st.markdown(f"**Match:** {item['Snippet']}")
                     st.markdown(f"**Description:** {item['Description']}")
                     st.markdown(f"**Created:** {pd.to_datetime(item['Creation Date']).strftime('%Y-%m-%d')}")
                     st.markdown(f"**Status:** {item['Status']}")
                 
                 with cols[1]:
-                    if st.button("Convert to Task", key=f"convert_{idx}"):
+                    if st.button("Convert to Task", key=f"convert_{item_id}"):
                         # Store the item for conversion
                         st.session_state.converting_item = item
-                        st.session_state.converting_idx = idx
+                        st.session_state.converting_id = item_id
                         st.rerun()
                 
                 with cols[2]:
-                    if st.button("Remove", key=f"remove_{idx}"):
-                        delete_backlog_item(idx)
-                        st.success(f"Removed '{item['Idea']}' from backlog.")
-                        st.rerun()
+                    if st.button("Remove", key=f"remove_{item_id}"):
+                        if delete_backlog_item(item_id, expected_version=item['version']):
+                            st.success(f"Removed '{item['Idea']}' from backlog.")
+                            st.rerun()
+                        else:
+                            st.warning(f"'{item['Idea']}' was changed or removed in another session. Review it and try again.")
     else:
         st.info("Your backlog is empty. Add ideas using the form above.")
@@ -1,13 +1,12 @@
 import streamlit as st
-import pandas as pd
-import sqlite3
-import io
 import os
 import zipfile
-import base64
 from datetime import datetime
-from utils.db_utils import DB_FILE, table_to_df, df_to_table
+from utils.db_utils import DB_FILE
+from utils.backup import BackupJob, BackgroundJob, read_manifest, restore_backup_chain, restore_csv_archive
+from utils.instrumentation import instrumented
 
+@instrumented
 def show_db_manager():
     """
     Show database management options for backing up and restoring data.
@@ -18,63 +17,98 @@ def show_db_manager():
     
     with col1:
         st.subheader("Backup Database")
-        if st.button("📤 Download Database Backup"):
-            # Generate backup file name with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_name = f"task_scheduler_backup_{timestamp}.zip"
+        kind = st.radio(
+            "Backup type", ["Full", "Incremental"], horizontal=True, key="db_backup_kind",
+            help="An incremental backup holds only the rows changed since the last backup. "
+                 "Restore it together with the full backup and every incremental backup in between."
+        )
+        if st.button("📤 Create Database Backup"):
+            # The backup runs in the background; other sessions keep working meanwhile
+            job = run_with_progress(BackupJob(incremental=kind == "Incremental"), "Backing up…")
             
-            # Create the download link
-            download_link = create_download_link(backup_name)
-            st.markdown(download_link, unsafe_allow_html=True)
-            st.success("Click the link above to download your backup.")
+            if job.error:
+                st.error(f"Error creating backup: {job.error}")
+            else:
+                # Generate backup file name with timestamp
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                suffix = "_incremental" if job.incremental else ""
+                # download_button takes bytes, not files; the spooled archive isn't needed after reading it
+                with job.archive as archive:
+                    archive.seek(0)
+                    st.session_state.db_backup = (f"task_scheduler_backup_{timestamp}{suffix}.zip", archive.read())
+        
+        backup = st.session_state.get('db_backup')
+        if backup:
+            backup_name, data = backup
+            # The archive is kept only until it is downloaded
+            st.download_button(
+                f"Download {backup_name}", data, file_name=backup_name, mime="application/zip",
+                on_click=drop_backup
+            )
     
     with col2:
         st.subheader("Restore Database")
-        uploaded_file = st.file_uploader("📥 Upload Backup File", type=["zip"])
+        uploaded_files = st.file_uploader(
+            "📥 Upload Backup Files", type=["zip"], accept_multiple_files=True,
+            help="A full backup, optionally with the incremental backups taken after it."
+        )
         
-        if uploaded_file is not None:
+        if uploaded_files:
             if st.button("Restore from Backup"):
-                success = restore_from_backup(uploaded_file)
+                if len(uploaded_files) == 1 and is_csv_backup(uploaded_files[0]):
+                    # Backups of the tables only, from before database files were included
+                    uploaded_files[0].seek(0)
+                    success = restore_from_csv_backup(uploaded_files[0])
+                else:
+                    success = restore_backup_files(uploaded_files)
                 if success:
                     st.success("Database restored successfully! Restart the app to see your data.")
                 else:
                     st.error("Error restoring database. Please check if the backup file is valid.")
 
-def create_download_link(backup_name):
+def drop_backup():
     """
-    Create a database backup and generate a download link.
+    Forget the backup archive created in this session.
+    """
+    st.session_state.pop('db_backup', None)
+
+def run_with_progress(job, text):
+    """
+    Start a background job and show its progress until it finishes.
+    """
+    job.start()
+    progress_bar = st.progress(0.0, text=text)
+    while not job.wait(timeout=0.1):
+        progress_bar.progress(job.progress, text=text)
+    progress_bar.empty()
+    return job
+
+def restore_backup_files(uploaded_files):
+    """
+    Restore the database from a full backup and the incremental backups after it.
     
-    Args:
-        backup_name: Name of the backup file
-        
     Returns:
-        str: HTML link for downloading the backup
+        bool: True if restoration was successful
     """
-    # Create a zip file in memory
-    zip_buffer = io.BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        # Add the database file to the zip if it exists
-        if os.path.exists(DB_FILE):
-            zip_file.write(DB_FILE, arcname=os.path.basename(DB_FILE))
-        
-        # Also add CSV exports of each table for easier inspection
-        for table in ['tasks', 'free_time', 'backlog']:
-            df = table_to_df(table)
-            if not df.empty:
-                csv_buffer = io.StringIO()
-                df.to_csv(csv_buffer, index=False)
-                zip_file.writestr(f"{table}.csv", csv_buffer.getvalue())
-    
-    # Set up the download link
-    b64 = base64.b64encode(zip_buffer.getvalue()).decode()
-    href = f'<a href="data:application/zip;base64,{b64}" download="{backup_name}">Download {backup_name}</a>'
-    
-    return href
+    job = run_with_progress(BackgroundJob(restore_backup_chain, uploaded_files), "Restoring…")
+    if job.error:
+        st.error(f"Error during restoration: {job.error}")
+        return False
+    return True
+
+def is_csv_backup(uploaded_file):
+    """
+    Check whether an archive holds table CSVs but no manifest or database file.
+    """
+    if read_manifest(uploaded_file) is not None:
+        return False
+    with zipfile.ZipFile(uploaded_file) as zip_ref:
+        names = zip_ref.namelist()
+    return os.path.basename(DB_FILE) not in names and any(name.endswith('.csv') for name in names)
 
-def restore_from_backup(uploaded_file):
+def restore_from_csv_backup(uploaded_file):
     """
-    Restore database from an uploaded backup file.
+    Restore the tables from the CSV files of an uploaded backup.
     
     Args:
         uploaded_file: Uploaded zip file
@@ -82,39 +116,14 @@ def restore_from_backup(uploaded_file):
     Returns:
         bool: True if restoration was successful
     """
-    try:
-        # Create a temporary file to extract the backup
-        with zipfile.ZipFile(uploaded_file) as zip_ref:
-            # First, check if it contains the database file
-            db_filename = os.path.basename(DB_FILE)
-            
-            if db_filename in zip_ref.namelist():
-                # If database file exists, close any open connections
-                # This is important because SQLite will lock the file
-                conn = sqlite3.connect(DB_FILE)
-                conn.close()
-                
-                # Extract the database file, overwriting the existing one
-                zip_ref.extract(db_filename, path=os.path.dirname(DB_FILE))
-                return True
-            
-            # If no database file, try to restore from CSVs
-            csv_files = [name for name in zip_ref.namelist() if name.endswith('.csv')]
-            
-            if csv_files:
-                for csv_file in csv_files:
-                    table_name = os.path.splitext(csv_file)[0]
-                    
-                    # Read the CSV into a DataFrame
-                    with zip_ref.open(csv_file) as f:
-                        df = pd.read_csv(io.BytesIO(f.read()))
-                        
-                        # Save to the database
-                        df_to_table(df, table_name)
-                
-                return True
-        
-        return False
-    except Exception as e:
-        st.error(f"Error during restoration: {str(e)}")
+    job = run_with_progress(BackgroundJob(restore_csv_archive, uploaded_file), "Restoring…")
+    if job.error:
+        st.error(f"Error during restoration: {job.error}")
         return False
+    
+    for table in job.result:
+        if table.rejected:
+            st.warning(f"{table.table_name}: skipped {table.rejected} rows with invalid values.")
+        if table.ignored_columns:
+            st.caption(f"{table.table_name}: ignored unknown columns {', '.join(table.ignored_columns)}.")
+    return True
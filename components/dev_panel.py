@@ -0,0 +1,74 @@
+import streamlit as st
+import pandas as pd
+from utils.instrumentation import RERUN_HISTORY, dataframe_bytes
+
+def show_dev_panel(metrics):
+    """
+    Show where the time of the latest rerun went, and how recent reruns compare.
+    
+    When memory was profiled, also show the peak and retained memory of the
+    rerun and of this session, the DataFrames the storage layer handed out
+    and the DataFrames kept in the session state between reruns.
+    
+    Args:
+        metrics (RerunMetrics): The rerun that just finished
+    """
+    history = st.session_state.setdefault('rerun_history', [])
+    rerun = {
+        'Started': pd.Timestamp.fromtimestamp(metrics.started),
+        'Wall ms': round(metrics.wall_ms, 1),
+        'SQL statements': metrics.statements,
+        'Slowest call': max(metrics.spans, key=lambda name: metrics.spans[name]['wall_ms'], default=None),
+    }
+    if metrics.memory:
+        rerun['Peak MB'] = _megabytes(metrics.memory['peak_bytes'])
+        rerun['Retained MB'] = _megabytes(metrics.memory['retained_bytes'])
+    history.append(rerun)
+    del history[:-RERUN_HISTORY]
+    
+    with st.sidebar.expander("Developer: rerun metrics"):
+        st.metric("Last rerun", f"{metrics.wall_ms:.0f} ms", help=f"{metrics.statements} SQL statements")
+        st.dataframe(metrics.to_frame(), use_container_width=True, hide_index=True)
+        st.caption("Recent reruns")
+        st.dataframe(pd.DataFrame(history[::-1]), use_container_width=True, hide_index=True)
+        
+        if metrics.memory:
+            _show_memory(metrics)
+
+def _show_memory(metrics):
+    memory = metrics.memory
+    session_peak = max(st.session_state.get('memory_peak_bytes', 0), memory['peak_bytes'])
+    st.session_state.memory_peak_bytes = session_peak
+    # Everything kept in the session state lives on between reruns
+    session_frames = {
+        key: dataframe_bytes(value) for key, value in st.session_state.items() if key != 'rerun_history'
+    }
+    retained = sum(session_frames.values())
+    
+    st.caption("Memory")
+    st.metric("Rerun peak", f"{_megabytes(memory['peak_bytes'])} MB",
+              help=f"{_megabytes(memory['retained_bytes'])} MB still held at the end of the rerun")
+    st.metric("Session peak", f"{_megabytes(session_peak)} MB", help="Highest rerun peak in this session")
+    st.metric("Session retained", f"{_megabytes(retained)} MB",
+              help="Deep size of the DataFrames kept in the session state")
+    
+    if metrics.frames:
+        st.caption(f"DataFrames handed out by the storage layer: {_megabytes(memory['frame_bytes'])} MB")
+        frames = pd.DataFrame(metrics.frames).groupby('call', as_index=False).agg(
+            frames=('bytes', 'size'), rows=('rows', 'sum'), bytes=('bytes', 'sum')
+        )
+        st.dataframe(frames.sort_values('bytes', ascending=False), use_container_width=True, hide_index=True)
+    
+    held = {key: size for key, size in session_frames.items() if size}
+    if held:
+        st.caption("DataFrames in the session state")
+        st.dataframe(
+            pd.DataFrame({'key': list(held), 'bytes': list(held.values())}).sort_values('bytes', ascending=False),
+            use_container_width=True, hide_index=True
+        )
+    
+    st.caption("Lines holding the most new memory")
+    st.dataframe(pd.DataFrame(memory['top_allocations']), use_container_width=True, hide_index=True)
+
+def _megabytes(size):
+    return round(size / 2 ** 20, 2)
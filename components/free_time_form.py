@@ -1,12 +1,15 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, time
 from models.free_time import (
-    load_free_time, save_free_time, 
+    load_free_time, swap_free_time_dates,
     add_free_time, subtract_free_time, 
-    delete_free_time, get_total_free_time
+    delete_free_time, get_total_free_time,
+    load_free_time_slots, add_free_time_slot, delete_free_time_slot
 )
+from utils.instrumentation import instrumented
 
+@instrumented
 def show_free_time_manager():
     """
     Display and manage free time windows in the Free Time tab.
@@ -83,33 +86,60 @@ def show_free_time_manager():
             with col3:
                 # Move Up button (disabled for first row)
                 if i > 0 and st.button("⬆️ Move Up", key=f"up_{idx}"):
-                    # Get sorted dates
-                    sorted_df = free_time_df.sort_values('Date')
-                    dates = sorted_df['Date'].tolist()
-                    
-                    current_date = dates[i]
-                    prev_date = dates[i-1]
-                    
-                    # Store current values
-                    current_hours = sorted_df.loc[sorted_df['Date'] == current_date, 'Available Hours'].values[0]
-                    prev_hours = sorted_df.loc[sorted_df['Date'] == prev_date, 'Available Hours'].values[0]
-                    
-                    # Swap dates
-                    free_time_df.loc[free_time_df['Date'] == current_date, 'Date'] = prev_date
-                    free_time_df.loc[free_time_df['Date'] == prev_date, 'Date'] = current_date
-                    
-                    # Save changes
-                    save_free_time(free_time_df)
-                    st.rerun()
+                    # Swap the dates of this row and the one above it
+                    if swap_free_time_dates(free_time_df.iloc[i - 1], row):
+                        st.rerun()
+                    else:
+                        st.warning("These dates were changed in another session. Review them and try again.")
                     
             with col4:
                 # Delete button
                 if st.button("🗑️ Delete", key=f"del_{idx}"):
-                    delete_free_time(idx)
-                    st.rerun()
+                    if delete_free_time(row['id'], expected_version=row['version']):
+                        st.rerun()
+                    else:
+                        st.warning("This date was changed in another session. Review it and try again.")
         
         # Show a summary
         total_hours = get_total_free_time()
         st.info(f"Total free time available: {total_hours} hours")
     else:
         st.info("No free time windows added yet. Use the form above to add free time.")
+    
+    show_free_time_slots()
+
+def show_free_time_slots():
+    """
+    Display and manage concrete free time slots used by the time-block scheduler.
+    """
+    st.subheader("Time Slots")
+    st.caption("Slots pin free time to the clock, e.g. 9:00-11:00. Their hours are added to that date above.")
+    
+    with st.form("add_free_time_slot"):
+        cols = st.columns([2, 1, 1, 1])
+        with cols[0]:
+            slot_date = st.date_input("Date", value=datetime.today(), key="slot_date")
+        with cols[1]:
+            start_time = st.time_input("From", value=time(9, 0), key="slot_start")
+        with cols[2]:
+            end_time = st.time_input("To", value=time(11, 0), key="slot_end")
+        with cols[3]:
+            add_slot = st.form_submit_button("Add Slot")
+    
+    if add_slot:
+        start = datetime.combine(slot_date, start_time)
+        end = datetime.combine(slot_date, end_time)
+        if add_free_time_slot(start, end) is None:
+            st.warning("The slot must end after it starts and can't overlap another slot.")
+        else:
+            st.success(f"Added {start.strftime('%H:%M')}-{end.strftime('%H:%M')} on {slot_date.strftime('%A, %B %d')}")
+    
+    slots_df = load_free_time_slots()
+    for slot in slots_df.itertuples(index=False):
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            st.write(f"{slot.Start.strftime('%A, %B %d, %Y')}: {slot.Start.strftime('%H:%M')}-{slot.End.strftime('%H:%M')}")
+        with col2:
+            if st.button("🗑️ Delete", key=f"del_slot_{slot.id}"):
+                delete_free_time_slot(slot.id)
+                st.rerun()
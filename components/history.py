@@ -0,0 +1,59 @@
+import streamlit as st
+from utils.journal import get_undo_action, get_redo_action, undo, redo, JournalConflict
+from utils.instrumentation import instrumented
+
+def describe_action(action):
+    """
+    Summarize a journal action, e.g. "tasks: 10 inserted, 1 deleted".
+    """
+    return "; ".join(
+        f"{table_name}: " + ", ".join(f"{count} {verb}" for verb, count in counts.items())
+        for table_name, counts in action.changes.items()
+    )
+
+@instrumented
+def show_history_controls():
+    """
+    Show undo and redo buttons for the latest changes in the sidebar.
+    """
+    with st.sidebar:
+        st.subheader("History")
+        undo_action = get_undo_action()
+        redo_action = get_redo_action()
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("↶ Undo", disabled=undo_action is None, use_container_width=True):
+                try:
+                    action = undo()
+                except JournalConflict as conflict:
+                    action = None
+                    st.session_state.history_conflict = (
+                        f"Can't undo {describe_action(conflict.action)}: "
+                        f"{len(conflict.rows)} row(s) were changed since."
+                    )
+                if action is not None:
+                    st.session_state.history_message = f"Undone: {describe_action(action)}"
+                    st.session_state.rerun_scheduler = True
+                st.rerun()
+        with col2:
+            if st.button("↷ Redo", disabled=redo_action is None, use_container_width=True):
+                try:
+                    action = redo()
+                except JournalConflict as conflict:
+                    action = None
+                    st.session_state.history_conflict = (
+                        f"Can't redo {describe_action(conflict.action)}: "
+                        f"{len(conflict.rows)} row(s) were changed since."
+                    )
+                if action is not None:
+                    st.session_state.history_message = f"Redone: {describe_action(action)}"
+                    st.session_state.rerun_scheduler = True
+                st.rerun()
+        
+        if st.session_state.get('history_conflict'):
+            st.warning(st.session_state.pop('history_conflict'))
+        if st.session_state.get('history_message'):
+            st.caption(st.session_state.pop('history_message'))
+        elif undo_action is not None:
+            st.caption(f"Last change: {describe_action(undo_action)}")
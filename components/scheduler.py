@@ -1,13 +1,23 @@
 import streamlit as st
 import pandas as pd
+import tempfile
 from datetime import datetime
-from models.task import load_tasks, save_tasks, calculate_task_priority, get_large_tasks
-from models.free_time import load_free_time, get_total_free_time
+from models.task import update_task_fields, get_large_tasks, get_demand_by_due_date
+from models.free_time import load_free_time, get_capacity_by_date
+from scheduling.feasibility import analyze_feasibility
+from scheduling.worker import get_schedule_worker
+from scheduling.strategies import STRATEGIES, DEFAULT_STRATEGY, benchmark_strategies
+from scheduling.engine import ScheduleEvent
+from scheduling.stream import iter_schedule
+from scheduling.export import write_schedule_csv, write_schedule_ics
+from scheduling.whatif import evaluate_resolutions
 from components.wizard import start_wizard
+from utils.instrumentation import instrumented
 
+@instrumented
 def run_scheduler():
     """
-    Run the scheduling algorithm and display results.
+    Display the latest schedule computed by the background schedule worker.
     """
     st.header("Run Scheduler")
     
@@ -15,58 +25,106 @@ def run_scheduler():
     if 'action_results' not in st.session_state:
         st.session_state['action_results'] = []
     
-    # Run scheduler button
+    strategy = st.selectbox(
+        "Scheduling strategy", list(STRATEGIES), key="scheduling_strategy",
+        help="\n\n".join(f"**{name}**: {fn.description}" for name, fn in STRATEGIES.items())
+    )
+    worker = get_schedule_worker()
+    
+    # Run scheduler button forces an immediate check for changes
     run_button = st.button("Run Scheduler")
     
-    if run_button or 'rerun_scheduler' in st.session_state:
-        st.subheader("Scheduled Tasks")
-        
-        # Load data
-        tasks_df = load_tasks()
-        free_time_df = load_free_time()
-        
-        # Calculate capacity vs demand
-        total_free_time = get_total_free_time()
-        total_estimated_time = tasks_df['Estimated Time'].sum() if not tasks_df.empty else 0
-        
-        # Display capacity summary
-        display_capacity_summary(total_free_time, total_estimated_time)
+    if run_button or st.session_state.get('rerun_scheduler'):
+        # The user just changed something; give the worker a moment to catch up
+        worker.wait_for_current(strategy, timeout=2.0)
+    
+    # Clear rerun flag if it exists
+    if 'rerun_scheduler' in st.session_state:
+        del st.session_state['rerun_scheduler']
+    
+    result, recomputing = worker.latest(strategy)
+    if result is None:
+        st.info("⏳ Computing the schedule… Click 'Run Scheduler' to check again.")
+        return
+    
+    if recomputing:
+        st.caption(
+            f"⏳ Recomputing… showing the schedule from {result.computed_at.strftime('%H:%M:%S')}. "
+            f"Click 'Run Scheduler' to load the new one."
+        )
+    else:
+        st.caption(f"Schedule computed at {result.computed_at.strftime('%H:%M:%S')} in {result.duration:.2f}s.")
+    
+    if result.error:
+        st.error(f"Scheduling failed: {result.error}")
+        return
+    
+    st.subheader("Scheduled Tasks")
+    
+    # Display capacity summary
+    display_capacity_summary(result.total_free_time, result.total_estimated_time)
+    
+    scheduled_tasks, warnings, unallocated_tasks = result.scheduled_tasks, result.warnings, result.unallocated_tasks
+    if result.lazy_schedule is not None:
+        # The worker's schedule is shared by all sessions; each extends its own copy
+        session_schedule = st.session_state.get('lazy_schedule')
+        if session_schedule is None or session_schedule[0] != result.generation:
+            session_schedule = (result.generation, result.lazy_schedule.copy())
+            st.session_state.lazy_schedule = session_schedule
+        scheduled_tasks, warnings, unallocated_tasks = display_schedule_horizon(session_schedule[1])
+    
+    # Display the scheduling results if we have tasks
+    if not result.tasks_df.empty:
+        display_scheduling_results(scheduled_tasks, result.daily_summary.copy())
         
-        # Create a working copy of free time dataframe for scheduling
-        working_free_time_df = free_time_df.copy()
-        if 'Sort Order' in working_free_time_df.columns:
-            working_free_time_df = working_free_time_df.drop('Sort Order', axis=1)
+        # Download the whole schedule
+        display_schedule_export(result, strategy, scheduled_tasks)
         
-        working_free_time_df['Date'] = pd.to_datetime(working_free_time_df['Date'])
-        working_free_time_df = working_free_time_df.sort_values(by='Date')
+        # Compare every strategy on the same data
+        display_strategy_benchmark(result)
         
-        # Create daily summary from current free time dataframe
-        daily_summary = create_daily_summary(working_free_time_df)
+        # Handle unallocated tasks
+        if unallocated_tasks:
+            handle_unallocated_tasks(unallocated_tasks, result.tasks_df, strategy)
         
-        # Run the scheduling algorithm if we have tasks
-        if not tasks_df.empty:
-            scheduled_tasks, warnings, unallocated_tasks = schedule_tasks(tasks_df, working_free_time_df)
-            
-            # Display the scheduling results
-            display_scheduling_results(scheduled_tasks, daily_summary)
-            
-            # Handle unallocated tasks
-            if unallocated_tasks:
-                handle_unallocated_tasks(unallocated_tasks, tasks_df)
-            
-            # Display large tasks that need breakdown
-            display_large_tasks()
-            
-            # Display scheduling warnings
-            if warnings:
-                st.subheader("Scheduling Warnings")
-                for warning in warnings:
-                    if warning.startswith("HANDLE:"):
-                        st.warning(warning)
+        # Display large tasks that need breakdown
+        display_large_tasks()
         
-        # Clear rerun flag if it exists
-        if 'rerun_scheduler' in st.session_state:
-            del st.session_state['rerun_scheduler']
+        # Display scheduling warnings
+        if warnings:
+            st.subheader("Scheduling Warnings")
+            for warning in warnings:
+                if warning.startswith("HANDLE:"):
+                    st.warning(warning)
+
+def display_schedule_horizon(lazy_schedule):
+    """
+    Show how far ahead the schedule is committed and let the user look further.
+    
+    Extending continues the existing schedule rather than recomputing it.
+    
+    Returns:
+        tuple: (scheduled_tasks, warnings, unallocated_tasks) up to the horizon
+    """
+    if not lazy_schedule.is_complete():
+        horizon = lazy_schedule.horizon
+        cols = st.columns([3, 1, 1])
+        with cols[0]:
+            if horizon is None:
+                st.caption("No free time falls within the schedule horizon yet.")
+            else:
+                st.caption(f"Showing the schedule through {horizon.strftime('%A, %B %d')}. Tasks due later may still fall short.")
+        with cols[1]:
+            if st.button("Look 2 weeks further"):
+                start = horizon if horizon is not None else pd.Timestamp(datetime.today().date())
+                lazy_schedule.extend_to(start + pd.Timedelta(days=14))
+                st.rerun()
+        with cols[2]:
+            if st.button("Schedule everything"):
+                lazy_schedule.extend_to(None)
+                st.rerun()
+    
+    return lazy_schedule.result()
 
 def display_capacity_summary(total_free_time, total_estimated_time):
     """
@@ -86,84 +144,20 @@ def display_capacity_summary(total_free_time, total_estimated_time):
             f"You have {total_free_time - total_estimated_time} hours of free capacity remaining."
         )
     
-    st.markdown("### Daily Capacity vs Demand")
-
-def create_daily_summary(free_time_df):
-    """
-    Create a summary of available hours by date.
-    """
-    if free_time_df.empty:
-        return pd.DataFrame(columns=['Date', 'Total Available'])
-        
-    return (
-        free_time_df.groupby('Date')['Available Hours']
-        .sum()
-        .reset_index()
-        .rename(columns={'Available Hours': 'Total Available'})
-    )
-
-def schedule_tasks(tasks_df, working_free_time_df):
-    """
-    Schedule tasks based on priority and available time.
-    """
-    scheduled_tasks = []
-    warnings = []
-    unallocated_tasks = []
-    
-    # Prioritize tasks
-    tasks_df = calculate_task_priority(tasks_df)
-    
-    today = pd.to_datetime(datetime.today().date())
-    
-    # Main scheduling loop
-    for idx, task in tasks_df.iterrows():
-        task_time_remaining = task['Estimated Time']
-        task_name = task['Task']
-        due_date = task['Due Date']
-        
-        # Check for large tasks
-        if task_time_remaining > 6 and not any(tag in str(task_name) for tag in ['[MULTI-SESSION]', '[FIXED EVENT]', '[PENDING PLANNING]']):
-            warnings.append(
-                f"Task '{task_name}' exceeds 6 hours and should probably be split unless it's a Work Block."
-            )
-        
-        # Allocate time across available windows
-        for f_idx, window in working_free_time_df.iterrows():
-            if task_time_remaining <= 0:
-                break
-            
-            if pd.notnull(due_date) and window['Date'] > due_date:
-                break
-            
-            available_hours = window['Available Hours']
-            if available_hours > 0:
-                allocated_time = min(task_time_remaining, available_hours)
-                scheduled_tasks.append({
-                    'Task': task_name,
-                    'Date': window['Date'],
-                    'Allocated Hours': allocated_time
-                })
-                working_free_time_df.at[f_idx, 'Available Hours'] -= allocated_time
-                task_time_remaining -= allocated_time
-        
-        # Track unallocated tasks
-        if pd.notnull(due_date) and task_time_remaining > 0:
-            warnings.append(
-                f"HANDLE: {task_name} (Due: {due_date.date()}) "
-                f"needs {task['Estimated Time']}h, but only {task['Estimated Time'] - task_time_remaining}h scheduled before due date."
-            )
-            
-            # Track the unallocated task with details
-            unallocated_tasks.append({
-                'Task': task_name,
-                'Task Index': idx,
-                'Due Date': due_date,
-                'Total Hours': task['Estimated Time'],
-                'Allocated Hours': task['Estimated Time'] - task_time_remaining,
-                'Unallocated Hours': task_time_remaining
-            })
+    # Check due dates against the current data; cheap enough to run on every rerun
+    feasibility = analyze_feasibility(get_demand_by_due_date(), get_capacity_by_date())
+    if feasibility['feasible']:
+        st.success("Every due date can be met with the current free time.")
+    else:
+        deadlines = feasibility['deadlines']
+        st.warning(
+            f"Due dates from {feasibility['earliest_infeasible'].date()} on can't all be met: "
+            f"add at least {feasibility['extra_hours_needed']:.1f} hours of free time before the tightest one."
+        )
+        with st.expander("Extra hours needed per due date"):
+            st.dataframe(deadlines[deadlines['Extra Hours Needed'] > 0], hide_index=True)
     
-    return scheduled_tasks, warnings, unallocated_tasks
+    st.markdown("### Daily Capacity vs Demand")
 
 def display_scheduling_results(scheduled_tasks, daily_summary):
     """
@@ -191,7 +185,9 @@ def display_scheduling_results(scheduled_tasks, daily_summary):
         st.dataframe(daily_summary)
         
         # Create task-by-date pivot table
-        pivot_df = scheduled_df.pivot(index='Task', columns='Date', values='Allocated Hours').fillna('')
+        pivot_df = scheduled_df.pivot_table(
+            index='Task', columns='Date', values='Allocated Hours', aggfunc='sum'
+        ).fillna('')
         
         # Only display non-empty columns first
         if not pivot_df.empty:
@@ -202,12 +198,72 @@ def display_scheduling_results(scheduled_tasks, daily_summary):
                 pivot_df = pivot_df[ordered_cols]
             
             st.dataframe(pivot_df)
+            
+            if 'Start' in scheduled_df.columns:
+                st.markdown("### Time Blocks")
+                blocks_df = scheduled_df[['Start', 'End', 'Task', 'Allocated Hours']].sort_values('Start')
+                st.dataframe(blocks_df, use_container_width=True, hide_index=True)
+            
+            if 'Late Days' in scheduled_df.columns:
+                late_hours = scheduled_df.loc[scheduled_df['Late Days'] > 0, 'Allocated Hours'].sum()
+                if late_hours > 0:
+                    st.caption(f"{late_hours:.1f} of these hours are scheduled after their task's due date.")
         else:
             st.write("No scheduled tasks yet.")
     else:
         st.write("No tasks could be scheduled with the current free time availability.")
 
-def handle_unallocated_tasks(unallocated_tasks, tasks_df):
+def display_schedule_export(result, strategy, scheduled_tasks):
+    """
+    Let the user download the schedule as CSV or as a calendar file.
+    
+    The default strategy's schedule is streamed from the database past the
+    horizon shown above, so the whole schedule is exported without being held
+    in memory; other strategies export the schedule shown.
+    """
+    with st.expander("Export schedule"):
+        export_format = st.radio("Format", ["CSV", "Calendar (.ics)"], horizontal=True, key="schedule_export_format")
+        
+        if st.button("Prepare export"):
+            if strategy == DEFAULT_STRATEGY:
+                events = iter_schedule()
+            else:
+                events = (ScheduleEvent('allocation', entry) for entry in scheduled_tasks)
+            writer = write_schedule_csv if export_format == "CSV" else write_schedule_ics
+            
+            with tempfile.TemporaryFile(mode='w+', newline='', encoding='utf-8') as file:
+                count = writer(events, file)
+                file.seek(0)
+                st.session_state.schedule_export = (result.generation, export_format, count, file.read())
+        
+        export = st.session_state.get('schedule_export')
+        if export and export[0] == result.generation and export[1] == export_format:
+            _, _, count, data = export
+            extension, mime = ("csv", "text/csv") if export_format == "CSV" else ("ics", "text/calendar")
+            st.caption(f"{count} scheduled blocks.")
+            st.download_button(
+                "Download", data, file_name=f"schedule_{datetime.today().strftime('%Y%m%d')}.{extension}", mime=mime
+            )
+
+def display_strategy_benchmark(result):
+    """
+    Run every scheduling strategy on the current data and show how they compare.
+    """
+    with st.expander("Compare scheduling strategies"):
+        if st.button("Run benchmark"):
+            st.session_state.strategy_benchmark = (
+                result.generation, benchmark_strategies(result.tasks_df, load_free_time())
+            )
+        
+        benchmark = st.session_state.get('strategy_benchmark')
+        if benchmark and benchmark[0] == result.generation:
+            st.dataframe(benchmark[1], use_container_width=True, hide_index=True)
+            st.caption(
+                "Late hours are hours not scheduled before their task's due date. "
+                "Fragmentation is the average number of days a scheduled task is spread over."
+            )
+
+def handle_unallocated_tasks(unallocated_tasks, tasks_df, strategy):
     """
     Display and provide resolution options for tasks with insufficient allocated time.
     """
@@ -230,6 +286,19 @@ def handle_unallocated_tasks(unallocated_tasks, tasks_df):
         st.markdown(f"**Current allocation:** {selected_task['Allocated Hours']} of {selected_task['Total Hours']} hours")
         st.markdown(f"**Unallocated hours:** {selected_task['Unallocated Hours']} hours")
         
+        # Preview the effect of every resolution before applying one
+        with st.expander("Compare all resolutions"):
+            whatif_key = (selected_task['Task'], selected_task['Unallocated Hours'], len(tasks_df), strategy)
+            if st.button("Evaluate resolutions"):
+                st.session_state.whatif_results = (
+                    whatif_key, evaluate_resolutions(tasks_df, load_free_time(), selected_task, strategy)
+                )
+            
+            whatif = st.session_state.get('whatif_results')
+            if whatif and whatif[0] == whatif_key:
+                st.dataframe(whatif[1], use_container_width=True, hide_index=True)
+                st.caption("Uses the form's default values for each option, compared with changing nothing.")
+        
         # Use a form for the resolution options
         with st.form(key="resolution_form"):
             st.subheader("Resolution Options")
@@ -300,11 +369,10 @@ def handle_unallocated_tasks(unallocated_tasks, tasks_df):
             # Process the selected resolution
             if resolution_choice == "Reduce task hours estimate":
                 task_idx = selected_task['Task Index']
-                tasks_df.at[task_idx, 'Estimated Time'] = new_estimate
-                save_tasks(tasks_df)
-                st.success(f"Updated estimate for '{selected_task['Task']}' to {new_estimate} hours.")
-                st.session_state.rerun_scheduler = True
-                st.rerun()
+                if apply_task_update(tasks_df, task_idx, {'Estimated Time': new_estimate}):
+                    st.success(f"Updated estimate for '{selected_task['Task']}' to {new_estimate} hours.")
+                    st.session_state.rerun_scheduler = True
+                    st.rerun()
             
             elif resolution_choice == "Add more free time":
                 from models.free_time import add_free_time
@@ -334,26 +402,46 @@ def handle_unallocated_tasks(unallocated_tasks, tasks_df):
             
             elif resolution_choice == "Extend the due date":
                 task_idx = selected_task['Task Index']
-                tasks_df.at[task_idx, 'Due Date'] = pd.to_datetime(new_due_date)
-                save_tasks(tasks_df)
-                st.success(f"Updated due date for '{selected_task['Task']}' to {new_due_date}.")
-                st.session_state.rerun_scheduler = True
-                st.rerun()
+                if apply_task_update(tasks_df, task_idx, {'Due Date': pd.to_datetime(new_due_date)}):
+                    st.success(f"Updated due date for '{selected_task['Task']}' to {new_due_date}.")
+                    st.session_state.rerun_scheduler = True
+                    st.rerun()
             
             elif resolution_choice == "Mark as partially completed":
                 task_idx = selected_task['Task Index']
                 remaining_hours = selected_task['Total Hours'] * (1 - progress_percentage / 100)
-                tasks_df.at[task_idx, 'Estimated Time'] = remaining_hours
+                fields = {'Estimated Time': remaining_hours}
                 
                 # Optionally add "[IN PROGRESS]" tag to task name
                 current_task_name = tasks_df.at[task_idx, 'Task']
                 if not "[IN PROGRESS]" in current_task_name:
-                    tasks_df.at[task_idx, 'Task'] = f"{current_task_name} [IN PROGRESS {progress_percentage}%]"
+                    fields['Task'] = f"{current_task_name} [IN PROGRESS {progress_percentage}%]"
                 
-                save_tasks(tasks_df)
-                st.success(f"Updated progress for '{selected_task['Task']}' to {progress_percentage}% complete.")
-                st.session_state.rerun_scheduler = True
-                st.rerun()
+                # Fully done tasks leave the schedule and get archived
+                if progress_percentage == 100:
+                    fields['Completed Date'] = pd.Timestamp.now()
+                
+                if apply_task_update(tasks_df, task_idx, fields):
+                    st.success(f"Updated progress for '{selected_task['Task']}' to {progress_percentage}% complete.")
+                    st.session_state.rerun_scheduler = True
+                    st.rerun()
+
+def apply_task_update(tasks_df, task_idx, fields):
+    """
+    Update a task the scheduler loaded, unless another session changed it since.
+    
+    Returns:
+        bool: True if the update was saved
+    """
+    task = tasks_df.loc[task_idx]
+    if update_task_fields(task['id'], fields, expected_version=task['version']):
+        return True
+    
+    st.error(
+        f"'{task['Task']}' was changed or removed in another session, so this resolution was not applied. "
+        f"Run the scheduler again to see the latest data."
+    )
+    return False
 
 def display_large_tasks():
     """
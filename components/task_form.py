@@ -1,19 +1,58 @@
 import streamlit as st
-from models.task import load_tasks, save_tasks
+from models.task import load_tasks, save_task_changes, search_tasks
+from models.dependency import load_dependencies
+from models.task_import import IMPORT_COLUMNS, import_tasks
+from models.task_archive import (
+    ARCHIVE_COMPLETED_AFTER_DAYS, ARCHIVE_STALE_AFTER_DAYS,
+    archive_tasks, load_archived_tasks, restore_archived_tasks
+)
+from scheduling.dependencies import add_dependency, remove_dependency
+from utils.db_utils import get_write_generation
 import pandas as pd
+from utils.instrumentation import instrumented
 
+@instrumented
 def show_task_manager():
     """
     Display and manage tasks in the Task Manager tab.
     """
     st.header("Edit Tasks")
     
-    # Load current tasks
-    tasks_df = load_tasks()
+    # Full-text search over task names and projects
+    search_text = st.text_input("Search tasks", placeholder="Search task names and projects")
+    if search_text.strip():
+        results_df = search_tasks(search_text)
+        if results_df.empty:
+            st.info(f"No tasks match '{search_text}'.")
+        for _, result in results_df.iterrows():
+            due = result['Due Date'].strftime('%Y-%m-%d') if pd.notnull(result['Due Date']) else "no due date"
+            st.markdown(f"- **{result['Task']}** ({result['Project']}, due {due}) — {result['Snippet']}")
     
-    # Convert 'Due Date' to date only (without time) if it exists
-    if 'Due Date' in tasks_df.columns and not tasks_df.empty:
-        tasks_df['Due Date'] = pd.to_datetime(tasks_df['Due Date']).dt.date
+    # Initialize editor state
+    if 'task_editor_revision' not in st.session_state:
+        st.session_state.task_editor_revision = 0
+    editor_key = f"task_editor_{st.session_state.task_editor_revision}"
+    
+    # Keep the rows the editor started from, so saving can tell which rows
+    # this session changed and which ones another session changed meanwhile.
+    # Reload them only while there are no unsaved edits.
+    editor_state = st.session_state.get(editor_key, {})
+    has_unsaved_edits = any(editor_state.get(key) for key in ('edited_rows', 'added_rows', 'deleted_rows'))
+    generation = get_write_generation()
+    if 'task_editor_base' not in st.session_state or (
+        not has_unsaved_edits and st.session_state.task_editor_generation != generation
+    ):
+        st.session_state.task_editor_base = load_tasks()
+        st.session_state.task_editor_generation = generation
+    elif st.session_state.task_editor_generation != generation:
+        st.info("Data changed elsewhere since you started editing. Saving only writes the rows you edited.")
+    
+    tasks_df = st.session_state.task_editor_base.copy()
+    
+    # Convert 'Due Date' and 'Completed Date' to date only (without time) if they exist
+    for column in ('Due Date', 'Completed Date'):
+        if column in tasks_df.columns and not tasks_df.empty:
+            tasks_df[column] = pd.to_datetime(tasks_df[column]).dt.date
     
     # Provide view-only mode for sorting
     if st.checkbox("Enable Sorting Mode (View Only)"):
@@ -32,21 +71,161 @@ def show_task_manager():
                     format="YYYY-MM-DD",
                     step=1,
                 ),
+                "Completed Date": st.column_config.DateColumn(
+                    "Completed Date",
+                    format="YYYY-MM-DD",
+                    step=1,
+                    help="Set when the task is done; completed tasks aren't scheduled and get archived",
+                ),
             },
-            disabled=False,
-            key="task_editor"
+            disabled=["id", "version"],
+            key=editor_key
         )
         
         # Convert dates back to datetime for storage
-        if 'Due Date' in edited_tasks_df.columns and not edited_tasks_df.empty:
-            edited_tasks_df['Due Date'] = pd.to_datetime(edited_tasks_df['Due Date'])
+        original_tasks_df = tasks_df.copy()
+        for df in (original_tasks_df, edited_tasks_df):
+            for column in ('Due Date', 'Completed Date'):
+                if column in df.columns and not df.empty:
+                    df[column] = pd.to_datetime(df[column])
         
         # Save changes when button is pressed
         if st.button("Save Tasks"):
-            save_tasks(edited_tasks_df)
-            st.success("Tasks saved successfully!")
+            result = save_task_changes(original_tasks_df, edited_tasks_df)
+            
+            if result.conflicts:
+                st.warning(
+                    f"{len(result.conflicts)} task(s) were changed in another session since you started editing. "
+                    f"Your edits to them were not saved; review the current values below and edit again."
+                )
+                st.dataframe(
+                    pd.DataFrame([conflict['current'] or {'id': conflict['id'], 'Task': '(deleted)'}
+                                  for conflict in result.conflicts]),
+                    use_container_width=True, hide_index=True
+                )
+            
+            saved = result.inserted + result.updated + result.deleted
+            if saved or not result.conflicts:
+                st.success(
+                    f"Tasks saved successfully! ({result.inserted} added, {result.updated} updated, {result.deleted} deleted)"
+                )
+            
+            # Start the next edit from the saved state
+            del st.session_state['task_editor_base']
+            st.session_state.task_editor_revision += 1
             
             # Return the updated dataframe for any subsequent operations
             return edited_tasks_df
     
     return tasks_df
+
+@instrumented
+def show_dependency_manager():
+    """
+    Display and edit which tasks have to be done before others.
+    """
+    with st.expander("Task Dependencies"):
+        tasks_df = load_tasks()
+        if tasks_df.empty:
+            st.info("No tasks yet.")
+            return
+        
+        names = dict(zip(tasks_df['id'], tasks_df['Task']))
+        task_ids = list(names)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            task_id = st.selectbox("Task", task_ids, format_func=names.get, key="dependency_task")
+        with col2:
+            depends_on = st.selectbox("Can't start before", task_ids, format_func=names.get, key="dependency_depends_on")
+        
+        if st.button("Add Dependency"):
+            if task_id == depends_on or not add_dependency(task_id, depends_on):
+                st.error(f"'{names[task_id]}' can't depend on '{names[depends_on]}': that would create a cycle.")
+            else:
+                st.success(f"'{names[task_id]}' now waits for '{names[depends_on]}'.")
+        
+        dependencies_df = load_dependencies()
+        if dependencies_df.empty:
+            st.write("No dependencies recorded.")
+            return
+        
+        for row in dependencies_df.itertuples(index=False):
+            col1, col2 = st.columns([5, 1])
+            with col1:
+                st.write(f"**{names.get(row.task_id)}** after {names.get(row.depends_on)}")
+            with col2:
+                if st.button("Remove", key=f"remove_dependency_{row.task_id}_{row.depends_on}"):
+                    remove_dependency(row.task_id, row.depends_on)
+                    st.rerun()
+
+@instrumented
+def show_task_import():
+    """
+    Import tasks in bulk from a CSV or JSON Lines file.
+    """
+    with st.expander("Import Tasks"):
+        st.caption(
+            "Columns: " + ", ".join(IMPORT_COLUMNS) + ". Only Task is required. "
+            "Tasks without an estimate or complexity become planning sessions or backlog ideas, "
+            "like in the intake wizard."
+        )
+        uploaded_file = st.file_uploader("Task file", type=["csv", "jsonl"], key="task_import_file")
+        if uploaded_file is None or not st.button("Import Tasks"):
+            return
+        
+        file_format = 'jsonl' if uploaded_file.name.lower().endswith('.jsonl') else 'csv'
+        try:
+            with st.spinner("Importing…"):
+                result = import_tasks(uploaded_file, file_format)
+        except Exception as e:
+            st.error(f"Couldn't read the file: {e}")
+            return
+        
+        st.success(
+            f"Imported {result.tasks} tasks ({result.planning} as planning sessions) "
+            f"and {result.backlog} backlog ideas."
+        )
+        if not result.errors.empty:
+            st.warning(f"{len(result.errors)} rows were skipped:")
+            st.dataframe(result.errors, use_container_width=True, hide_index=True)
+
+@instrumented
+def show_task_archive():
+    """
+    Archive completed and stale tasks, and browse or restore archived ones.
+    """
+    with st.expander("Task Archive"):
+        col1, col2 = st.columns(2)
+        with col1:
+            completed_after_days = st.number_input(
+                "Archive tasks completed at least this many days ago",
+                min_value=0, value=ARCHIVE_COMPLETED_AFTER_DAYS, step=1
+            )
+        with col2:
+            stale_after_days = st.number_input(
+                "Archive unfinished tasks overdue by at least this many days",
+                min_value=0, value=ARCHIVE_STALE_AFTER_DAYS, step=1
+            )
+        
+        if st.button("Archive Now"):
+            archived = archive_tasks(int(completed_after_days), int(stale_after_days))
+            st.success(f"Archived {archived['completed']} completed and {archived['stale']} stale tasks.")
+        
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            search_text = st.text_input("Search the archive", key="archive_search")
+        with col2:
+            reason = st.selectbox("Archived as", ["Any", "completed", "stale"], key="archive_reason")
+        archived_df = load_archived_tasks(search_text.strip() or None, None if reason == "Any" else reason)
+        if archived_df.empty:
+            st.info("No archived tasks.")
+            return
+        st.dataframe(archived_df, use_container_width=True, hide_index=True)
+        
+        names = dict(zip(archived_df['id'], archived_df['Task']))
+        to_restore = st.multiselect("Restore to the task list", list(names), format_func=names.get, key="archive_restore")
+        if to_restore and st.button("Restore Tasks"):
+            restored = restore_archived_tasks(to_restore)
+            st.success(f"Restored {restored} tasks.")
+            st.rerun()
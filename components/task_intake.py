@@ -1,15 +1,23 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
-from models.task import add_task
-from models.backlog import add_backlog_item
+from models.task import add_task, add_tasks
+from models.backlog import add_backlog_item, add_backlog_items
+from utils.db_utils import parse_date_text
+from utils.instrumentation import instrumented
 
+@instrumented
 def show_task_intake_wizard():
     """
     Display a wizard-style task intake form showing one question at a time.
     """
     st.header("New Task Intake")
     
+    if st.radio("Mode", ["One at a time", "Quick add"], horizontal=True, key="intake_mode") == "Quick add":
+        show_quick_add()
+        return
+    
     # Initialize session state for the wizard if needed
     if 'intake_step' not in st.session_state:
         st.session_state.intake_step = 1
@@ -329,3 +337,185 @@ def create_backlog_item(task_data):
         'Creation Date': datetime.now(),
         'Status': 'New'
     }
+
+# Inline attributes of a quick-add line and the wizard answers they stand for
+QUICK_ADD_TIME_ESTIMATES = {
+    'short': 'Less than an hour',
+    'long': 'More than an hour',
+    'many': 'Many hours',
+    '?': 'No idea',
+}
+QUICK_ADD_COMPLEXITIES = {
+    '?': "No idea yet",
+    '1': "Not at all complex (1)",
+    '3': "Somewhat complex (3)",
+    '5': "Very complex (5)",
+}
+QUICK_ADD_TIMEFRAMES = {'this-week': 'This week', 'next-week': 'Next week'}
+QUICK_ADD_HELP = (
+    "One task per line, with optional attributes anywhere in the line: "
+    "`!` important, `?` needs planning, `c:1`–`c:5` or `c:?` complexity, "
+    "`t:short`, `t:long`, `t:many` or `t:?` time, "
+    "`due:YYYY-MM-DD`, `due:this-week` or `due:next-week`. "
+    "Unset attributes take the wizard's defaults."
+)
+_QUICK_ADD_TOKEN = r'(?:^|(?<=\s))(?:!|\?|c:\S*|t:\S*|due:\S*)(?=\s|$)'
+
+def parse_quick_add(text, today=None):
+    """
+    Turn quick-add lines into wizard answers, one row per line, all at once.
+    
+    Args:
+        text (str): Lines of tasks with inline attributes, see QUICK_ADD_HELP
+        today (optional): Date broad timeframes are counted from
+    
+    Returns:
+        tuple: (DataFrame of answers with 'task_name', 'certainty', 'complexity',
+        'complexity_value', 'time_estimate', 'importance', 'due_date_type' and
+        'due_date' columns, DataFrame of errors with the 'Line' and 'Error' of
+        each rejected line)
+    """
+    today = pd.Timestamp(today or datetime.today()).normalize()
+    lines = pd.Series(text.splitlines(), dtype=object)
+    lines.index = lines.index + 1
+    lines = lines[lines.str.strip() != '']
+    
+    def attribute(prefix):
+        # Value of the first prefix: token on each line, NaN if there is none
+        return lines.str.extract(rf'(?:^|\s){prefix}(\S*)(?=\s|$)', expand=False)
+    
+    items = pd.DataFrame(index=lines.index)
+    items['task_name'] = lines.str.replace(_QUICK_ADD_TOKEN, '', regex=True).str.split().str.join(' ')
+    needs_planning = lines.str.contains(r'(?:^|\s)\?(?=\s|$)')
+    items['certainty'] = np.where(needs_planning, "None at all (needs planning)", "Some certainty")
+    
+    # Complexity defaults to the wizard's "Not at all complex (1)"
+    complexity = attribute('c:').fillna('1')
+    complexity_value = pd.to_numeric(complexity, errors='coerce')
+    items['complexity_value'] = complexity_value.where(complexity_value.between(1, 5) & (complexity_value % 1 == 0))
+    items['complexity'] = complexity.map(QUICK_ADD_COMPLEXITIES).fillna("Complexity (" + complexity + ")")
+    
+    # Time estimate defaults to the wizard's "No idea"
+    time_estimate = attribute('t:').fillna('?')
+    items['time_estimate'] = time_estimate.map(QUICK_ADD_TIME_ESTIMATES)
+    
+    items['importance'] = lines.str.contains(r'(?:^|\s)!(?=\s|$)')
+    
+    due = attribute('due:')
+    days_until_friday = (4 - today.weekday()) % 7
+    timeframe_dates = {
+        'this-week': today + timedelta(days=days_until_friday),
+        'next-week': today + timedelta(days=days_until_friday + 7),
+    }
+    items['due_date'] = parse_date_text(due.where(~due.isin(list(QUICK_ADD_TIMEFRAMES))))
+    for key, date in timeframe_dates.items():
+        items.loc[due == key, 'due_date'] = date
+    items['due_date_type'] = np.select(
+        [due.isin(list(QUICK_ADD_TIMEFRAMES)), due.notna()],
+        ["Broad timeframe", "Specific due date"],
+        "No specific due date"
+    )
+    
+    checks = [
+        (items['task_name'] == '', "Task name is missing"),
+        ((complexity != '?') & items['complexity_value'].isna(), "Complexity must be 1 to 5 or ?"),
+        (items['time_estimate'].isna(), "Time must be short, long, many or ?"),
+        (due.notna() & items['due_date'].isna(), "Due date is not a date"),
+    ]
+    messages = pd.Series('', index=items.index)
+    for failed, message in checks:
+        failed = failed.to_numpy(dtype=bool)
+        messages[failed] = messages[failed] + '; ' + message
+    invalid = (messages != '').to_numpy()
+    
+    errors = pd.DataFrame({'Line': items.index[invalid], 'Error': messages[invalid].str[2:].to_numpy()})
+    return items[~invalid], errors
+
+def route_intake_batch(items, today=None):
+    """
+    Run the decision tree of process_task_submission() over many answers at once.
+    
+    Args:
+        items (pandas.DataFrame): Wizard answers as returned by parse_quick_add()
+        today (optional): Date planning sessions without a due date count from
+    
+    Returns:
+        tuple: (DataFrame of new tasks, DataFrame of new backlog items), each
+        built like create_planning_session(), create_regular_task() and
+        create_backlog_item() would
+    """
+    today = pd.Timestamp(today or datetime.today()).normalize()
+    has_due_date = (items['due_date_type'] != 'No specific due date').to_numpy()
+    is_important = items['importance'].to_numpy(dtype=bool)
+    is_ambiguous = (
+        (items['certainty'] == 'None at all (needs planning)') |
+        (items['complexity'] == 'No idea yet') |
+        (items['time_estimate'] == 'No idea')
+    ).to_numpy()
+    
+    # DECISION TREE
+    planning = np.where(has_due_date, is_ambiguous, is_important)
+    regular = has_due_date & ~is_ambiguous
+    backlog = ~has_due_date & ~is_important
+    
+    time_mapping = {'Less than an hour': 0.5, 'More than an hour': 2.0, 'Many hours': 4.0, 'No idea': 1.0}
+    needs_wizard = (items['time_estimate'] == 'Many hours') | (items['complexity_value'] == 5)
+    task_names = items['task_name'].where(~needs_wizard, items['task_name'] + " [NEEDS BREAKDOWN]")
+    
+    tasks = pd.DataFrame({
+        'Project': np.where(planning, 'Planning', 'General'),
+        'Task': np.where(planning, "[PLANNING] " + items['task_name'], task_names),
+        'Estimated Time': np.where(planning, 0.5, items['time_estimate'].map(time_mapping)),
+        'Due Date': items['due_date'].where(has_due_date, today + timedelta(days=1)),
+        'Importance': np.where(is_important, 5, 3),
+        'Complexity': np.where(planning, 2, items['complexity_value'].fillna(3)),
+    }, index=items.index)[planning | regular]
+    
+    ideas = items[backlog]
+    backlog_items = pd.DataFrame({
+        'Idea': ideas['task_name'],
+        'Category': 'General',
+        'Description': (
+            "Complexity: " + ideas['complexity'] + ", Time: " + ideas['time_estimate']
+            + ", Important: " + np.where(ideas['importance'], 'Yes', 'No')
+        ),
+        'Creation Date': pd.Timestamp.now(),
+        'Status': 'New',
+    }, index=ideas.index)
+    return tasks, backlog_items
+
+@instrumented
+def show_quick_add():
+    """
+    Add many tasks at once, one per line, routed like wizard submissions.
+    """
+    st.subheader("Quick add")
+    st.caption(QUICK_ADD_HELP)
+    if 'quick_add_revision' not in st.session_state:
+        st.session_state.quick_add_revision = 0
+    text = st.text_area("Tasks", key=f"quick_add_{st.session_state.quick_add_revision}", height=200,
+                        placeholder="Book flights ! due:this-week t:short c:1\nRedesign onboarding t:many c:5 due:2026-12-01")
+    if not text.strip():
+        return
+    
+    items, errors = parse_quick_add(text)
+    tasks, backlog_items = route_intake_batch(items)
+    
+    preview = pd.concat([
+        pd.DataFrame({'Line': tasks.index, 'Goes to': 'Tasks', 'Item': tasks['Task'].to_numpy()}),
+        pd.DataFrame({'Line': backlog_items.index, 'Goes to': 'Backlog', 'Item': backlog_items['Idea'].to_numpy()}),
+    ]).sort_values('Line')
+    st.dataframe(preview, use_container_width=True, hide_index=True)
+    if not errors.empty:
+        st.warning(f"{len(errors)} lines can't be added:")
+        st.dataframe(errors, use_container_width=True, hide_index=True)
+    
+    if st.button("Add All", disabled=preview.empty):
+        try:
+            added_tasks = add_tasks(tasks)
+            added_ideas = add_backlog_items(backlog_items)
+            st.success(f"Added {added_tasks} tasks and {added_ideas} backlog items.")
+            # Start over with an empty text area
+            st.session_state.quick_add_revision += 1
+        except Exception as e:
+            st.error(f"Error adding tasks: {str(e)}")
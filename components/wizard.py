@@ -2,7 +2,14 @@ import streamlit as st
 import pandas as pd
 import math
 from datetime import datetime
-from models.task import load_tasks, save_tasks, get_large_tasks
+from models.task import (
+    load_tasks, get_large_tasks, update_task_fields,
+    split_task, replace_with_iterative_project, add_planning_task
+)
+from utils.instrumentation import instrumented
+
+# Shown when the task was changed in another session after the wizard loaded it
+CONFLICT_MESSAGE = "This task was changed in another session since the wizard loaded it. Cancel and start the wizard again to load the latest version."
 
 def start_wizard():
     """
@@ -36,6 +43,7 @@ def prev_wizard_step():
     """
     st.session_state.wizard_step = max(1, st.session_state.wizard_step - 1)
 
+@instrumented
 def run_wizard():
     """
     Run the task breakdown wizard interface.
@@ -227,25 +235,19 @@ def handle_planning_session(idx, task, task_name, hours):
             st.rerun()
         
         if create_planning:
-            # Load tasks to ensure we're working with the latest data
-            tasks_df = load_tasks()
-            
-            # Add the planning task
-            new_task = pd.DataFrame({
+            new_task = {
                 'Project': task['Project'] if 'Project' in task else "Planning",
                 'Task': planning_task_name,
                 'Estimated Time': planning_hours,
                 'Due Date': pd.to_datetime(planning_date),
                 'Importance': 4,  # High importance
                 'Complexity': 2   # Moderate complexity
-            })
-            
-            # Update original task description to show it's pending planning
-            tasks_df.at[idx, 'Task'] = f"{task_name} [PENDING PLANNING]"
+            }
             
-            # Add planning task and save
-            tasks_df = pd.concat([tasks_df, new_task], ignore_index=True)
-            save_tasks(tasks_df)
+            # Add the planning task and mark the original as pending planning
+            if add_planning_task(task['id'], new_task, expected_version=task['version']) is None:
+                st.warning(CONFLICT_MESSAGE)
+                return
             
             # Show success message
             st.success("Created planning task. The original task has been marked as pending planning.")
@@ -332,26 +334,14 @@ def handle_break_into_subtasks(idx, task, task_name, hours):
             st.rerun()
         
         if create_subtasks:
-            # Load tasks to ensure we're working with the latest data
-            tasks_df = load_tasks()
-            
-            # Create new subtask rows
-            new_tasks = []
-            for i in range(num_subtasks):
-                task_dict = task.copy()
-                task_dict['Task'] = subtask_names[i]
-                task_dict['Estimated Time'] = subtask_hours[i]
-                new_tasks.append(task_dict)
-            
-            # Remove the original task
-            tasks_df = tasks_df.drop(idx)
-            
-            # Add new subtasks
-            new_tasks_df = pd.DataFrame(new_tasks)
-            tasks_df = pd.concat([tasks_df, new_tasks_df], ignore_index=True)
-            
-            # Save changes
-            save_tasks(tasks_df)
+            # Replace the original task with the subtasks
+            subtask_ids = split_task(task['id'], [
+                {'Task': subtask_names[i], 'Estimated Time': subtask_hours[i]}
+                for i in range(num_subtasks)
+            ], expected_version=task['version'])
+            if subtask_ids is None:
+                st.warning(CONFLICT_MESSAGE)
+                return
             
             # Show success message
             st.success(f"Created {num_subtasks} subtasks. Original task has been removed.")
@@ -412,25 +402,19 @@ def handle_focus_sessions(idx, task, task_name, hours):
             st.rerun()
         
         if create_sessions:
-            # Load tasks to ensure we're working with the latest data
-            tasks_df = load_tasks()
+            # Add metadata about sessions
+            fields = {
+                'Focus Sessions': num_sessions,
+                'Session Length': session_length
+            }
             
-            # Update the task
             # Update name if requested
             if update_name:
-                tasks_df.at[idx, 'Task'] = new_name
-            
-            # Add metadata about sessions - make sure columns exist
-            if 'Focus Sessions' not in tasks_df.columns:
-                tasks_df['Focus Sessions'] = None
-            if 'Session Length' not in tasks_df.columns:
-                tasks_df['Session Length'] = None
-            
-            tasks_df.at[idx, 'Focus Sessions'] = num_sessions
-            tasks_df.at[idx, 'Session Length'] = session_length
+                fields['Task'] = new_name
             
-            # Save changes
-            save_tasks(tasks_df)
+            if not update_task_fields(task['id'], fields, expected_version=task['version']):
+                st.warning(CONFLICT_MESSAGE)
+                return
             
             # Show success message
             st.success(f"Updated task to use {num_sessions} focus sessions of {session_length}h each.")
@@ -477,34 +461,10 @@ def handle_iterative_project(idx, task, task_name, hours):
             st.rerun()
         
         if create_project:
-            # Load tasks to ensure we're working with the latest data
-            tasks_df = load_tasks()
-            
-            # Copy most attributes from original task
-            task_dict = task.copy()
-            
-            exploration_task = task_dict.copy()
-            exploration_task['Project'] = f"Iterative: {task_name}"
-            exploration_task['Task'] = f"Initial exploration: {task_name}"
-            exploration_task['Estimated Time'] = exploration_hours
-            
-            remaining_task = task_dict.copy()
-            remaining_task['Project'] = f"Iterative: {task_name}"
-            remaining_task['Task'] = f"{task_name} [REMAINING WORK]"
-            remaining_task['Estimated Time'] = hours - exploration_hours
-            
-            # Convert to DataFrames
-            exploration_df = pd.DataFrame([exploration_task])
-            remaining_df = pd.DataFrame([remaining_task])
-            
-            # Remove the original task
-            tasks_df = tasks_df.drop(idx)
-            
-            # Add new tasks
-            tasks_df = pd.concat([tasks_df, exploration_df, remaining_df], ignore_index=True)
-            
-            # Save changes
-            save_tasks(tasks_df)
+            # Replace the original task with an exploration session and the remaining work
+            if replace_with_iterative_project(task['id'], exploration_hours, expected_version=task['version']) is None:
+                st.warning(CONFLICT_MESSAGE)
+                return
             
             # Show success message
             st.success("Created iterative project structure with initial exploration session and placeholder for remaining work.")
@@ -551,21 +511,16 @@ def handle_fixed_event(idx, task, task_name, hours):
             st.rerun()
         
         if mark_fixed:
-            # Load tasks to ensure we're working with the latest data
-            tasks_df = load_tasks()
+            # Add metadata about fixed event
+            fields = {'Fixed Event': True}
             
             # Update the task name if requested
             if update_name:
-                tasks_df.at[idx, 'Task'] = new_name
-            
-            # Add metadata about fixed event - make sure column exists
-            if 'Fixed Event' not in tasks_df.columns:
-                tasks_df['Fixed Event'] = False
-            
-            tasks_df.at[idx, 'Fixed Event'] = True
+                fields['Task'] = new_name
             
-            # Save changes
-            save_tasks(tasks_df)
+            if not update_task_fields(task['id'], fields, expected_version=task['version']):
+                st.warning(CONFLICT_MESSAGE)
+                return
             
             # Show success message
             st.success(f"Marked '{task_name}' as a fixed event.")
@@ -1,7 +1,10 @@
 import pandas as pd
 import os
 from datetime import datetime
-from utils.db_utils import table_to_df, df_to_table, execute_query
+from utils.db_utils import (
+    table_to_df, execute_query, query_to_df, to_sql_timestamp, search_table,
+    transaction, journal_batched, insert_row, insert_rows, update_row, delete_row, save_changes
+)
 
 def load_backlog():
     """
@@ -9,53 +12,142 @@ def load_backlog():
     """
     return table_to_df('backlog')
 
-def save_backlog(backlog_df):
+def save_backlog_changes(original_df, edited_df):
     """
-    Save backlog data to SQLite database.
+    Save the backlog rows changed between a loaded copy and its edited version.
+    
+    Rows changed by another session in the meantime are returned as conflicts
+    (see utils.db_utils.save_changes) instead of being overwritten.
     """
-    return df_to_table(backlog_df, 'backlog')
+    return save_changes('backlog', original_df, edited_df)
 
 def add_backlog_item(idea_data):
     """
     Add a new item to the backlog.
-    """
-    backlog_df = load_backlog()
     
+    Returns:
+        int: id of the new item
+    """
     # Ensure creation date is set if not provided
     if 'Creation Date' not in idea_data or pd.isna(idea_data['Creation Date']):
         idea_data['Creation Date'] = pd.Timestamp.now()
-        
-    new_item = pd.DataFrame([idea_data])
-    backlog_df = pd.concat([backlog_df, new_item], ignore_index=True)
-    return save_backlog(backlog_df)
+    
+    with transaction() as conn:
+        return insert_row(conn, 'backlog', idea_data)
+
+def add_backlog_items(backlog_df):
+    """
+    Add many items to the backlog in one transaction, undone in one step.
+    
+    Returns:
+        int: Number of items added
+    """
+    backlog_df = backlog_df.copy()
+    if 'Creation Date' not in backlog_df.columns:
+        backlog_df['Creation Date'] = pd.NaT
+    backlog_df['Creation Date'] = pd.to_datetime(backlog_df['Creation Date']).fillna(pd.Timestamp.now())
+    with transaction() as conn, journal_batched(conn, 'backlog'):
+        return insert_rows(conn, 'backlog', backlog_df)
+
+def delete_backlog_item(item_id, expected_version=None):
+    """
+    Delete a backlog item by its database id.
+    
+    Pass the version the item was loaded with to refuse the delete if
+    another session changed the item in the meantime.
+    
+    Returns:
+        bool: True if the item was deleted
+    """
+    with transaction() as conn:
+        return delete_row(conn, 'backlog', item_id, expected_version=expected_version)
 
-def delete_backlog_item(idx):
+def convert_backlog_item_to_task(item_id, task_data):
     """
-    Delete a backlog item by index.
+    Turn a backlog item into a task in a single transaction.
+    
+    The task is inserted and the backlog row deleted together, so the item
+    never ends up in both tables (or neither).
+    
+    Args:
+        item_id: Database id of the backlog item
+        task_data (dict): Column values for the new task
+        
+    Returns:
+        int: id of the new task, or None if the backlog item no longer exists
     """
-    backlog_df = load_backlog()
-    backlog_df = backlog_df.drop(idx)
-    return save_backlog(backlog_df)
+    with transaction() as conn:
+        cursor = conn.execute("DELETE FROM backlog WHERE id = ?", (int(item_id),))
+        if cursor.rowcount == 0:
+            return None
+        return insert_row(conn, 'tasks', task_data)
 
-def update_backlog_item(idx, item_data):
+def update_backlog_item(item_id, item_data, expected_version=None):
     """
-    Update an existing backlog item.
+    Update some columns of an existing backlog item.
+    
+    Pass the version the item was loaded with to refuse the update if
+    another session changed the item in the meantime.
+    
+    Returns:
+        bool: True if the item was updated
     """
-    backlog_df = load_backlog()
-    for key, value in item_data.items():
-        backlog_df.at[idx, key] = value
-    return save_backlog(backlog_df)
+    with transaction() as conn:
+        return update_row(conn, 'backlog', item_id, item_data, expected_version=expected_version)
 
-def filter_backlog(categories=None, statuses=None):
+def filter_backlog(categories=None, statuses=None, start_date=None, end_date=None):
+    """
+    Filter backlog by categories, statuses and/or a creation-date range.
+    
+    The filters are applied as SQL WHERE clauses so only matching rows are loaded.
+    Both ends of the date range are inclusive.
     """
-    Filter backlog by categories and/or statuses.
+    conditions = []
+    params = []
+    
+    if categories:
+        conditions.append(f"Category IN ({', '.join('?' for _ in categories)})")
+        params.extend(categories)
+    if statuses:
+        conditions.append(f"Status IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+    if start_date is not None:
+        conditions.append('"Creation Date" >= ?')
+        params.append(to_sql_timestamp(pd.Timestamp(start_date).normalize()))
+    if end_date is not None:
+        conditions.append('"Creation Date" < ?')
+        params.append(to_sql_timestamp(pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)))
+    
+    query = "SELECT * FROM backlog"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY id"
+    
+    return query_to_df(query, params)
+
+def get_backlog_filter_options():
     """
-    backlog_df = load_backlog()
+    Get the distinct categories and statuses present in the backlog.
     
-    if not backlog_df.empty:
-        if categories:
-            backlog_df = backlog_df[backlog_df['Category'].isin(categories)]
-        if statuses:
-            backlog_df = backlog_df[backlog_df['Status'].isin(statuses)]
-            
-    return backlog_df
+    Returns:
+        tuple: (categories, statuses) as sorted lists
+    """
+    categories = execute_query(
+        "SELECT DISTINCT Category FROM backlog WHERE Category IS NOT NULL ORDER BY Category", fetch=True
+    )
+    statuses = execute_query(
+        "SELECT DISTINCT Status FROM backlog WHERE Status IS NOT NULL ORDER BY Status", fetch=True
+    )
+    return [row[0] for row in categories], [row[0] for row in statuses]
+
+def backlog_is_empty():
+    """
+    Check whether the backlog has any items without loading it.
+    """
+    return not execute_query("SELECT 1 FROM backlog LIMIT 1", fetch=True)
+
+def search_backlog(text, limit=20):
+    """
+    Full-text search backlog ideas and descriptions, best matches first.
+    """
+    return search_table('backlog', text, limit)
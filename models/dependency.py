@@ -0,0 +1,54 @@
+from utils.db_utils import query_to_df, transaction
+
+def load_dependencies():
+    """
+    Load every dependency edge as (task_id, depends_on) rows.
+    """
+    return query_to_df("SELECT task_id, depends_on FROM task_dependencies ORDER BY id")
+
+def insert_dependency(task_id, depends_on):
+    """
+    Record that task_id can't start before depends_on is done.
+    
+    This doesn't check for cycles; use scheduling.dependencies.add_dependency().
+    """
+    with transaction() as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO task_dependencies (task_id, depends_on) VALUES (?, ?)",
+            (int(task_id), int(depends_on))
+        )
+
+def delete_dependency(task_id, depends_on):
+    """
+    Remove a dependency edge.
+    """
+    with transaction() as conn:
+        conn.execute(
+            "DELETE FROM task_dependencies WHERE task_id = ? AND depends_on = ?",
+            (int(task_id), int(depends_on))
+        )
+
+def chain_dependencies(conn, task_ids):
+    """
+    Make each task depend on the one before it, inside an open transaction.
+    """
+    conn.executemany(
+        "INSERT OR IGNORE INTO task_dependencies (task_id, depends_on) VALUES (?, ?)",
+        [(int(later), int(earlier)) for earlier, later in zip(task_ids, task_ids[1:])]
+    )
+
+def replace_in_dependencies(conn, old_id, first_id, last_id):
+    """
+    Hand a task's dependencies over to the tasks replacing it, inside an open transaction.
+    
+    Whatever the old task waited for, the first replacement now waits for;
+    whatever waited for the old task now waits for the last replacement.
+    """
+    conn.execute(
+        "UPDATE OR IGNORE task_dependencies SET task_id = ?, version = version + 1 WHERE task_id = ?",
+        (int(first_id), int(old_id))
+    )
+    conn.execute(
+        "UPDATE OR IGNORE task_dependencies SET depends_on = ?, version = version + 1 WHERE depends_on = ?",
+        (int(last_id), int(old_id))
+    )
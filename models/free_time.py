@@ -1,5 +1,8 @@
 import pandas as pd
-from utils.db_utils import table_to_df, df_to_table, execute_query
+from utils.db_utils import (
+    table_to_df, query_to_df, to_sql_timestamp,
+    transaction, insert_row, fetch_row, update_row, delete_row, save_changes
+)
 
 def load_free_time():
     """
@@ -7,51 +10,58 @@ def load_free_time():
     """
     return table_to_df('free_time')
 
-def save_free_time(free_time_df):
+def save_free_time_changes(original_df, edited_df):
     """
-    Save free time data to SQLite database.
+    Save the free time rows changed between a loaded copy and its edited version.
+    
+    Rows changed by another session in the meantime are returned as conflicts
+    (see utils.db_utils.save_changes) instead of being overwritten.
     """
-    return df_to_table(free_time_df, 'free_time')
+    return save_changes('free_time', original_df, edited_df)
 
 def add_free_time(date, hours):
     """
     Add hours to a specific date.
     """
-    free_time_df = load_free_time()
-    date = pd.to_datetime(date)
-    
-    # Check if date already exists
-    if not free_time_df.empty and date in free_time_df['Date'].values:
-        idx = free_time_df[free_time_df['Date'] == date].index[0]
-        free_time_df.at[idx, 'Available Hours'] += float(hours)
-    else:
-        new_row = pd.DataFrame({'Date': [date], 'Available Hours': [float(hours)]})
-        free_time_df = pd.concat([free_time_df, new_row], ignore_index=True)
-    
-    return save_free_time(free_time_df)
+    with transaction() as conn:
+        adjust_free_time(conn, pd.Timestamp(date).normalize(), float(hours))
+    return True
 
 def subtract_free_time(date, hours):
     """
-    Subtract hours from a specific date.
+    Subtract hours from a specific date; a date left with no hours is removed.
+    
+    The date's time slots are trimmed to the hours left, in the same transaction.
+    
+    Returns:
+        bool: False if the date has no free time to subtract from
+    """
+    date = pd.Timestamp(date).normalize()
+    with transaction() as conn:
+        if not adjust_free_time(conn, date, -float(hours)):
+            return False
+        trim_free_time_slots(conn, date)
+        return True
+
+def swap_free_time_dates(first, second):
     """
-    free_time_df = load_free_time()
-    date = pd.to_datetime(date)
+    Swap the dates of two free time entries in one transaction.
     
-    # Check if date exists
-    if not free_time_df.empty and date in free_time_df['Date'].values:
-        idx = free_time_df[free_time_df['Date'] == date].index[0]
-        current_hours = float(free_time_df.at[idx, 'Available Hours'])
-        new_hours = max(0, current_hours - float(hours))  # Prevent negative hours
+    Args:
+        first, second: Entries as loaded, with their 'id', 'Date' and 'version'
         
-        if new_hours == 0:
-            # Remove the date if hours reduced to 0
-            free_time_df = free_time_df.drop(idx)
-        else:
-            free_time_df.at[idx, 'Available Hours'] = new_hours
-            
-        return save_free_time(free_time_df)
-    else:
-        return False  # Cannot subtract from non-existent date
+    Returns:
+        bool: True if swapped; False, with nothing changed, if another
+        session changed either entry in the meantime
+    """
+    with transaction() as conn:
+        swapped = (
+            update_row(conn, 'free_time', first['id'], {'Date': second['Date']}, expected_version=first['version'])
+            and update_row(conn, 'free_time', second['id'], {'Date': first['Date']}, expected_version=second['version'])
+        )
+        if not swapped:
+            conn.rollback()
+        return swapped
 
 def get_total_free_time():
     """
@@ -70,10 +80,145 @@ def get_total_free_time():
     
     return float(total)
 
-def delete_free_time(idx):
+def get_capacity_by_date():
     """
-    Delete a free time entry by index.
+    Total available hours per date, aggregated in the database.
     """
-    free_time_df = load_free_time()
-    free_time_df = free_time_df.drop(idx)
-    return save_free_time(free_time_df)
+    return query_to_df(
+        'SELECT Date, SUM("Available Hours") AS "Available Hours" FROM free_time GROUP BY Date'
+    )
+
+def delete_free_time(free_time_id, expected_version=None):
+    """
+    Delete a free time entry by its database id.
+    
+    Pass the version the entry was loaded with to refuse the delete if
+    another session changed the entry in the meantime. The date's time slots
+    are trimmed to the hours left, in the same transaction.
+    
+    Returns:
+        bool: True if the entry was deleted
+    """
+    with transaction() as conn:
+        entry = fetch_row(conn, 'free_time', free_time_id)
+        if entry is None or not delete_row(conn, 'free_time', free_time_id, expected_version=expected_version):
+            return False
+        if pd.notnull(entry['Date']):
+            trim_free_time_slots(conn, pd.Timestamp(entry['Date']).normalize())
+        return True
+
+def load_free_time_slots():
+    """
+    Load free time slots from SQLite database, earliest first.
+    """
+    return query_to_df('SELECT * FROM free_time_slots ORDER BY Start')
+
+def add_free_time_slot(start, end):
+    """
+    Add a free time slot and count its hours in that date's free time, in one transaction.
+    
+    Args:
+        start: Start of the slot
+        end: End of the slot, on the same day
+        
+    Returns:
+        int: id of the new slot, or None if the slot is empty, spans midnight
+        or overlaps an existing slot
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    if end <= start or end > start.normalize() + pd.Timedelta(days=1):
+        return None
+    
+    with transaction() as conn:
+        overlapping = conn.execute(
+            'SELECT 1 FROM free_time_slots WHERE Start < ? AND "End" > ? LIMIT 1',
+            (to_sql_timestamp(end), to_sql_timestamp(start))
+        ).fetchone()
+        if overlapping:
+            return None
+        
+        slot_id = insert_row(conn, 'free_time_slots', {'Start': start, 'End': end})
+        adjust_free_time(conn, start.normalize(), (end - start).total_seconds() / 3600)
+        return slot_id
+
+def delete_free_time_slot(slot_id):
+    """
+    Delete a free time slot and take its hours off that date's free time, in one transaction.
+    """
+    with transaction() as conn:
+        slot = fetch_row(conn, 'free_time_slots', slot_id)
+        if slot is None:
+            return False
+        
+        start, end = pd.Timestamp(slot['Start']), pd.Timestamp(slot['End'])
+        conn.execute("DELETE FROM free_time_slots WHERE id = ?", (int(slot_id),))
+        adjust_free_time(conn, start.normalize(), -(end - start).total_seconds() / 3600)
+        return True
+
+def trim_free_time_slots(conn, date):
+    """
+    Shorten or delete a date's time slots, latest first, until their hours
+    fit in the date's free time, inside an open transaction.
+    """
+    date = pd.Timestamp(date).normalize()
+    available = conn.execute(
+        'SELECT COALESCE(SUM("Available Hours"), 0) FROM free_time WHERE Date = ?', (to_sql_timestamp(date),)
+    ).fetchone()[0]
+    slots = conn.execute(
+        'SELECT id, Start, "End" FROM free_time_slots WHERE Start >= ? AND Start < ? ORDER BY Start DESC',
+        (to_sql_timestamp(date), to_sql_timestamp(date + pd.Timedelta(days=1)))
+    ).fetchall()
+    
+    excess = pd.Timedelta(hours=sum(
+        (pd.Timestamp(end) - pd.Timestamp(start)).total_seconds() / 3600 for _, start, end in slots
+    ) - max(float(available), 0))
+    for slot_id, start, end in slots:
+        if excess <= pd.Timedelta(0):
+            break
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if end - start <= excess:
+            delete_row(conn, 'free_time_slots', slot_id)
+        else:
+            update_row(conn, 'free_time_slots', slot_id, {'End': end - excess})
+        excess -= end - start
+
+def adjust_free_time(conn, date, hours):
+    """
+    Add (or with negative hours, remove) hours on a date inside an open transaction.
+    
+    Rows are changed one at a time by id, so a date that has several rows
+    gets the hours once: added to its first row, or removed from its rows
+    in order. A row left with no hours is removed. Each change is a single
+    UPDATE, so concurrent changes to the same date add up.
+    
+    Returns:
+        bool: False if hours were to be removed from a date without free time
+    """
+    date = to_sql_timestamp(date)
+    rows = conn.execute(
+        'SELECT id, "Available Hours" FROM free_time WHERE Date = ? ORDER BY id', (date,)
+    ).fetchall()
+    if not rows:
+        if hours <= 0:
+            return False
+        insert_row(conn, 'free_time', {'Date': date, 'Available Hours': float(hours)})
+        return True
+    
+    if hours > 0:
+        changes = [(rows[0][0], float(hours))]
+    else:
+        changes, remaining = [], -float(hours)
+        for row_id, available in rows:
+            if remaining <= 0:
+                break
+            taken = min(float(available or 0), remaining)
+            changes.append((row_id, -taken))
+            remaining -= taken
+    
+    for row_id, change in changes:
+        conn.execute(
+            'UPDATE free_time SET "Available Hours" = "Available Hours" + ?, version = version + 1 WHERE id = ?',
+            (change, row_id)
+        )
+        conn.execute('DELETE FROM free_time WHERE id = ? AND "Available Hours" <= 0', (row_id,))
+    return True
@@ -1,7 +1,12 @@
 import pandas as pd
 from datetime import datetime
 import math
-from utils.db_utils import table_to_df, df_to_table, execute_query
+from utils.db_utils import (
+    table_to_df, execute_query, search_table, query_to_df, iter_query,
+    transaction, journal_batched, insert_row, insert_rows, fetch_row, update_row, delete_row, save_changes
+)
+from models.dependency import chain_dependencies, replace_in_dependencies
+from utils.instrumentation import instrumented
 
 def load_tasks():
     """
@@ -9,37 +14,184 @@ def load_tasks():
     """
     return table_to_df('tasks')
 
-def save_tasks(tasks_df):
+def load_active_tasks():
     """
-    Save tasks to the SQLite database.
+    Load the tasks that still need scheduling, i.e. those not marked completed.
     """
-    return df_to_table(tasks_df, 'tasks')
+    return query_to_df('SELECT * FROM tasks WHERE "Completed Date" IS NULL')
 
 def add_task(task_data):
     """
     Add a new task to the database.
+    
+    Returns:
+        int: id of the new task
     """
-    tasks_df = load_tasks()
-    new_task = pd.DataFrame([task_data])
-    tasks_df = pd.concat([tasks_df, new_task], ignore_index=True)
-    return save_tasks(tasks_df)
+    with transaction() as conn:
+        return insert_row(conn, 'tasks', task_data)
 
-def delete_task(task_idx):
+def add_tasks(tasks_df):
     """
-    Delete a task by index.
+    Add many tasks to the database in one transaction, undone in one step.
+    
+    Returns:
+        int: Number of tasks added
     """
-    tasks_df = load_tasks()
-    tasks_df = tasks_df.drop(task_idx)
-    return save_tasks(tasks_df)
+    with transaction() as conn, journal_batched(conn, 'tasks'):
+        return insert_rows(conn, 'tasks', tasks_df)
 
-def update_task(task_idx, task_data):
+def delete_task(task_id, expected_version=None):
     """
-    Update an existing task.
+    Delete a task by its database id.
+    
+    Pass the version the task was loaded with to refuse the delete if
+    another session changed the task in the meantime.
+    
+    Returns:
+        bool: True if the task was deleted
     """
-    tasks_df = load_tasks()
-    for key, value in task_data.items():
-        tasks_df.at[task_idx, key] = value
-    return save_tasks(tasks_df)
+    with transaction() as conn:
+        return delete_row(conn, 'tasks', task_id, expected_version=expected_version)
+
+def update_task(task_id, task_data, expected_version=None):
+    """
+    Update an existing task; see update_task_fields().
+    """
+    return update_task_fields(task_id, task_data, expected_version=expected_version)
+
+def save_task_changes(original_df, edited_df):
+    """
+    Save the rows changed between a loaded tasks table and its edited copy.
+    
+    Rows changed by another session in the meantime are returned as conflicts
+    (see utils.db_utils.save_changes) instead of being overwritten.
+    """
+    return save_changes('tasks', original_df, edited_df)
+
+def update_task_fields(task_id, fields, expected_version=None):
+    """
+    Update some columns of one task (e.g. name or focus session metadata).
+    
+    Pass the version the task was loaded with to refuse the update if
+    another session changed the task in the meantime.
+    
+    Returns:
+        bool: True if the task was updated
+    """
+    with transaction() as conn:
+        return update_row(conn, 'tasks', task_id, fields, expected_version=expected_version)
+
+def fetch_task(conn, task_id, expected_version=None):
+    """
+    Fetch a task inside an open transaction, unless it was changed since expected_version.
+    
+    Returns:
+        dict: Column values, or None if the task doesn't exist or has another version
+    """
+    task = fetch_row(conn, 'tasks', task_id)
+    if task is None or (expected_version is not None and task['version'] != int(expected_version)):
+        return None
+    return task
+
+def split_task(task_id, subtasks, expected_version=None):
+    """
+    Replace a task with subtasks in a single transaction.
+    
+    Each subtask inherits the original task's columns, overridden by its own values,
+    and depends on the subtask before it.
+    
+    Args:
+        task_id: Database id of the task to split
+        subtasks (list): One dict per subtask, e.g. {'Task': ..., 'Estimated Time': ...}
+        expected_version (int, optional): Version the task was loaded with
+        
+    Returns:
+        list: ids of the new subtasks, or None if the task no longer exists
+        or was changed since expected_version
+    """
+    with transaction() as conn:
+        original = fetch_task(conn, task_id, expected_version)
+        if original is None:
+            return None
+        
+        del original['id']
+        subtask_ids = [insert_row(conn, 'tasks', {**original, **subtask}) for subtask in subtasks]
+        chain_dependencies(conn, subtask_ids)
+        if subtask_ids:
+            replace_in_dependencies(conn, task_id, subtask_ids[0], subtask_ids[-1])
+        conn.execute("DELETE FROM tasks WHERE id = ?", (int(task_id),))
+        return subtask_ids
+
+def replace_with_iterative_project(task_id, exploration_hours, expected_version=None):
+    """
+    Replace a task with an initial exploration session plus the remaining work,
+    which depends on the exploration.
+    
+    Returns:
+        list: [exploration_id, remaining_id], or None if the task no longer exists
+        or was changed since expected_version
+    """
+    with transaction() as conn:
+        original = fetch_task(conn, task_id, expected_version)
+        if original is None:
+            return None
+        
+        task_name = original['Task']
+        hours = float(original['Estimated Time'] or 0)
+        project = f"Iterative: {task_name}"
+        
+        del original['id']
+        exploration_id = insert_row(conn, 'tasks', {
+            **original,
+            'Project': project,
+            'Task': f"Initial exploration: {task_name}",
+            'Estimated Time': exploration_hours
+        })
+        remaining_id = insert_row(conn, 'tasks', {
+            **original,
+            'Project': project,
+            'Task': f"{task_name} [REMAINING WORK]",
+            'Estimated Time': hours - exploration_hours
+        })
+        chain_dependencies(conn, [exploration_id, remaining_id])
+        replace_in_dependencies(conn, task_id, exploration_id, remaining_id)
+        conn.execute("DELETE FROM tasks WHERE id = ?", (int(task_id),))
+        return [exploration_id, remaining_id]
+
+def add_planning_task(task_id, planning_task, expected_version=None):
+    """
+    Add a planning task and mark the original task as pending planning, in one transaction.
+    
+    The original task depends on the planning task.
+    
+    Returns:
+        int: id of the planning task, or None if the original task no longer
+        exists or was changed since expected_version
+    """
+    with transaction() as conn:
+        original = fetch_task(conn, task_id, expected_version)
+        if original is None:
+            return None
+        
+        update_row(conn, 'tasks', task_id, {'Task': f"{original['Task']} [PENDING PLANNING]"})
+        planning_id = insert_row(conn, 'tasks', planning_task)
+        chain_dependencies(conn, [planning_id, task_id])
+        return planning_id
+
+def search_tasks(text, limit=20):
+    """
+    Full-text search task names and projects, best matches first.
+    """
+    return search_table('tasks', text, limit)
+
+def get_demand_by_due_date():
+    """
+    Total estimated hours per due date of the tasks not yet completed, aggregated in the database.
+    """
+    return query_to_df(
+        'SELECT "Due Date", SUM("Estimated Time") AS "Estimated Time" FROM tasks '
+        'WHERE "Due Date" IS NOT NULL AND "Completed Date" IS NULL GROUP BY "Due Date"'
+    )
 
 def get_large_tasks():
     """
@@ -48,13 +200,15 @@ def get_large_tasks():
     tasks_df = load_tasks()
     large_tasks = []
     
-    for idx, task in tasks_df.iterrows():
+    # Keep load_tasks() labels, which the breakdown wizard looks tasks up by
+    for idx, task in tasks_df[tasks_df['Completed Date'].isna()].iterrows():
         estimated_time = float(task['Estimated Time']) if pd.notnull(task['Estimated Time']) else 0
         if estimated_time > 6 and not any(tag in str(task['Task']) for tag in ['[MULTI-SESSION]', '[FIXED EVENT]', '[PENDING PLANNING]']):
             large_tasks.append((idx, task))
     
     return large_tasks
 
+@instrumented
 def calculate_task_priority(tasks_df):
     """
     Calculate priority score for each task.
@@ -76,3 +230,28 @@ def calculate_task_priority(tasks_df):
     
     tasks_df['Priority Score'] = tasks_df.apply(calc_priority, axis=1)
     return tasks_df.sort_values(by=['Priority Score', 'Complexity'])
+
+def iter_tasks_by_priority(chunk_size=1000):
+    """
+    Yield all active tasks in the order of calculate_task_priority(), in chunks.
+    
+    The priority score is computed and sorted by the database, so tasks
+    never have to be loaded all at once. Chunks are indexed by task id.
+    
+    Args:
+        chunk_size (int): Tasks per DataFrame
+    
+    Yields:
+        pandas.DataFrame: The next chunk of tasks, with a 'Priority Score' column
+    """
+    today = datetime.today().date().isoformat()
+    return iter_query(
+        '''
+        SELECT *, COALESCE(CAST(julianday(date("Due Date")) - julianday(?) AS INTEGER), 9999)
+            - COALESCE(Importance, 0) * 5 AS "Priority Score"
+        FROM tasks
+        WHERE "Completed Date" IS NULL
+        ORDER BY "Priority Score", Complexity IS NULL, Complexity, id
+        ''',
+        params=(today,), chunk_size=chunk_size, index_col='id'
+    )
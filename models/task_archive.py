@@ -0,0 +1,137 @@
+import pandas as pd
+from datetime import datetime, timedelta
+from utils.db_utils import (
+    query_to_df, transaction, quote_identifier, get_table_columns, ensure_columns, to_sql_timestamp
+)
+
+# Completed tasks stay in the task list this long before archive_tasks() moves them
+ARCHIVE_COMPLETED_AFTER_DAYS = 7
+
+# Unfinished tasks this far past their due date count as stale
+ARCHIVE_STALE_AFTER_DAYS = 30
+
+def complete_tasks(task_ids, completed=True):
+    """
+    Mark tasks as completed now, or as not completed.
+    
+    Completed tasks are left out of scheduling and archived by archive_tasks().
+    
+    Returns:
+        int: Number of tasks updated
+    """
+    task_ids = [int(task_id) for task_id in task_ids]
+    completed_date = to_sql_timestamp(datetime.now()) if completed else None
+    with transaction() as conn:
+        cursor = conn.executemany(
+            'UPDATE tasks SET "Completed Date" = ?, version = version + 1 WHERE id = ?',
+            [(completed_date, task_id) for task_id in task_ids]
+        )
+        return cursor.rowcount
+
+def archive_tasks(completed_after_days=ARCHIVE_COMPLETED_AFTER_DAYS, stale_after_days=ARCHIVE_STALE_AFTER_DAYS, now=None):
+    """
+    Move completed and stale tasks from tasks to tasks_archive in bulk.
+    
+    Each kind is moved with one INSERT ... SELECT, and both are removed
+    with one DELETE, in a single transaction. Dependencies on archived
+    tasks are dropped, so the tasks waiting for them can be scheduled.
+    
+    Args:
+        completed_after_days (int, optional): Archive tasks completed at least
+            this many days ago; None keeps completed tasks
+        stale_after_days (int, optional): Archive unfinished tasks due at least
+            this many days ago; None keeps stale tasks
+        now (datetime, optional): Time the policy is applied at
+    
+    Returns:
+        dict: Number of tasks archived as 'completed' and as 'stale'
+    """
+    now = pd.Timestamp(now or datetime.now())
+    policies = {}
+    if completed_after_days is not None:
+        policies['completed'] = (
+            '"Completed Date" IS NOT NULL AND "Completed Date" <= ?',
+            to_sql_timestamp(now - timedelta(days=completed_after_days))
+        )
+    if stale_after_days is not None:
+        # Due dates are compared by day, like the scheduler does
+        policies['stale'] = (
+            '"Completed Date" IS NULL AND date("Due Date") <= date(?)',
+            to_sql_timestamp(now - timedelta(days=stale_after_days))
+        )
+    
+    archived = {'completed': 0, 'stale': 0}
+    if not policies:
+        return archived
+    
+    with transaction() as conn:
+        # Carry over columns added to tasks after the archive was created
+        columns = [col for col in get_table_columns(conn, 'tasks') if col != 'version']
+        ensure_columns(conn, 'tasks_archive', columns)
+        column_list = ', '.join(quote_identifier(col) for col in columns)
+        
+        for reason, (condition, cutoff) in policies.items():
+            cursor = conn.execute(
+                f'INSERT INTO tasks_archive ({column_list}, "Archived Date", "Archive Reason") '
+                f'SELECT {column_list}, ?, ? FROM tasks WHERE {condition}',
+                (to_sql_timestamp(now), reason, cutoff)
+            )
+            archived[reason] = cursor.rowcount
+        
+        conditions = ' OR '.join(f"({condition})" for condition, _ in policies.values())
+        conn.execute(f"DELETE FROM tasks WHERE {conditions}", [cutoff for _, cutoff in policies.values()])
+    return archived
+
+def load_archived_tasks(search=None, reason=None, limit=500):
+    """
+    Load archived tasks, most recently archived first.
+    
+    Args:
+        search (str, optional): Only tasks whose name or project contains this text
+        reason (str, optional): Only tasks archived as 'completed' or 'stale'
+        limit (int): Most tasks returned
+    """
+    conditions = []
+    params = []
+    if search:
+        conditions.append('(Task LIKE ? OR Project LIKE ?)')
+        params += [f"%{search}%"] * 2
+    if reason:
+        conditions.append('"Archive Reason" = ?')
+        params.append(reason)
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return query_to_df(
+        f'SELECT * FROM tasks_archive {where} ORDER BY "Archived Date" DESC, id LIMIT ?',
+        params + [int(limit)]
+    )
+
+def restore_archived_tasks(task_ids):
+    """
+    Move archived tasks back to the task list, keeping their ids.
+    
+    Restored tasks are no longer marked as completed.
+    
+    Returns:
+        int: Number of tasks restored
+    """
+    task_ids = [int(task_id) for task_id in task_ids]
+    if not task_ids:
+        return 0
+    
+    with transaction() as conn:
+        columns = [col for col in get_table_columns(conn, 'tasks') if col != 'version']
+        archive_columns = set(get_table_columns(conn, 'tasks_archive'))
+        columns = [col for col in columns if col in archive_columns]
+        column_list = ', '.join(quote_identifier(col) for col in columns)
+        select_list = ', '.join(
+            'NULL' if col == 'Completed Date' else quote_identifier(col) for col in columns
+        )
+        placeholders = ', '.join('?' for _ in task_ids)
+        
+        cursor = conn.execute(
+            f"INSERT INTO tasks ({column_list}) SELECT {select_list} FROM tasks_archive WHERE id IN ({placeholders})",
+            task_ids
+        )
+        conn.execute(f"DELETE FROM tasks_archive WHERE id IN ({placeholders})", task_ids)
+        return cursor.rowcount
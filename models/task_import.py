@@ -0,0 +1,181 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from utils.db_utils import (
+    transaction, fts_sync_suspended, journal_batched, insert_rows, parse_date_text, to_sql_timestamp
+)
+
+# Columns read from an import file; anything else is ignored
+IMPORT_COLUMNS = ['Project', 'Task', 'Estimated Time', 'Due Date', 'Importance', 'Complexity', 'Focus Sessions', 'Session Length']
+
+# Rows validated and inserted at a time
+IMPORT_CHUNK_ROWS = 10000
+
+# Estimates from this many hours up get flagged for breakdown, like "Many hours" in the intake wizard
+BREAKDOWN_HOURS = 4.0
+
+# Result of import_tasks(); errors has one row per rejected input row
+ImportResult = namedtuple('ImportResult', ['tasks', 'planning', 'backlog', 'errors'])
+
+def read_import_file(file, file_format='csv', chunk_size=IMPORT_CHUNK_ROWS):
+    """
+    Stream task rows from a CSV or JSON Lines file in DataFrame chunks.
+    
+    Rows are indexed by their position in the file, counting from 0.
+    """
+    if file_format == 'jsonl':
+        return pd.read_json(file, lines=True, chunksize=chunk_size, dtype=False, convert_dates=False)
+    return pd.read_csv(file, dtype=str, keep_default_na=False, na_values=[''], chunksize=chunk_size)
+
+def validate_tasks(chunk):
+    """
+    Check and convert a chunk of imported task rows with vectorized checks.
+    
+    Args:
+        chunk (pandas.DataFrame): Raw rows as read from the file
+    
+    Returns:
+        tuple: (valid tasks as a DataFrame with IMPORT_COLUMNS, DataFrame of
+        errors with the 'Row' (1-based), 'Task' and 'Error' of each rejected row)
+    """
+    raw = pd.DataFrame(index=chunk.index)
+    for column in IMPORT_COLUMNS:
+        if column not in chunk.columns:
+            raw[column] = None
+            continue
+        # Everything as text, so CSV and JSON values are checked alike; blanks count as missing
+        values = chunk[column]
+        text = values.astype(str).str.strip()
+        raw[column] = text.where(values.notna() & (text != ''), None)
+    
+    tasks = pd.DataFrame(index=chunk.index)
+    tasks['Project'] = raw['Project'].where(raw['Project'].notna(), 'General')
+    tasks['Task'] = raw['Task']
+    tasks['Estimated Time'] = pd.to_numeric(raw['Estimated Time'], errors='coerce').astype(float)
+    tasks['Due Date'] = parse_date_text(raw['Due Date'])
+    for column in ['Importance', 'Complexity', 'Focus Sessions', 'Session Length']:
+        tasks[column] = pd.to_numeric(raw[column], errors='coerce').astype(float)
+    
+    def unparsed(column):
+        # Given in the file but not convertible
+        return raw[column].notna() & tasks[column].isna()
+    
+    def not_level(column):
+        values = tasks[column]
+        return unparsed(column) | (values.notna() & ((values != values.round()) | (values < 1) | (values > 5)))
+    
+    checks = [
+        (tasks['Task'].isna(), "Task is required"),
+        (unparsed('Estimated Time') | (tasks['Estimated Time'] <= 0), "Estimated Time must be a positive number of hours"),
+        (unparsed('Due Date'), "Due Date is not a date"),
+        (not_level('Importance'), "Importance must be a whole number from 1 to 5"),
+        (not_level('Complexity'), "Complexity must be a whole number from 1 to 5"),
+        (unparsed('Focus Sessions') | (tasks['Focus Sessions'] < 0), "Focus Sessions must be a number of sessions"),
+        (unparsed('Session Length') | (tasks['Session Length'] <= 0), "Session Length must be a positive number of hours"),
+    ]
+    messages = pd.Series('', index=chunk.index)
+    for failed, message in checks:
+        failed = failed.fillna(False).to_numpy(dtype=bool)
+        messages[failed] = messages[failed] + '; ' + message
+    invalid = (messages != '').to_numpy()
+    
+    errors = pd.DataFrame({
+        'Row': chunk.index[invalid] + 1,
+        'Task': tasks['Task'][invalid].to_numpy(),
+        'Error': messages[invalid].str[2:].to_numpy(),
+    })
+    return tasks[~invalid], errors
+
+def route_tasks(tasks, today=None):
+    """
+    Tag and route validated tasks the way the intake wizard does, all at once.
+    
+    Tasks without an estimate or a complexity are ambiguous: with a due date,
+    or without one but important (importance 5), they become a 30-minute
+    [PLANNING] session, due tomorrow if they had no due date; otherwise they
+    go to the backlog. Clear tasks with big estimates or complexity 5 are
+    tagged [NEEDS BREAKDOWN].
+    
+    Returns:
+        tuple: (tasks DataFrame, mask of the planning sessions among them, backlog DataFrame)
+    """
+    today = pd.Timestamp(today or datetime.today().date())
+    tasks = tasks.copy()
+    tasks['Importance'] = tasks['Importance'].fillna(3)
+    
+    ambiguous = (tasks['Estimated Time'].isna() | tasks['Complexity'].isna()).to_numpy()
+    has_due_date = tasks['Due Date'].notna().to_numpy()
+    important = (tasks['Importance'] >= 5).to_numpy()
+    planning = ambiguous & (has_due_date | important)
+    to_backlog = ambiguous & ~planning
+    
+    tasks.loc[planning, 'Project'] = 'Planning'
+    tasks.loc[planning, 'Task'] = '[PLANNING] ' + tasks.loc[planning, 'Task'].astype(str)
+    tasks.loc[planning, 'Estimated Time'] = 0.5
+    tasks.loc[planning, 'Complexity'] = 2
+    tasks.loc[planning, 'Importance'] = np.where(important[planning], 5, 3)
+    tasks.loc[planning & ~has_due_date, 'Due Date'] = today + timedelta(days=1)
+    
+    breakdown = ~ambiguous & (
+        (tasks['Estimated Time'] >= BREAKDOWN_HOURS) | (tasks['Complexity'] == 5)
+    ).to_numpy() & ~tasks['Task'].astype(str).str.contains('[NEEDS BREAKDOWN]', regex=False).to_numpy()
+    tasks.loc[breakdown, 'Task'] = tasks.loc[breakdown, 'Task'].astype(str) + ' [NEEDS BREAKDOWN]'
+    
+    ideas = tasks[to_backlog]
+    # As text even when there are no ideas, which leaves these columns float
+    complexity = ideas['Complexity'].map('{:g}'.format, na_action='ignore').fillna('No idea yet').astype(str)
+    estimate = ideas['Estimated Time'].map('{:g}h'.format, na_action='ignore').fillna('No idea').astype(str)
+    backlog = pd.DataFrame({
+        'Idea': ideas['Task'],
+        'Category': 'General',
+        'Description': (
+            'Project: ' + ideas['Project'].astype(str)
+            + ', Complexity: ' + complexity
+            + ', Time: ' + estimate
+        ),
+        'Creation Date': to_sql_timestamp(datetime.now()),
+        'Status': 'New',
+    })
+    kept = ~to_backlog
+    return tasks[kept], planning[kept], backlog
+
+def import_tasks(file, file_format='csv', chunk_size=IMPORT_CHUNK_ROWS, today=None):
+    """
+    Import tasks from a CSV or JSON Lines file in a single transaction.
+    
+    The file is read in chunks, so large imports don't have to fit in memory.
+    Rows that fail validation are reported and skipped; the rest are tagged,
+    routed like intake wizard submissions and inserted with executemany.
+    Search indexes are rebuilt once at the end rather than row by row, and
+    the new rows are one journal entry per table, so the import is undone
+    in one step.
+    
+    Args:
+        file: Path or file object
+        file_format (str): 'csv' or 'jsonl'
+        chunk_size (int): Rows validated and inserted at a time
+        today (optional): Date planning sessions without a due date count from
+    
+    Returns:
+        ImportResult: Numbers of tasks (planning sessions included), planning
+        sessions and backlog ideas added, and a DataFrame of rejected rows
+    """
+    imported = planned = ideas = 0
+    errors = []
+    with transaction() as conn, \
+            fts_sync_suspended(conn, 'tasks'), fts_sync_suspended(conn, 'backlog'), \
+            journal_batched(conn, 'tasks'), journal_batched(conn, 'backlog'):
+        for chunk in read_import_file(file, file_format, chunk_size):
+            valid, chunk_errors = validate_tasks(chunk)
+            errors.append(chunk_errors)
+            tasks, planning, backlog = route_tasks(valid, today)
+            
+            insert_rows(conn, 'tasks', tasks)
+            insert_rows(conn, 'backlog', backlog)
+            imported += len(tasks)
+            planned += int(planning.sum())
+            ideas += len(backlog)
+    
+    errors = pd.concat(errors, ignore_index=True) if errors else pd.DataFrame(columns=['Row', 'Task', 'Error'])
+    return ImportResult(imported, planned, ideas, errors)
@@ -0,0 +1 @@
+# This file ensures that the scheduling directory is treated as a Python package
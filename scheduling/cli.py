@@ -0,0 +1,163 @@
+# Run the scheduler without the Streamlit UI, e.g. nightly from cron.
+#
+#     python -m scheduling.cli task_scheduler.db
+#     python -m scheduling.cli databases/ --format csv --output schedules/ --jobs 4
+#
+# Each database's allocations, warnings and unallocated tasks are written as
+# JSON or CSV, to stdout for a single database or to <output>/<name>.schedule.json
+# (or .csv). Directories are expanded to the database files they contain, and
+# several databases are scheduled in parallel, one process each.
+# Databases are opened read-only: they are never migrated or written to, and
+# databases an older version left unmigrated fail until the app has opened them.
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from models.task import load_active_tasks
+from models.free_time import load_free_time
+from scheduling.engine import prepare_free_time, ScheduleEvent
+from scheduling.strategies import STRATEGIES, DEFAULT_STRATEGY, get_strategy
+from scheduling.stream import iter_schedule
+from scheduling.export import write_schedule_json, write_events_csv
+from utils.db_utils import use_database, missing_schema
+
+# Files picked up when a directory is given
+DATABASE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+# Tables the schedulers read; without e.g. tasks."Completed Date" every task would look completed
+SCHEDULED_TABLES = ['tasks', 'free_time', 'free_time_slots', 'task_dependencies', 'db_meta']
+
+def find_databases(paths):
+    """
+    Expand directories to the database files directly inside them, in name order.
+    """
+    databases = []
+    for path in paths:
+        if os.path.isdir(path):
+            databases.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.endswith(DATABASE_EXTENSIONS)
+            ))
+        else:
+            databases.append(path)
+    return databases
+
+def iter_events(strategy):
+    """
+    Schedule the current database and yield the events.
+    
+    The default strategy streams from the database; the others need all
+    tasks in memory and are wrapped as events afterwards.
+    """
+    if strategy == DEFAULT_STRATEGY:
+        yield from iter_schedule()
+        return
+    
+    tasks_df = load_active_tasks()
+    if tasks_df.empty:
+        return
+    scheduled_tasks, warnings, unallocated_tasks = get_strategy(strategy)(
+        tasks_df, prepare_free_time(load_free_time())
+    )
+    for entry in scheduled_tasks:
+        yield ScheduleEvent('allocation', entry)
+    for warning in warnings:
+        yield ScheduleEvent('warning', warning)
+    for entry in unallocated_tasks:
+        yield ScheduleEvent('unallocated', entry)
+
+def schedule_database(path, strategy=DEFAULT_STRATEGY, output_format='json', output=None):
+    """
+    Schedule one database file and write the result.
+    
+    Args:
+        path (str): SQLite database file
+        strategy (str): Name of a registered strategy
+        output_format (str): 'json' or 'csv'
+        output (str, optional): Directory to write <name>.schedule.<format> to; stdout if None
+    
+    Returns:
+        tuple: (path, number of records written, seconds taken)
+        
+    Raises:
+        ValueError: If the database needs migrating first
+    """
+    started = time.perf_counter()
+    use_database(path, read_only=True)
+    missing = missing_schema(SCHEDULED_TABLES)
+    if missing:
+        raise ValueError(
+            f"database needs migration (missing {', '.join(missing)}); open it in the app once to migrate it"
+        )
+    events = iter_events(strategy)
+    
+    if output is None:
+        file = sys.stdout
+    else:
+        name = os.path.splitext(os.path.basename(path))[0]
+        file = open(os.path.join(output, f"{name}.schedule.{output_format}"), 'w', newline='', encoding='utf-8')
+    try:
+        if output_format == 'csv':
+            count = write_events_csv(events, file)
+        else:
+            count = write_schedule_json(events, file, database=path, strategy=strategy)
+    finally:
+        if file is not sys.stdout:
+            file.close()
+    
+    return path, count, time.perf_counter() - started
+
+def main(argv=None):
+    """
+    Parse the command line, schedule every database and report each one on stderr.
+    
+    Returns:
+        int: Exit status, 1 if any database failed
+    """
+    parser = argparse.ArgumentParser(description="Schedule tasks in one or more task scheduler databases.")
+    parser.add_argument('paths', nargs='+', help="database files, or directories of them")
+    parser.add_argument('--format', choices=['json', 'csv'], default='json', dest='output_format')
+    parser.add_argument('--output', help="directory for the results (default: stdout, single database only)")
+    parser.add_argument('--strategy', choices=list(STRATEGIES), default=DEFAULT_STRATEGY)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help="databases scheduled in parallel")
+    args = parser.parse_args(argv)
+    
+    databases = find_databases(args.paths)
+    missing = [path for path in databases if not os.path.isfile(path)]
+    if missing:
+        parser.error(f"no such database: {', '.join(missing)}")
+    if not databases:
+        parser.error("no databases found")
+    if args.output is None and len(databases) > 1:
+        parser.error("--output is required for more than one database")
+    if args.output is not None:
+        os.makedirs(args.output, exist_ok=True)
+    
+    jobs = max(1, min(args.jobs, len(databases)))
+    schedule_args = [(path, args.strategy, args.output_format, args.output) for path in databases]
+    if jobs == 1:
+        results = [_schedule_safely(*arguments) for arguments in schedule_args]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(_schedule_safely, *zip(*schedule_args)))
+    
+    failed = 0
+    for path, count, duration, error in results:
+        if error:
+            failed += 1
+            print(f"{path}: failed: {error}", file=sys.stderr)
+        else:
+            print(f"{path}: {count} records in {duration:.2f}s", file=sys.stderr)
+    
+    return 1 if failed else 0
+
+def _schedule_safely(*arguments):
+    # One bad database shouldn't stop the rest of the batch
+    try:
+        return schedule_database(*arguments) + (None,)
+    except Exception as e:
+        return arguments[0], 0, 0.0, str(e)
+
+if __name__ == '__main__':
+    sys.exit(main())
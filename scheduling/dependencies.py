@@ -0,0 +1,248 @@
+import heapq
+import threading
+import pandas as pd
+from models.dependency import load_dependencies, insert_dependency, delete_dependency
+from utils import db_utils
+from utils.db_utils import get_write_generation
+
+class DependencyGraph:
+    """
+    Task dependency DAG that keeps a topological order up to date as edges are added.
+    
+    Adding an edge uses the Pearce-Kelly algorithm: when the edge already agrees
+    with the current order nothing is searched, and otherwise only the tasks
+    positioned between its two ends are visited and reordered. Cycles are found
+    by the same bounded search, so an insert never rescans the whole graph.
+    """
+    
+    def __init__(self):
+        self.successors = {}
+        self.predecessors = {}
+        self.position = {}
+        self._next_position = 0
+    
+    @classmethod
+    def from_edges(cls, edges):
+        """
+        Build a graph from (before, after) pairs in linear time (Kahn's algorithm).
+        
+        Edges that would close a cycle (only possible if rows were written
+        around add_dependency()) are left out.
+        """
+        graph = cls()
+        for before, after in edges:
+            graph.add_node(before)
+            graph.add_node(after)
+            if before != after:
+                graph.successors[before].add(after)
+                graph.predecessors[after].add(before)
+        
+        in_degree = {node: len(preds) for node, preds in graph.predecessors.items()}
+        ready = [node for node, degree in in_degree.items() if degree == 0]
+        order = []
+        while ready:
+            node = ready.pop()
+            order.append(node)
+            for successor in graph.successors[node]:
+                in_degree[successor] -= 1
+                if in_degree[successor] == 0:
+                    ready.append(successor)
+        
+        # Anything left sits on a cycle; drop the edges that point backwards
+        placed = set(order)
+        leftover = [node for node in graph.position if node not in placed]
+        for position, node in enumerate(order + leftover):
+            graph.position[node] = position
+        for node in leftover:
+            for successor in list(graph.successors[node]):
+                if graph.position[successor] < graph.position[node]:
+                    graph.successors[node].discard(successor)
+                    graph.predecessors[successor].discard(node)
+        return graph
+    
+    def copy(self):
+        """
+        An independent copy, so one graph can be changed while others read this one.
+        """
+        graph = DependencyGraph()
+        graph.successors = {node: set(nodes) for node, nodes in self.successors.items()}
+        graph.predecessors = {node: set(nodes) for node, nodes in self.predecessors.items()}
+        graph.position = dict(self.position)
+        graph._next_position = self._next_position
+        return graph
+    
+    def add_node(self, node):
+        if node not in self.position:
+            self.successors[node] = set()
+            self.predecessors[node] = set()
+            self.position[node] = self._next_position
+            self._next_position += 1
+    
+    def add_edge(self, before, after):
+        """
+        Add an edge so that before comes ahead of after.
+        
+        Returns:
+            bool: False (and the graph is unchanged) if the edge would create a cycle
+        """
+        if before == after:
+            return False
+        self.add_node(before)
+        self.add_node(after)
+        if after in self.successors[before]:
+            return True
+        
+        lower, upper = self.position[after], self.position[before]
+        if lower < upper:
+            # Search only the affected region between the two positions
+            forward = self._search(after, self.successors, lambda p: p <= upper, stop=before)
+            if forward is None:
+                return False
+            backward = self._search(before, self.predecessors, lambda p: p >= lower)
+            self._reorder(backward, forward)
+        
+        self.successors[before].add(after)
+        self.predecessors[after].add(before)
+        return True
+    
+    def remove_edge(self, before, after):
+        if before in self.successors:
+            self.successors[before].discard(after)
+        if after in self.predecessors:
+            self.predecessors[after].discard(before)
+    
+    def _search(self, start, neighbours, in_region, stop=None):
+        visited = {start}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for neighbour in neighbours[node]:
+                if neighbour == stop:
+                    return None
+                if neighbour not in visited and in_region(self.position[neighbour]):
+                    visited.add(neighbour)
+                    stack.append(neighbour)
+        return visited
+    
+    def _reorder(self, backward, forward):
+        # The nodes before must precede the nodes after; reuse their positions
+        backward = sorted(backward, key=self.position.get)
+        forward = sorted(forward, key=self.position.get)
+        positions = sorted(self.position[node] for node in backward + forward)
+        for node, position in zip(backward + forward, positions):
+            self.position[node] = position
+    
+    def topological_order(self):
+        """
+        All nodes, each one after everything it depends on.
+        """
+        return sorted(self.position, key=self.position.get)
+
+# The cached graph is never changed once handed out: writers change a
+# copy and swap it in, so readers can iterate it without the lock
+_graph = None
+_graph_generation = None
+_graph_database = None
+# Held across reading the cache, checking an edge and writing it, so sessions can't interleave
+_graph_lock = threading.RLock()
+
+def get_dependency_graph():
+    """
+    Get the dependency graph, rebuilt only when the data changed since the last call.
+    
+    The graph is a snapshot: later changes replace the cached graph instead of
+    changing this one, so don't change it either.
+    """
+    global _graph, _graph_generation, _graph_database
+    with _graph_lock:
+        generation = get_write_generation()
+        # Generations of different database files aren't comparable
+        if _graph is None or _graph_generation != generation or _graph_database != db_utils.DB_FILE:
+            edges = load_dependencies()
+            _graph = DependencyGraph.from_edges(zip(edges['depends_on'].tolist(), edges['task_id'].tolist()))
+            _graph_generation = generation
+            _graph_database = db_utils.DB_FILE
+        return _graph
+
+def add_dependency(task_id, depends_on):
+    """
+    Record that task_id can't start before depends_on is done, unless that creates a cycle.
+    
+    The edge is added to a copy of the cached graph, which replaces the cache
+    once the dependency is written, so the next call doesn't rebuild it.
+    
+    Returns:
+        bool: False if the dependency would create a cycle
+    """
+    before, after = int(depends_on), int(task_id)
+    with _graph_lock:
+        graph = get_dependency_graph().copy()
+        generation = _graph_generation
+        if not graph.add_edge(before, after):
+            return False
+        insert_dependency(task_id, depends_on)
+        _replace_graph(graph, generation)
+        return True
+
+def remove_dependency(task_id, depends_on):
+    """
+    Remove a dependency; removing an edge never invalidates the topological order.
+    """
+    with _graph_lock:
+        graph = get_dependency_graph().copy()
+        generation = _graph_generation
+        graph.remove_edge(int(depends_on), int(task_id))
+        delete_dependency(task_id, depends_on)
+        _replace_graph(graph, generation)
+
+def _replace_graph(graph, generation):
+    # Keep the changed graph if this was the only write since the cached one was loaded
+    global _graph, _graph_generation
+    if get_write_generation() == generation + 1:
+        _graph, _graph_generation = graph, generation + 1
+
+def dependency_order(tasks_df, graph):
+    """
+    Order tasks so each one comes after the tasks it depends on, otherwise keeping tasks_df's order.
+    
+    Args:
+        tasks_df (pandas.DataFrame): Tasks in priority order, with an 'id' column
+        graph (DependencyGraph): Dependencies between task ids
+    
+    Returns:
+        tuple: (index labels in scheduling order, {index label: [index labels it depends on]})
+    """
+    labels_by_id = {}
+    if 'id' in tasks_df.columns:
+        for label, task_id in zip(tasks_df.index, tasks_df['id']):
+            if pd.notnull(task_id):
+                labels_by_id.setdefault(int(task_id), []).append(label)
+    
+    rank = {label: r for r, label in enumerate(tasks_df.index)}
+    predecessors = {}
+    successors = {label: [] for label in tasks_df.index}
+    for task_id, labels in labels_by_id.items():
+        for before_id in graph.predecessors.get(task_id, ()):
+            for before in labels_by_id.get(before_id, ()):
+                for label in labels:
+                    predecessors.setdefault(label, []).append(before)
+                    successors[before].append(label)
+    
+    # Kahn's algorithm, always taking the highest-priority task that is ready
+    waiting = {label: len(before) for label, before in predecessors.items()}
+    ready = [rank[label] for label in tasks_df.index if label not in waiting]
+    heapq.heapify(ready)
+    labels = list(tasks_df.index)
+    order = []
+    while ready:
+        label = labels[heapq.heappop(ready)]
+        order.append(label)
+        for successor in successors[label]:
+            waiting[successor] -= 1
+            if waiting[successor] == 0:
+                heapq.heappush(ready, rank[successor])
+    
+    # Tasks on a cycle can't be ordered; append them so they're still reported
+    placed = set(order)
+    order += [label for label in labels if label not in placed]
+    return order, predecessors
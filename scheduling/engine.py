@@ -0,0 +1,245 @@
+import math
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from models.task import calculate_task_priority
+from utils.instrumentation import instrumented
+
+# Most focus sessions of one task placed on the same day
+MAX_SESSIONS_PER_DAY = 2
+
+# Allocations smaller than this are rounding noise
+ALLOCATION_EPSILON = 1e-9
+
+# One result of iter_allocations(): kind is 'allocation', 'warning' or 'unallocated'
+ScheduleEvent = namedtuple('ScheduleEvent', ['kind', 'record'])
+
+def prepare_free_time(free_time_df):
+    """
+    Create a working copy of the free time dataframe for scheduling, sorted by date.
+    """
+    working_free_time_df = free_time_df.copy()
+    if 'Sort Order' in working_free_time_df.columns:
+        working_free_time_df = working_free_time_df.drop('Sort Order', axis=1)
+    
+    working_free_time_df['Date'] = pd.to_datetime(working_free_time_df['Date'])
+    return working_free_time_df.sort_values(by='Date')
+
+def create_daily_summary(free_time_df):
+    """
+    Create a summary of available hours by date.
+    """
+    if free_time_df.empty:
+        return pd.DataFrame(columns=['Date', 'Total Available'])
+    
+    return (
+        free_time_df.groupby('Date')['Available Hours']
+        .sum()
+        .reset_index()
+        .rename(columns={'Available Hours': 'Total Available'})
+    )
+
+@instrumented
+def schedule_tasks(tasks_df, working_free_time_df):
+    """
+    Schedule tasks based on priority and available time.
+    """
+    # Prioritize tasks
+    tasks_df = calculate_task_priority(tasks_df)
+    
+    return allocate_in_order(tasks_df, working_free_time_df)
+
+def allocate_in_order(tasks_df, working_free_time_df, max_sessions_per_day=MAX_SESSIONS_PER_DAY, predecessors=None):
+    """
+    Give each task, in the order of tasks_df, the earliest free time before its due date.
+    
+    Collects iter_allocations() into lists; see there for how tasks are placed.
+    
+    Args:
+        tasks_df (pandas.DataFrame): Tasks, already sorted in scheduling order
+        working_free_time_df (pandas.DataFrame): Free time sorted by date; hours are used up in place
+        max_sessions_per_day (int): Most focus sessions of one task on the same day
+        predecessors (dict, optional): Index label -> index labels of the tasks it depends on
+    
+    Returns:
+        tuple: (scheduled_tasks, warnings, unallocated_tasks)
+    """
+    scheduled_tasks = []
+    warnings = []
+    unallocated_tasks = []
+    collected = {'allocation': scheduled_tasks, 'warning': warnings, 'unallocated': unallocated_tasks}
+    
+    for event in iter_allocations([tasks_df], working_free_time_df, max_sessions_per_day, predecessors):
+        collected[event.kind].append(event.record)
+    
+    return scheduled_tasks, warnings, unallocated_tasks
+
+def iter_allocations(task_chunks, working_free_time_df, max_sessions_per_day=MAX_SESSIONS_PER_DAY, predecessors=None):
+    """
+    Place tasks one by one and yield the results as they are produced.
+    
+    Tasks with focus sessions are placed in whole session-length chunks, at most
+    max_sessions_per_day per day, so a window too small for a session is skipped
+    rather than filled with a fragment. Each task is placed with one vectorized
+    first-fit over the capacity array instead of a loop over windows.
+    
+    With predecessors, a task starts no earlier than the window in which the
+    last task it depends on finishes, and waits entirely if one of them could
+    not be fully placed. Every task must then come after its predecessors.
+    
+    Only the free time and the current chunk of tasks are held in memory, so
+    schedules too large to materialize can be consumed in a single pass.
+    
+    Args:
+        task_chunks (iterable): DataFrames of tasks, together in scheduling order
+        working_free_time_df (pandas.DataFrame): Free time sorted by date; hours are
+            used up in place once the generator is exhausted
+        max_sessions_per_day (int): Most focus sessions of one task on the same day
+        predecessors (dict, optional): Index label -> index labels of the tasks it depends on
+    
+    Yields:
+        ScheduleEvent: 'allocation' (dict like a scheduled_tasks entry),
+        'warning' (str) or 'unallocated' (dict like an unallocated_tasks entry)
+    """
+    window_dates = list(working_free_time_df['Date'])
+    dates = working_free_time_df['Date'].to_numpy(dtype='datetime64[ns]')
+    hours = working_free_time_df['Available Hours'].to_numpy(dtype=float)
+    capacity = np.where(hours > 0, hours, 0.0)
+    touched = np.zeros(len(capacity), dtype=bool)
+    num_windows = len(capacity)
+    
+    # Position of the first window on the same day, for the per-day session cap
+    day_start = np.searchsorted(dates, dates.astype('datetime64[D]').astype('datetime64[ns]'))
+    
+    # Window position where each task finished; None if it couldn't be fully placed
+    finished_at = {}
+    
+    first_free = 0
+    for tasks_df in task_chunks:
+        # Windows up to and including the due date; tasks without one can use them all
+        due_dates = pd.to_datetime(tasks_df['Due Date'])
+        ends = np.searchsorted(dates, due_dates.to_numpy(dtype='datetime64[ns]'), side='right')
+        ends[due_dates.isnull().to_numpy()] = num_windows
+        
+        no_sessions = pd.Series(np.nan, index=tasks_df.index)
+        session_lengths = pd.to_numeric(tasks_df.get('Session Length', no_sessions), errors='coerce')
+        focus_sessions = pd.to_numeric(tasks_df.get('Focus Sessions', no_sessions), errors='coerce')
+        
+        for position, (idx, task_name, estimate, due_date, sessions, session_length) in enumerate(zip(
+            tasks_df.index, tasks_df['Task'], tasks_df['Estimated Time'], due_dates,
+            focus_sessions, session_lengths
+        )):
+            # Check for large tasks
+            if estimate > 6 and not any(tag in str(task_name) for tag in ['[MULTI-SESSION]', '[FIXED EVENT]', '[PENDING PLANNING]']):
+                yield ScheduleEvent(
+                    'warning',
+                    f"Task '{task_name}' exceeds 6 hours and should probably be split unless it's a Work Block."
+                )
+            
+            task_time_remaining = estimate if estimate > 0 else 0.0
+            while first_free < num_windows and capacity[first_free] <= 0:
+                first_free += 1
+            
+            earliest = 0
+            if predecessors and idx in predecessors:
+                finishes = [finished_at.get(before) for before in predecessors[idx]]
+                if None in finishes:
+                    yield ScheduleEvent('warning', f"Task '{task_name}' is waiting on tasks it depends on that couldn't be scheduled.")
+                    earliest = num_windows
+                else:
+                    earliest = max(finishes)
+            start = max(first_free, earliest)
+            last_window = earliest
+            
+            end = ends[position]
+            if task_time_remaining > 0 and end > start:
+                allocated = fit_hours(
+                    capacity[start:end], day_start[start:end] - start, task_time_remaining,
+                    session_length if sessions > 0 else 0, max_sessions_per_day
+                )
+                
+                for offset in np.flatnonzero(allocated > ALLOCATION_EPSILON):
+                    allocated_time = float(allocated[offset])
+                    entry = {
+                        'Task': task_name,
+                        'Date': window_dates[start + offset],
+                        'Allocated Hours': allocated_time
+                    }
+                    if sessions > 0 and session_length > 0:
+                        entry['Sessions'] = math.ceil(allocated_time / session_length - ALLOCATION_EPSILON)
+                    yield ScheduleEvent('allocation', entry)
+                    capacity[start + offset] -= allocated_time
+                    touched[start + offset] = True
+                    task_time_remaining -= allocated_time
+                    last_window = start + offset
+                
+                if task_time_remaining < ALLOCATION_EPSILON:
+                    task_time_remaining = 0
+            
+            if predecessors:
+                finished_at[idx] = last_window if task_time_remaining <= 0 else None
+            
+            # Track unallocated tasks
+            if pd.notnull(due_date) and task_time_remaining > 0:
+                yield ScheduleEvent(
+                    'warning',
+                    f"HANDLE: {task_name} (Due: {due_date.date()}) "
+                    f"needs {estimate}h, but only {estimate - task_time_remaining}h scheduled before due date."
+                )
+                
+                # Track the unallocated task with details
+                yield ScheduleEvent('unallocated', {
+                    'Task': task_name,
+                    'Task Index': idx,
+                    'Due Date': due_date,
+                    'Total Hours': estimate,
+                    'Allocated Hours': estimate - task_time_remaining,
+                    'Unallocated Hours': task_time_remaining
+                })
+    
+    # Write back only the windows that were used, so missing hours stay missing
+    working_free_time_df['Available Hours'] = np.where(touched, capacity, hours)
+    
+def fit_hours(available, day_start, hours, session_length, max_sessions_per_day):
+    """
+    First-fit hours into a run of windows: whole sessions if session_length is
+    positive, otherwise every window up to the one that covers the hours.
+    
+    Returns:
+        numpy.ndarray: Hours allocated per window
+    """
+    if session_length > 0:
+        return fit_sessions(available, day_start, hours, session_length, max_sessions_per_day)
+    return np.clip(hours - (np.cumsum(available) - available), 0, available)
+
+def fit_sessions(available, day_start, hours, session_length, max_sessions_per_day):
+    """
+    First-fit whole sessions into a run of windows.
+    
+    Args:
+        available (numpy.ndarray): Free hours per window
+        day_start (numpy.ndarray): Offset of the first window on the same day, per window
+        hours (float): Hours to place
+        session_length (float): Length of one session; the last one may be shorter
+        max_sessions_per_day (int): Most sessions on the same day
+    
+    Returns:
+        numpy.ndarray: Hours allocated per window
+    """
+    fits = np.floor(available / session_length + ALLOCATION_EPSILON)
+    
+    # Sessions earlier the same day count against the cap
+    before = np.cumsum(fits) - fits
+    fits = np.clip(max_sessions_per_day - (before - before[np.maximum(day_start, 0)]), 0, fits)
+    
+    needed = math.ceil(hours / session_length - ALLOCATION_EPSILON)
+    before = np.cumsum(fits) - fits
+    sessions = np.clip(needed - before, 0, fits)
+    allocated = sessions * session_length
+    
+    # The last session only needs what is left
+    used = np.flatnonzero(sessions)
+    excess = allocated.sum() - hours
+    if len(used) and excess > 0:
+        allocated[used[-1]] -= excess
+    return allocated
@@ -0,0 +1,169 @@
+import csv
+import json
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+
+# Columns of an exported schedule; Sessions, Start and End are empty when not applicable
+EXPORT_FIELDS = ['Task', 'Date', 'Allocated Hours', 'Sessions', 'Start', 'End']
+
+# Columns of an exported event stream; each kind fills the ones it has
+EVENT_FIELDS = [
+    'Kind', 'Task', 'Task Index', 'Date', 'Allocated Hours', 'Sessions', 'Start', 'End',
+    'Due Date', 'Total Hours', 'Unallocated Hours', 'Message'
+]
+
+# Longest iCalendar content line, in octets, before it must be folded
+ICS_LINE_LIMIT = 75
+
+def write_schedule_csv(events, file):
+    """
+    Write the allocations from a stream of schedule events as CSV rows.
+    
+    Rows are written as they arrive, so the schedule never has to fit in memory.
+    
+    Args:
+        events (iterable): ScheduleEvents, e.g. from iter_schedule()
+        file: Text file opened for writing with newline=''
+    
+    Returns:
+        int: Number of rows written
+    """
+    writer = csv.DictWriter(file, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    rows = 0
+    for event in events:
+        if event.kind != 'allocation':
+            continue
+        row = dict(event.record)
+        row['Date'] = pd.Timestamp(row['Date']).date().isoformat()
+        for field in ('Start', 'End'):
+            if pd.notnull(row.get(field)):
+                row[field] = pd.Timestamp(row[field]).isoformat(sep=' ')
+        writer.writerow(row)
+        rows += 1
+    return rows
+
+def write_events_csv(events, file):
+    """
+    Write every schedule event, warnings and unallocated tasks included, as CSV rows.
+    
+    The 'Kind' column tells allocation, warning and unallocated rows apart;
+    a warning's text is in 'Message'.
+    
+    Returns:
+        int: Number of rows written
+    """
+    writer = csv.DictWriter(file, fieldnames=EVENT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    rows = 0
+    for event in events:
+        if event.kind == 'warning':
+            row = {'Message': event.record}
+        else:
+            row = {field: _json_value(value) for field, value in event.record.items()}
+        row['Kind'] = event.kind
+        writer.writerow(row)
+        rows += 1
+    return rows
+
+def write_schedule_json(events, file, **metadata):
+    """
+    Write a stream of schedule events as one JSON object.
+    
+    The object has 'scheduled_tasks', 'warnings' and 'unallocated_tasks' lists
+    like schedule_tasks() returns, plus any metadata given as keyword arguments.
+    Allocations are written as they arrive; only warnings and unallocated
+    tasks are held until the end.
+    
+    Returns:
+        int: Number of allocations written
+    """
+    file.write('{')
+    for key, value in metadata.items():
+        file.write(f'{json.dumps(key)}: {json.dumps(value, default=_json_value)}, ')
+    file.write('"scheduled_tasks": [')
+    
+    held = {'warning': [], 'unallocated': []}
+    count = 0
+    for event in events:
+        if event.kind == 'allocation':
+            file.write((', ' if count else '') + json.dumps(event.record, default=_json_value))
+            count += 1
+        else:
+            held[event.kind].append(event.record)
+    
+    file.write(f'], "warnings": {json.dumps(held["warning"])}, ')
+    file.write(f'"unallocated_tasks": {json.dumps(held["unallocated"], default=_json_value)}}}\n')
+    return count
+
+def write_schedule_ics(events, file):
+    """
+    Write the allocations from a stream of schedule events as an iCalendar file.
+    
+    Allocations with a Start and End become timed events; the rest become
+    all-day events on their date. Events are written as they arrive.
+    
+    Args:
+        events (iterable): ScheduleEvents, e.g. from iter_schedule()
+        file: Text file opened for writing with newline=''
+    
+    Returns:
+        int: Number of events written
+    """
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    _write_ics_lines(file, ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Task Scheduler//Schedule Export//EN'])
+    
+    count = 0
+    for event in events:
+        if event.kind != 'allocation':
+            continue
+        record = event.record
+        hours = float(record['Allocated Hours'])
+        lines = ['BEGIN:VEVENT', f'UID:{count}-{stamp}@task-scheduler', f'DTSTAMP:{stamp}']
+        if pd.notnull(record.get('Start')) and pd.notnull(record.get('End')):
+            lines.append(f"DTSTART:{pd.Timestamp(record['Start']).strftime('%Y%m%dT%H%M%S')}")
+            lines.append(f"DTEND:{pd.Timestamp(record['End']).strftime('%Y%m%dT%H%M%S')}")
+        else:
+            day = pd.Timestamp(record['Date'])
+            lines.append(f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}")
+            lines.append(f"DTEND;VALUE=DATE:{(day + pd.Timedelta(days=1)).strftime('%Y%m%d')}")
+        summary = _escape_ics_text(f"{record['Task']} ({hours:g}h)")
+        lines.append(f"SUMMARY:{summary}")
+        lines.append('END:VEVENT')
+        _write_ics_lines(file, lines)
+        count += 1
+    
+    _write_ics_lines(file, ['END:VCALENDAR'])
+    return count
+
+def _json_value(value):
+    # Timestamps as ISO strings and NumPy scalars as plain numbers
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat(sep=' ')
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _escape_ics_text(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+def _write_ics_lines(file, lines):
+    # Long lines are folded onto continuation lines starting with a space
+    for line in lines:
+        encoded = line.encode('utf-8')
+        limit = ICS_LINE_LIMIT
+        while len(encoded) > limit:
+            # Don't split a multi-byte character
+            cut = limit
+            while (encoded[cut] & 0xC0) == 0x80:
+                cut -= 1
+            file.write(encoded[:cut].decode('utf-8') + '\r\n ')
+            encoded = encoded[cut:]
+            limit = ICS_LINE_LIMIT - 1
+        file.write(encoded.decode('utf-8') + '\r\n')
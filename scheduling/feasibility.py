@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+def analyze_feasibility(tasks_df, free_time_df):
+    """
+    Check which due dates can be met at all, without running the scheduler.
+    
+    Scheduling earliest-deadline-first meets every due date exactly when, for
+    each due date, the hours due by then fit in the free time available by
+    then. Sorting the deadlines and comparing prefix sums of demand and
+    capacity makes this O(n log n).
+    
+    Args:
+        tasks_df (pandas.DataFrame): 'Due Date' and 'Estimated Time' per task (or pre-aggregated per due date)
+        free_time_df (pandas.DataFrame): 'Date' and 'Available Hours' per window (or pre-aggregated per date)
+    
+    Returns:
+        dict: 'feasible' (bool), 'earliest_infeasible' (first due date that can't be met, or None),
+        'extra_hours_needed' (hours to add by the worst due date) and 'deadlines', a DataFrame with
+        cumulative demand, capacity and the extra hours needed by each due date
+    """
+    due_dates = pd.to_datetime(tasks_df['Due Date'], errors='coerce').to_numpy(dtype='datetime64[ns]')
+    hours = pd.to_numeric(tasks_df['Estimated Time'], errors='coerce').to_numpy(dtype=float)
+    has_deadline = ~np.isnat(due_dates) & ~np.isnan(hours)
+    due_dates, hours = due_dates[has_deadline], hours[has_deadline]
+    
+    # Cumulative demand per distinct due date
+    deadlines, inverse = np.unique(due_dates, return_inverse=True)
+    demand = np.cumsum(np.bincount(inverse.ravel(), weights=hours, minlength=len(deadlines)))
+    
+    # Cumulative capacity of all windows on or before each due date
+    window_dates = pd.to_datetime(free_time_df['Date'], errors='coerce').to_numpy(dtype='datetime64[ns]')
+    window_hours = pd.to_numeric(free_time_df['Available Hours'], errors='coerce').to_numpy(dtype=float)
+    valid = ~np.isnat(window_dates) & ~np.isnan(window_hours)
+    order = np.argsort(window_dates[valid], kind='stable')
+    window_dates = window_dates[valid][order]
+    capacity_prefix = np.concatenate(([0.0], np.cumsum(window_hours[valid][order])))
+    capacity = capacity_prefix[np.searchsorted(window_dates, deadlines, side='right')]
+    
+    shortfall = demand - capacity
+    extra_needed = np.maximum(shortfall, 0.0)
+    infeasible = np.flatnonzero(shortfall > 1e-9)
+    
+    return {
+        'feasible': len(infeasible) == 0,
+        'earliest_infeasible': pd.Timestamp(deadlines[infeasible[0]]) if len(infeasible) else None,
+        'extra_hours_needed': float(extra_needed.max()) if len(extra_needed) else 0.0,
+        'deadlines': pd.DataFrame({
+            'Due Date': pd.to_datetime(deadlines),
+            'Hours Due': demand,
+            'Hours Available': capacity,
+            'Extra Hours Needed': extra_needed
+        })
+    }
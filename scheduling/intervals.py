@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# Resolution of slot boundaries
+TIME_UNIT = 'datetime64[m]'
+
+class FreeSlots:
+    """
+    Disjoint free time intervals, kept merged and sorted in two NumPy arrays.
+    
+    Lookups are binary searches over the sorted starts and ends, and first-fit
+    queries scan only the candidate range with vectorized operations, so
+    thousands of slots per month stay cheap. Inserting merges with touching or
+    overlapping slots; removing splits a slot around the removed part.
+    """
+    
+    def __init__(self, starts=(), ends=()):
+        self.starts = np.array([], dtype=TIME_UNIT)
+        self.ends = np.array([], dtype=TIME_UNIT)
+        for start, end in sorted(zip(_to_times(starts), _to_times(ends))):
+            self.insert(start, end)
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    def total_hours(self):
+        return float((self.ends - self.starts).astype('timedelta64[m]').astype(int).sum()) / 60
+    
+    def intervals(self):
+        """
+        List the slots as (start, end) Timestamps.
+        """
+        return [(pd.Timestamp(start), pd.Timestamp(end)) for start, end in zip(self.starts, self.ends)]
+    
+    def insert(self, start, end):
+        """
+        Add free time, merging it with any slot it touches or overlaps.
+        """
+        start, end = np.datetime64(start, 'm'), np.datetime64(end, 'm')
+        if end <= start:
+            return
+        first = np.searchsorted(self.ends, start, side='left')
+        last = np.searchsorted(self.starts, end, side='right')
+        if first < last:
+            start = min(start, self.starts[first])
+            end = max(end, self.ends[last - 1])
+        self.starts = np.concatenate([self.starts[:first], [start], self.starts[last:]])
+        self.ends = np.concatenate([self.ends[:first], [end], self.ends[last:]])
+    
+    def remove(self, start, end):
+        """
+        Take [start, end) out of the free time, splitting the slots it cuts through.
+        """
+        start, end = np.datetime64(start, 'm'), np.datetime64(end, 'm')
+        if end <= start:
+            return
+        first = np.searchsorted(self.ends, start, side='right')
+        last = np.searchsorted(self.starts, end, side='left')
+        if first >= last:
+            return
+        new_starts, new_ends = [], []
+        if self.starts[first] < start:
+            new_starts.append(self.starts[first])
+            new_ends.append(start)
+        if self.ends[last - 1] > end:
+            new_starts.append(end)
+            new_ends.append(self.ends[last - 1])
+        self.starts = np.concatenate([self.starts[:first], np.array(new_starts, dtype=TIME_UNIT), self.starts[last:]])
+        self.ends = np.concatenate([self.ends[:first], np.array(new_ends, dtype=TIME_UNIT), self.ends[last:]])
+    
+    def _candidates(self, earliest, deadline):
+        # Slots that end after earliest and start before deadline, clipped to that range
+        first = 0 if earliest is None else np.searchsorted(self.ends, earliest, side='right')
+        last = len(self.starts) if deadline is None else np.searchsorted(self.starts, deadline, side='left')
+        starts = self.starts[first:last]
+        ends = self.ends[first:last]
+        if earliest is not None:
+            starts = np.maximum(starts, earliest)
+        if deadline is not None:
+            ends = np.minimum(ends, deadline)
+        return starts, ends
+    
+    def first_fit(self, minutes, deadline=None, earliest=None):
+        """
+        Find the earliest start of a free block of the given length.
+        
+        Args:
+            minutes (int): Length of the block
+            deadline (optional): The block has to end by then
+            earliest (optional): The block can't start before then
+        
+        Returns:
+            pandas.Timestamp or None: Start of the block, if one fits
+        """
+        starts, ends = self._candidates(_to_time(earliest), _to_time(deadline))
+        fits = np.flatnonzero((ends - starts) >= np.timedelta64(int(minutes), 'm'))
+        return pd.Timestamp(starts[fits[0]]) if len(fits) else None
+    
+    def earliest_blocks(self, minutes, deadline=None, earliest=None, min_minutes=1):
+        """
+        Find the earliest free time adding up to the given length, possibly in several blocks.
+        
+        Pieces shorter than min_minutes are skipped (unless that is all that's needed).
+        
+        Returns:
+            list: (start, end) Timestamps of the blocks; they add up to less if there isn't enough time
+        """
+        starts, ends = self._candidates(_to_time(earliest), _to_time(deadline))
+        lengths = (ends - starts).astype('timedelta64[m]').astype(int)
+        lengths = np.where(lengths >= min(min_minutes, minutes), lengths, 0)
+        taken = np.clip(minutes - (np.cumsum(lengths) - lengths), 0, lengths)
+        return [
+            (pd.Timestamp(starts[k]), pd.Timestamp(starts[k] + np.timedelta64(int(taken[k]), 'm')))
+            for k in np.flatnonzero(taken)
+        ]
+
+def _to_time(value):
+    return None if value is None or pd.isnull(value) else np.datetime64(pd.Timestamp(value), 'm')
+
+def _to_times(values):
+    return [np.datetime64(pd.Timestamp(value), 'm') for value in values]
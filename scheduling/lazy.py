@@ -0,0 +1,163 @@
+import copy
+import math
+import threading
+import numpy as np
+import pandas as pd
+from models.task import calculate_task_priority
+from scheduling.engine import fit_hours, MAX_SESSIONS_PER_DAY, ALLOCATION_EPSILON
+
+# How far ahead the scheduler tab commits the schedule by default
+SCHEDULE_HORIZON_DAYS = 14
+
+class LazySchedule:
+    """
+    The priority-score schedule, committed only up to a horizon date.
+    
+    Each task takes the earliest windows it can, so the allocations up to any
+    date depend only on the windows up to that date. The schedule can therefore
+    be built window range by window range: extend_to() continues every task
+    that still has hours left into the next range, in the same priority order,
+    and the result is exactly what schedule_tasks() gives for those dates.
+    Allocations already committed are never recomputed.
+    """
+    
+    def __init__(self, tasks_df, working_free_time_df, max_sessions_per_day=MAX_SESSIONS_PER_DAY):
+        tasks_df = calculate_task_priority(tasks_df)
+        self.max_sessions_per_day = max_sessions_per_day
+        self._lock = threading.Lock()
+        
+        self.window_dates = list(working_free_time_df['Date'])
+        self.dates = working_free_time_df['Date'].to_numpy(dtype='datetime64[ns]')
+        hours = working_free_time_df['Available Hours'].to_numpy(dtype=float)
+        self.capacity = np.where(hours > 0, hours, 0.0)
+        self.day_start = np.searchsorted(self.dates, self.dates.astype('datetime64[D]').astype('datetime64[ns]'))
+        
+        self.task_index = list(tasks_df.index)
+        self.task_names = list(tasks_df['Task'])
+        self.estimates = list(tasks_df['Estimated Time'])
+        self.due_dates = list(tasks_df['Due Date'])
+        due_dates = pd.to_datetime(tasks_df['Due Date'])
+        self.ends = np.searchsorted(self.dates, due_dates.to_numpy(dtype='datetime64[ns]'), side='right')
+        self.ends[due_dates.isnull().to_numpy()] = len(self.capacity)
+        self.remaining = tasks_df['Estimated Time'].fillna(0).clip(lower=0).to_numpy(dtype=float, copy=True)
+        
+        no_sessions = pd.Series(np.nan, index=tasks_df.index)
+        session_lengths = pd.to_numeric(tasks_df.get('Session Length', no_sessions), errors='coerce')
+        focus_sessions = pd.to_numeric(tasks_df.get('Focus Sessions', no_sessions), errors='coerce')
+        self.session_lengths = session_lengths.where(focus_sessions > 0, 0).fillna(0).to_numpy(dtype=float, copy=True)
+        
+        # Windows [0, committed) are final
+        self.committed = 0
+        self._allocations = []
+        
+        self.warnings = [
+            f"Task '{task_name}' exceeds 6 hours and should probably be split unless it's a Work Block."
+            for task_name, estimate in zip(self.task_names, self.estimates)
+            if estimate > 6 and not any(tag in str(task_name) for tag in ['[MULTI-SESSION]', '[FIXED EVENT]', '[PENDING PLANNING]'])
+        ]
+    
+    @property
+    def horizon(self):
+        """
+        Date of the last committed window, or None if nothing is committed yet.
+        """
+        return self.window_dates[self.committed - 1] if self.committed else None
+    
+    def copy(self):
+        """
+        An independent copy that can be extended without changing this schedule,
+        e.g. one per session of a schedule shared between sessions.
+        """
+        with self._lock:
+            clone = copy.copy(self)
+            clone._lock = threading.Lock()
+            clone.capacity = self.capacity.copy()
+            clone.remaining = self.remaining.copy()
+            clone._allocations = list(self._allocations)
+        return clone
+    
+    def is_complete(self):
+        return self.committed >= len(self.capacity)
+    
+    def extend_to(self, date):
+        """
+        Commit the schedule through date (or everything if date is None).
+        """
+        end = len(self.capacity) if date is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date)), side='right'))
+        with self._lock:
+            if end > self.committed:
+                self._allocate(self.committed, end)
+                self.committed = end
+    
+    def _allocate(self, lo, hi):
+        # Only tasks with hours left whose due date hasn't passed before this range
+        first_free = lo
+        for position in np.flatnonzero((self.remaining > 0) & (self.ends > lo)):
+            while first_free < hi and self.capacity[first_free] <= 0:
+                first_free += 1
+            if first_free >= hi:
+                break
+            
+            end = min(hi, self.ends[position])
+            if end <= first_free:
+                continue
+            allocated = fit_hours(
+                self.capacity[first_free:end], self.day_start[first_free:end] - first_free,
+                self.remaining[position], self.session_lengths[position], self.max_sessions_per_day
+            )
+            for offset in np.flatnonzero(allocated > ALLOCATION_EPSILON):
+                window = first_free + offset
+                allocated_time = float(allocated[offset])
+                self.capacity[window] -= allocated_time
+                self.remaining[position] -= allocated_time
+                self._allocations.append((position, window, allocated_time))
+            if self.remaining[position] < ALLOCATION_EPSILON:
+                self.remaining[position] = 0
+    
+    def result(self):
+        """
+        The committed part of the schedule.
+        
+        Returns:
+            tuple: (scheduled_tasks, warnings, unallocated_tasks) like schedule_tasks(),
+            where only tasks due within the horizon can be unallocated yet
+        """
+        with self._lock:
+            allocations = sorted(self._allocations)
+            remaining = self.remaining.copy()
+            committed = self.committed
+        
+        scheduled_tasks = []
+        for position, window, allocated_time in allocations:
+            entry = {
+                'Task': self.task_names[position],
+                'Date': self.window_dates[window],
+                'Allocated Hours': allocated_time
+            }
+            if self.session_lengths[position] > 0:
+                entry['Sessions'] = math.ceil(allocated_time / self.session_lengths[position] - ALLOCATION_EPSILON)
+            scheduled_tasks.append(entry)
+        
+        warnings = list(self.warnings)
+        unallocated_tasks = []
+        complete = committed >= len(self.capacity)
+        for position in np.flatnonzero(remaining > 0):
+            due_date = self.due_dates[position]
+            if pd.isnull(due_date) or (self.ends[position] > committed and not complete):
+                continue
+            estimate = self.estimates[position]
+            task_name = self.task_names[position]
+            warnings.append(
+                f"HANDLE: {task_name} (Due: {due_date.date()}) "
+                f"needs {estimate}h, but only {estimate - remaining[position]}h scheduled before due date."
+            )
+            unallocated_tasks.append({
+                'Task': task_name,
+                'Task Index': self.task_index[position],
+                'Due Date': due_date,
+                'Total Hours': estimate,
+                'Allocated Hours': estimate - remaining[position],
+                'Unallocated Hours': float(remaining[position])
+            })
+        
+        return scheduled_tasks, warnings, unallocated_tasks
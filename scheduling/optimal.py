@@ -0,0 +1,333 @@
+import heapq
+from collections import deque
+import numpy as np
+import pandas as pd
+from models.task import calculate_task_priority
+
+# Hours are scaled to integer units so the flow computation is exact
+UNITS_PER_HOUR = 100
+
+def min_cost_flow(num_nodes, arcs, source, sink):
+    """
+    Send as much flow as possible from source to sink at minimum total cost.
+    
+    Primal-dual algorithm: Dijkstra with node potentials finds the current
+    shortest distance, then a blocking flow (Dinic) saturates every shortest
+    path at that distance at once. This needs one Dijkstra per distinct path
+    cost rather than one per augmenting path.
+    
+    Args:
+        num_nodes (int): Number of nodes
+        arcs (list): (tail, head, capacity, cost) tuples with integer capacity and cost >= 0
+        source (int): Source node
+        sink (int): Sink node
+    
+    Returns:
+        list: Flow on each arc, in the order given
+    """
+    to, cap, cost = [], [], []
+    adj = [[] for _ in range(num_nodes)]
+    for tail, head, capacity, arc_cost in arcs:
+        adj[tail].append(len(to))
+        to.append(head)
+        cap.append(capacity)
+        cost.append(arc_cost)
+        adj[head].append(len(to))
+        to.append(tail)
+        cap.append(0)
+        cost.append(-arc_cost)
+    
+    original = cap[::2]
+    potential = [0] * num_nodes
+    infinity = float('inf')
+    
+    while True:
+        # Shortest distances under reduced costs, stopping once the sink is settled
+        dist = [infinity] * num_nodes
+        dist[source] = 0
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if u == sink:
+                break
+            pu = potential[u]
+            for e in adj[u]:
+                if cap[e] > 0:
+                    v = to[e]
+                    nd = d + cost[e] + pu - potential[v]
+                    if nd < dist[v]:
+                        dist[v] = nd
+                        heapq.heappush(heap, (nd, v))
+        
+        sink_dist = dist[sink]
+        if sink_dist == infinity:
+            break
+        potential = [p + (d if d < sink_dist else sink_dist) for p, d in zip(potential, dist)]
+        
+        # Blocking flows along arcs whose reduced cost is now zero
+        while True:
+            level = [-1] * num_nodes
+            level[source] = 0
+            queue = deque([source])
+            while queue:
+                u = queue.popleft()
+                if 0 <= level[sink] <= level[u]:
+                    break
+                pu = potential[u]
+                for e in adj[u]:
+                    v = to[e]
+                    if cap[e] > 0 and level[v] < 0 and cost[e] + pu - potential[v] == 0:
+                        level[v] = level[u] + 1
+                        queue.append(v)
+            if level[sink] < 0:
+                break
+            
+            pointer = [0] * num_nodes
+            path = []
+            u = source
+            while True:
+                if u == sink:
+                    pushed = min(cap[e] for e in path)
+                    for e in path:
+                        cap[e] -= pushed
+                        cap[e ^ 1] += pushed
+                    # Restart from the tail of the first saturated arc
+                    first_saturated = next(i for i, e in enumerate(path) if cap[e] == 0)
+                    del path[first_saturated:]
+                    u = to[path[-1]] if path else source
+                    continue
+                
+                edges = adj[u]
+                advanced = False
+                while pointer[u] < len(edges):
+                    e = edges[pointer[u]]
+                    v = to[e]
+                    if cap[e] > 0 and level[v] == level[u] + 1 and cost[e] + potential[u] - potential[v] == 0:
+                        path.append(e)
+                        u = v
+                        advanced = True
+                        break
+                    pointer[u] += 1
+                
+                if not advanced:
+                    if u == source:
+                        break
+                    # Dead end: never come back here in this phase
+                    level[u] = -1
+                    path.pop()
+                    u = to[path[-1]] if path else source
+                    pointer[u] += 1
+    
+    return [capacity - cap[2 * i] for i, capacity in enumerate(original)]
+
+def schedule_tasks_optimal(tasks_df, working_free_time_df):
+    """
+    Schedule tasks to minimize lateness weighted by importance.
+    
+    Unlike the greedy loop, a high-priority task never takes a window that a
+    tighter-deadline task needed if it could have used another one. Tasks and
+    dated windows form a flow network; every hour placed after its due date
+    costs Importance x days late, and an hour left out costs more than any late
+    placement. Tasks with the same due date and importance are merged, and
+    lateness is routed along one chain of window nodes per importance level,
+    so the network grows with tasks + windows rather than tasks x windows.
+    Tasks without a due date fill the capacity left over, in priority order.
+    
+    Returns the same (scheduled_tasks, warnings, unallocated_tasks) as
+    schedule_tasks(). Hours placed after the due date are included in
+    scheduled_tasks with 'Late Days' > 0 and still count as unallocated.
+    """
+    scheduled_tasks = []
+    warnings = []
+    unallocated_tasks = []
+    
+    # Prioritize tasks so ties (and the no-due-date fill) follow the greedy order
+    tasks_df = calculate_task_priority(tasks_df)
+    
+    windows = working_free_time_df[working_free_time_df['Available Hours'] > 0]
+    window_index = list(windows.index)
+    window_dates = list(pd.to_datetime(windows['Date']).dt.normalize())
+    window_units = np.rint(windows['Available Hours'].to_numpy(dtype=float) * UNITS_PER_HOUR).astype(int).tolist()
+    num_windows = len(window_index)
+    date_values = np.array(window_dates, dtype='datetime64[ns]')
+    
+    # Plain column lists; iterrows() would dominate the run time on large inputs
+    task_index = list(tasks_df.index)
+    task_names = list(tasks_df['Task'])
+    estimates = list(tasks_df['Estimated Time'])
+    due_dates = list(pd.to_datetime(tasks_df['Due Date']))
+    due_days = list(pd.to_datetime(tasks_df['Due Date']).dt.normalize())
+    importance = tasks_df['Importance'].fillna(1).clip(lower=1).astype(int).tolist()
+    units_array = np.rint(tasks_df['Estimated Time'].fillna(0).to_numpy(dtype=float) * UNITS_PER_HOUR).astype(int)
+    task_units = dict(zip(task_index, units_array.tolist()))
+    
+    for task_name, hours in zip(task_names, estimates):
+        if hours > 6 and not any(tag in str(task_name) for tag in ['[MULTI-SESSION]', '[FIXED EVENT]', '[PENDING PLANNING]']):
+            warnings.append(
+                f"Task '{task_name}' exceeds 6 hours and should probably be split unless it's a Work Block."
+            )
+    
+    # Group tasks with a due date into interchangeable classes of (due date, importance)
+    classes = {}
+    for idx, due_day, weight in zip(task_index, due_days, importance):
+        if pd.isnull(due_day) or task_units[idx] <= 0 or num_windows == 0:
+            continue
+        classes.setdefault((due_day, weight), []).append(idx)
+    class_keys = list(classes)
+    weights = sorted({weight for _, weight in class_keys})
+    
+    # Node layout: source, sink, classes, on-time chain, one late chain per weight, windows
+    source, sink = 0, 1
+    class_node = 2
+    on_time_node = class_node + len(class_keys)
+    late_node = {weight: on_time_node + num_windows * (i + 1) for i, weight in enumerate(weights)}
+    window_node = on_time_node + num_windows * (len(weights) + 1)
+    num_nodes = window_node + num_windows
+    
+    total_units = sum(window_units) + sum(task_units.values())
+    last_date = window_dates[-1] if num_windows else None
+    earliest_due = min((due for due, _ in class_keys), default=last_date)
+    unallocated_cost_per_weight = max(1, (last_date - earliest_due).days + 1) if num_windows else 1
+    
+    arcs = []
+    entry_arcs = []
+    for c, (due_date, weight) in enumerate(class_keys):
+        units = sum(task_units[idx] for idx in classes[(due_date, weight)])
+        # Last window on or before the due date
+        entry = int(np.searchsorted(date_values, np.datetime64(due_date), side='right')) - 1
+        arcs.append((source, class_node + c, units, 0))
+        arcs.append((class_node + c, sink, units, weight * unallocated_cost_per_weight))
+        on_time_arc = late_arc = None
+        if entry >= 0:
+            on_time_arc = len(arcs)
+            arcs.append((class_node + c, on_time_node + entry, units, 0))
+        if entry + 1 < num_windows:
+            late_arc = len(arcs)
+            days_late = (window_dates[entry + 1] - due_date).days
+            arcs.append((class_node + c, late_node[weight] + entry + 1, units, weight * days_late))
+        entry_arcs.append((entry, on_time_arc, late_arc))
+    
+    on_time_delivery = []
+    late_delivery = {weight: [] for weight in weights}
+    for k in range(num_windows):
+        if k > 0:
+            arcs.append((on_time_node + k, on_time_node + k - 1, total_units, 0))
+        on_time_delivery.append(len(arcs))
+        arcs.append((on_time_node + k, window_node + k, total_units, 0))
+        for weight in weights:
+            if k + 1 < num_windows:
+                days = (window_dates[k + 1] - window_dates[k]).days
+                arcs.append((late_node[weight] + k, late_node[weight] + k + 1, total_units, weight * days))
+            late_delivery[weight].append(len(arcs))
+            arcs.append((late_node[weight] + k, window_node + k, total_units, 0))
+        arcs.append((window_node + k, sink, window_units[k], 0))
+    
+    flow = min_cost_flow(num_nodes, arcs, source, sink) if class_keys else [0] * len(arcs)
+    
+    # Turn chain flows back into (class, window, units) allocations.
+    # On-time flow only moves to earlier windows, late flow only to later ones.
+    class_allocations = [[] for _ in class_keys]
+    entering_on_time = [[] for _ in range(num_windows)]
+    entering_late = {weight: [[] for _ in range(num_windows)] for weight in weights}
+    for c, (entry, on_time_arc, late_arc) in enumerate(entry_arcs):
+        if on_time_arc is not None and flow[on_time_arc] > 0:
+            entering_on_time[entry].append([c, flow[on_time_arc]])
+        if late_arc is not None and flow[late_arc] > 0:
+            entering_late[class_keys[c][1]][entry + 1].append([c, flow[late_arc]])
+    
+    stack = []
+    for k in reversed(range(num_windows)):
+        stack.extend(entering_on_time[k])
+        delivered = flow[on_time_delivery[k]]
+        while delivered > 0:
+            c, remaining = stack[-1]
+            used = min(delivered, remaining)
+            class_allocations[c].append((k, used))
+            delivered -= used
+            if used == remaining:
+                stack.pop()
+            else:
+                stack[-1][1] -= used
+    
+    for weight in weights:
+        queue = deque()
+        for k in range(num_windows):
+            queue.extend(entering_late[weight][k])
+            delivered = flow[late_delivery[weight][k]]
+            while delivered > 0:
+                c, remaining = queue[0]
+                used = min(delivered, remaining)
+                class_allocations[c].append((k, used))
+                delivered -= used
+                if used == remaining:
+                    queue.popleft()
+                else:
+                    queue[0][1] -= used
+    
+    # Hand each class's allocations to its tasks in priority order, earliest windows first
+    task_allocations = {idx: [] for idx in task_index}
+    remaining_capacity = list(window_units)
+    for c, key in enumerate(class_keys):
+        allocations = sorted(class_allocations[c])
+        members = deque((idx, task_units[idx]) for idx in classes[key])
+        for k, units in allocations:
+            remaining_capacity[k] -= units
+            while units > 0 and members:
+                idx, needed = members[0]
+                used = min(units, needed)
+                task_allocations[idx].append((k, used))
+                units -= used
+                if used == needed:
+                    members.popleft()
+                else:
+                    members[0] = (idx, needed - used)
+    
+    # Tasks without a due date take whatever capacity is left, earliest first
+    for idx, due_day in zip(task_index, due_days):
+        if pd.notnull(due_day):
+            continue
+        needed = task_units[idx]
+        for k in range(num_windows):
+            if needed <= 0:
+                break
+            used = min(needed, remaining_capacity[k])
+            if used > 0:
+                task_allocations[idx].append((k, used))
+                remaining_capacity[k] -= used
+                needed -= used
+    
+    for k in range(num_windows):
+        working_free_time_df.at[window_index[k], 'Available Hours'] = remaining_capacity[k] / UNITS_PER_HOUR
+    
+    for idx, task_name, estimate, due_date, due_day in zip(task_index, task_names, estimates, due_dates, due_days):
+        on_time_units = 0
+        for k, units in sorted(task_allocations[idx]):
+            late_days = max(0, (window_dates[k] - due_day).days) if pd.notnull(due_day) else 0
+            scheduled_tasks.append({
+                'Task': task_name,
+                'Date': window_dates[k],
+                'Allocated Hours': units / UNITS_PER_HOUR,
+                'Late Days': late_days
+            })
+            if late_days == 0:
+                on_time_units += units
+        
+        unallocated_units = task_units[idx] - on_time_units
+        if pd.notnull(due_date) and unallocated_units > 0:
+            allocated_hours = on_time_units / UNITS_PER_HOUR
+            warnings.append(
+                f"HANDLE: {task_name} (Due: {due_date.date()}) "
+                f"needs {estimate}h, but only {allocated_hours}h scheduled before due date."
+            )
+            unallocated_tasks.append({
+                'Task': task_name,
+                'Task Index': idx,
+                'Due Date': due_date,
+                'Total Hours': estimate,
+                'Allocated Hours': allocated_hours,
+                'Unallocated Hours': unallocated_units / UNITS_PER_HOUR
+            })
+    
+    return scheduled_tasks, warnings, unallocated_tasks
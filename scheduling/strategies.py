@@ -0,0 +1,122 @@
+import time
+import pandas as pd
+from models.task import calculate_task_priority
+from scheduling.engine import prepare_free_time, schedule_tasks, allocate_in_order
+from scheduling.optimal import schedule_tasks_optimal
+from scheduling.dependencies import get_dependency_graph, dependency_order
+from scheduling.timeblocks import schedule_time_blocks
+
+# Registered scheduling strategies by name. Every strategy takes
+# (tasks_df, working_free_time_df), uses up the free time it allocates in place
+# and returns (scheduled_tasks, warnings, unallocated_tasks) like schedule_tasks().
+STRATEGIES = {}
+
+DEFAULT_STRATEGY = "Existing (priority score)"
+
+def register_strategy(name, description):
+    """
+    Decorator that adds a scheduling function to the strategy registry.
+    
+    Args:
+        name (str): Name shown in the scheduler tab and benchmark results
+        description (str): One-line summary of the policy
+    """
+    def decorator(strategy):
+        strategy.description = description
+        STRATEGIES[name] = strategy
+        return strategy
+    return decorator
+
+def get_strategy(name):
+    """
+    Look up a registered strategy, falling back to the default for unknown names.
+    """
+    return STRATEGIES.get(name, STRATEGIES[DEFAULT_STRATEGY])
+
+register_strategy(
+    DEFAULT_STRATEGY,
+    "Priority score (importance, complexity, urgency), then complexity; the original scheduler."
+)(schedule_tasks)
+
+@register_strategy("Greedy by importance", "Most important first, earlier due dates breaking ties.")
+def schedule_by_importance(tasks_df, working_free_time_df):
+    tasks_df = calculate_task_priority(tasks_df).sort_values(
+        by=['Importance', 'Due Date'], ascending=[False, True], na_position='last', kind='stable'
+    )
+    return allocate_in_order(tasks_df, working_free_time_df)
+
+@register_strategy("Earliest deadline first", "Earliest due date first, priority score breaking ties.")
+def schedule_earliest_deadline_first(tasks_df, working_free_time_df):
+    tasks_df = calculate_task_priority(tasks_df).sort_values(
+        by=['Due Date'], na_position='last', kind='stable'
+    )
+    return allocate_in_order(tasks_df, working_free_time_df)
+
+@register_strategy("Weighted shortest job first", "Highest importance per estimated hour first.")
+def schedule_weighted_shortest_job_first(tasks_df, working_free_time_df):
+    tasks_df = calculate_task_priority(tasks_df)
+    hours = tasks_df['Estimated Time'].where(tasks_df['Estimated Time'] > 0)
+    tasks_df = tasks_df.assign(_wsjf=tasks_df['Importance'] / hours).sort_values(
+        by=['_wsjf', 'Due Date'], ascending=[False, True], na_position='last', kind='stable'
+    )
+    return allocate_in_order(tasks_df.drop(columns='_wsjf'), working_free_time_df)
+
+@register_strategy(
+    "Respect dependencies",
+    "Priority score order, but a task starts only after the tasks it depends on are done."
+)
+def schedule_with_dependencies(tasks_df, working_free_time_df):
+    tasks_df = calculate_task_priority(tasks_df)
+    order, predecessors = dependency_order(tasks_df, get_dependency_graph())
+    return allocate_in_order(tasks_df.loc[order], working_free_time_df, predecessors=predecessors)
+
+register_strategy(
+    "Time blocks",
+    "Priority score order into concrete start/end times from the free time slots."
+)(schedule_time_blocks)
+
+register_strategy(
+    "Optimal (least weighted lateness)",
+    "Min-cost flow over all tasks and windows; lateness weighted by importance."
+)(schedule_tasks_optimal)
+
+def benchmark_strategies(tasks_df, free_time_df, names=None):
+    """
+    Run every registered strategy on the same inputs and compare the outcomes.
+    
+    Args:
+        tasks_df (pandas.DataFrame): Tasks as loaded
+        free_time_df (pandas.DataFrame): Free time as loaded
+        names (list, optional): Strategies to run; all registered ones by default
+    
+    Returns:
+        pandas.DataFrame: One row per strategy with runtime, tasks meeting their
+        due date, hours missing their due date (plain and weighted by importance)
+        and fragmentation (average number of days a scheduled task is spread over)
+    """
+    has_due_date = tasks_df['Due Date'].notnull() & (tasks_df['Estimated Time'] > 0)
+    rows = []
+    for name in names or list(STRATEGIES):
+        working_free_time_df = prepare_free_time(free_time_df)
+        started = time.perf_counter()
+        scheduled_tasks, _, unallocated_tasks = STRATEGIES[name](tasks_df.copy(), working_free_time_df)
+        runtime = time.perf_counter() - started
+        
+        late_index = [task['Task Index'] for task in unallocated_tasks]
+        late_hours = pd.Series([task['Unallocated Hours'] for task in unallocated_tasks], index=late_index, dtype=float)
+        weights = tasks_df['Importance'].reindex(late_index).fillna(1).clip(lower=1)
+        
+        scheduled_df = pd.DataFrame(scheduled_tasks, columns=['Task', 'Date', 'Allocated Hours'])
+        days_per_task = scheduled_df.groupby('Task')['Date'].nunique()
+        
+        rows.append({
+            'Strategy': name,
+            'Runtime (s)': round(runtime, 3),
+            'Tasks Met': int(has_due_date.sum()) - len(set(late_index)),
+            'Tasks Late': len(set(late_index)),
+            'Late Hours': float(late_hours.sum()),
+            'Weighted Late Hours': float((late_hours * weights).sum()),
+            'Fragmentation': round(float(days_per_task.mean()), 2) if not days_per_task.empty else 0.0
+        })
+    
+    return pd.DataFrame(rows)
@@ -0,0 +1,55 @@
+from collections import defaultdict
+from models.task import iter_tasks_by_priority
+from models.free_time import load_free_time
+from scheduling.engine import prepare_free_time, iter_allocations, MAX_SESSIONS_PER_DAY
+
+def iter_schedule(task_chunks=None, free_time_df=None, chunk_size=1000, max_sessions_per_day=MAX_SESSIONS_PER_DAY):
+    """
+    Stream the priority-score schedule as it is produced.
+    
+    Tasks are read from the database in priority order a chunk at a time, so
+    only the free time and one chunk of tasks are ever held in memory. The
+    events are the same allocations, warnings and unallocated tasks
+    schedule_tasks() returns, in the same order within each kind.
+    
+    Args:
+        task_chunks (iterable, optional): DataFrames of tasks already in scheduling
+            order; defaults to all tasks in the database
+        free_time_df (pandas.DataFrame, optional): Free time; defaults to the database
+        chunk_size (int): Tasks per chunk read from the database
+        max_sessions_per_day (int): Most focus sessions of one task on the same day
+    
+    Yields:
+        ScheduleEvent: See iter_allocations()
+    """
+    if task_chunks is None:
+        task_chunks = iter_tasks_by_priority(chunk_size)
+    if free_time_df is None:
+        free_time_df = load_free_time()
+    
+    working_free_time_df = prepare_free_time(free_time_df)
+    yield from iter_allocations(task_chunks, working_free_time_df, max_sessions_per_day)
+
+def summarize_events(events):
+    """
+    Aggregate a stream of schedule events in a single pass.
+    
+    Returns:
+        dict: 'Scheduled Hours' per date, plus counts of 'Allocations',
+        'Warnings' and 'Unallocated Tasks' and the total 'Unallocated Hours'
+    """
+    scheduled_hours = defaultdict(float)
+    summary = {'Allocations': 0, 'Warnings': 0, 'Unallocated Tasks': 0, 'Unallocated Hours': 0.0}
+    
+    for event in events:
+        if event.kind == 'allocation':
+            scheduled_hours[event.record['Date']] += event.record['Allocated Hours']
+            summary['Allocations'] += 1
+        elif event.kind == 'warning':
+            summary['Warnings'] += 1
+        else:
+            summary['Unallocated Tasks'] += 1
+            summary['Unallocated Hours'] += float(event.record['Unallocated Hours'])
+    
+    summary['Scheduled Hours'] = dict(sorted(scheduled_hours.items()))
+    return summary
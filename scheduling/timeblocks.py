@@ -0,0 +1,126 @@
+import pandas as pd
+from models.task import calculate_task_priority
+from models.free_time import load_free_time_slots
+from scheduling.engine import MAX_SESSIONS_PER_DAY
+from scheduling.intervals import FreeSlots
+
+# Days without recorded slots get their free hours as one block from this hour
+DEFAULT_DAY_START_HOUR = 9
+
+# Leftover pieces of a slot shorter than this aren't worth scheduling into
+MIN_BLOCK_MINUTES = 15
+
+def build_free_slots(working_free_time_df, slots_df=None):
+    """
+    Build the free time index from the recorded slots.
+    
+    Dates that have free hours but no slots get one block starting at
+    DEFAULT_DAY_START_HOUR, so the time-block scheduler also works with free
+    time entered as hours only.
+    """
+    if slots_df is None:
+        slots_df = load_free_time_slots()
+    slots = FreeSlots(slots_df['Start'], slots_df['End'])
+    slot_dates = set(pd.to_datetime(slots_df['Start']).dt.normalize())
+    
+    for day, hours in working_free_time_df.groupby('Date')['Available Hours'].sum().items():
+        day = pd.Timestamp(day).normalize()
+        if hours > 0 and day not in slot_dates:
+            hours = min(hours, 24)
+            start = day + pd.Timedelta(hours=min(DEFAULT_DAY_START_HOUR, 24 - hours))
+            slots.insert(start, start + pd.Timedelta(hours=hours))
+    return slots
+
+def schedule_time_blocks(tasks_df, working_free_time_df, slots=None):
+    """
+    Schedule tasks into concrete time blocks, in priority order.
+    
+    Focus-session tasks get whole sessions, each the earliest block of that
+    length before the end of the due date, at most MAX_SESSIONS_PER_DAY a day.
+    Other tasks take the earliest free time before their due date, skipping
+    pieces shorter than MIN_BLOCK_MINUTES.
+    
+    Returns the same (scheduled_tasks, warnings, unallocated_tasks) as
+    schedule_tasks(); scheduled entries also have 'Start' and 'End'.
+    """
+    scheduled_tasks = []
+    warnings = []
+    unallocated_tasks = []
+    
+    tasks_df = calculate_task_priority(tasks_df)
+    if slots is None:
+        slots = build_free_slots(working_free_time_df)
+    
+    for idx, task in tasks_df.iterrows():
+        task_name = task['Task']
+        due_date = task['Due Date']
+        estimate = float(task['Estimated Time']) if pd.notnull(task['Estimated Time']) else 0.0
+        
+        if estimate > 6 and not any(tag in str(task_name) for tag in ['[MULTI-SESSION]', '[FIXED EVENT]', '[PENDING PLANNING]']):
+            warnings.append(
+                f"Task '{task_name}' exceeds 6 hours and should probably be split unless it's a Work Block."
+            )
+        
+        # Work on the due date itself still counts as on time
+        deadline = due_date.normalize() + pd.Timedelta(days=1) if pd.notnull(due_date) else None
+        remaining = int(round(estimate * 60))
+        session_length = pd.to_numeric(task.get('Session Length'), errors='coerce')
+        focus_sessions = pd.to_numeric(task.get('Focus Sessions'), errors='coerce')
+        
+        blocks = []
+        if remaining > 0 and focus_sessions > 0 and session_length > 0:
+            session_minutes = int(round(session_length * 60))
+            sessions_per_day = {}
+            earliest = None
+            while remaining > 0:
+                length = min(session_minutes, remaining)
+                start = slots.first_fit(length, deadline, earliest)
+                if start is None:
+                    break
+                day = start.normalize()
+                if sessions_per_day.get(day, 0) >= MAX_SESSIONS_PER_DAY:
+                    earliest = day + pd.Timedelta(days=1)
+                    continue
+                end = start + pd.Timedelta(minutes=length)
+                slots.remove(start, end)
+                sessions_per_day[day] = sessions_per_day.get(day, 0) + 1
+                blocks.append((start, end))
+                remaining -= length
+        elif remaining > 0:
+            blocks = slots.earliest_blocks(remaining, deadline, min_minutes=MIN_BLOCK_MINUTES)
+            for start, end in blocks:
+                slots.remove(start, end)
+                remaining -= int((end - start).total_seconds() // 60)
+        
+        for start, end in blocks:
+            hours = (end - start).total_seconds() / 3600
+            scheduled_tasks.append({
+                'Task': task_name,
+                'Date': start.normalize(),
+                'Allocated Hours': hours,
+                'Start': start,
+                'End': end
+            })
+            
+            # Keep the per-date hours in step with the blocks taken
+            same_day = working_free_time_df.index[working_free_time_df['Date'] == start.normalize()]
+            if len(same_day):
+                working_free_time_df.at[same_day[0], 'Available Hours'] -= hours
+        
+        if pd.notnull(due_date) and remaining > 0:
+            unallocated_hours = remaining / 60
+            allocated_hours = estimate - unallocated_hours
+            warnings.append(
+                f"HANDLE: {task_name} (Due: {due_date.date()}) "
+                f"needs {task['Estimated Time']}h, but only {allocated_hours}h scheduled before due date."
+            )
+            unallocated_tasks.append({
+                'Task': task_name,
+                'Task Index': idx,
+                'Due Date': due_date,
+                'Total Hours': task['Estimated Time'],
+                'Allocated Hours': allocated_hours,
+                'Unallocated Hours': unallocated_hours
+            })
+    
+    return scheduled_tasks, warnings, unallocated_tasks
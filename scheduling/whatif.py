@@ -0,0 +1,199 @@
+import atexit
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import pandas as pd
+from scheduling.engine import prepare_free_time
+from scheduling.strategies import get_strategy, DEFAULT_STRATEGY
+from utils import db_utils
+from utils.db_utils import use_database
+
+# Below this many task x window pairs, evaluating in-process beats shipping the inputs to worker processes
+PARALLEL_THRESHOLD = 20000
+
+_executor = None
+_executor_database = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """
+    Get the shared process pool, created on first use and reused across interactions.
+    
+    Workers are spawned rather than forked: forking the multithreaded app
+    server can copy locks other threads hold (SQLite, logging) and deadlock
+    the child. Spawned workers read the same database file, read-only.
+    """
+    global _executor, _executor_database
+    with _executor_lock:
+        if _executor is not None and _executor_database != db_utils.DB_FILE:
+            _executor.shutdown(wait=False)
+            _executor = None
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=min(5, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=use_database, initargs=(db_utils.DB_FILE, True)
+            )
+            _executor_database = db_utils.DB_FILE
+        return _executor
+
+@atexit.register
+def shutdown_executor():
+    """
+    Stop the shared process pool's workers, e.g. when the app exits.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def with_task_values(tasks_df, task_idx, values):
+    """
+    Return a copy of tasks_df with some values of one task replaced.
+    
+    Only the changed columns get new arrays; every other column is shared
+    with tasks_df, so a candidate costs one column copy rather than a full clone.
+    """
+    candidate = tasks_df.copy(deep=False)
+    for column, value in values.items():
+        candidate[column] = candidate[column].where(candidate.index != task_idx, value)
+    return candidate
+
+def build_candidates(tasks_df, free_time_df, selected_task):
+    """
+    Build the scheduling inputs for every resolution option, using the same
+    defaults the resolution form starts with.
+    
+    Returns:
+        list: (resolution, description, tasks_df, free_time_df) tuples
+    """
+    task_idx = selected_task['Task Index']
+    task = tasks_df.loc[task_idx]
+    total_hours = float(selected_task['Total Hours'])
+    allocated_hours = float(selected_task['Allocated Hours'])
+    unallocated_hours = float(selected_task['Unallocated Hours'])
+    due_date = selected_task['Due Date']
+    today = pd.Timestamp(datetime.today().date())
+    candidates = []
+    
+    # Reduce the estimate to what fits before the due date
+    candidates.append((
+        "Reduce task hours estimate",
+        f"Estimate {total_hours}h → {allocated_hours}h",
+        with_task_values(tasks_df, task_idx, {'Estimated Time': allocated_hours}),
+        free_time_df
+    ))
+    
+    # Spread the missing hours over every day until the due date
+    days_until_due = max(1, (due_date - today).days)
+    hours_per_day = unallocated_hours / days_until_due
+    extra_free_time = pd.DataFrame({
+        'Date': [today + pd.Timedelta(days=i) for i in range(days_until_due)],
+        'Available Hours': hours_per_day
+    })
+    candidates.append((
+        "Add more free time",
+        f"+{hours_per_day:.1f}h/day for {days_until_due} days",
+        tasks_df,
+        pd.concat([free_time_df, extra_free_time], ignore_index=True)
+    ))
+    
+    # Split into parts of at most 6 hours with the same due date.
+    # The parts keep the original id so they are compared as the same task.
+    num_parts = max(2, math.ceil(total_hours / 6))
+    parts = pd.DataFrame([
+        {**task.to_dict(), 'Task': f"{task['Task']} - Part {i + 1}", 'Estimated Time': total_hours / num_parts}
+        for i in range(num_parts)
+    ])
+    candidates.append((
+        "Break down into subtasks",
+        f"{num_parts} parts of {total_hours / num_parts:.1f}h",
+        pd.concat([tasks_df.drop(task_idx), parts], ignore_index=True),
+        free_time_df
+    ))
+    
+    # Push the due date back a week
+    new_due_date = due_date + pd.Timedelta(days=7)
+    candidates.append((
+        "Extend the due date",
+        f"Due {due_date.date()} → {new_due_date.date()}",
+        with_task_values(tasks_df, task_idx, {'Due Date': new_due_date}),
+        free_time_df
+    ))
+    
+    # Count the allocated share as already done
+    progress_percentage = int((allocated_hours / total_hours) * 100) if total_hours else 0
+    remaining_hours = total_hours * (1 - progress_percentage / 100)
+    candidates.append((
+        "Mark as partially completed",
+        f"{progress_percentage}% done, {remaining_hours:.1f}h remaining",
+        with_task_values(tasks_df, task_idx, {'Estimated Time': remaining_hours}),
+        free_time_df
+    ))
+    
+    return candidates
+
+def evaluate_schedule(tasks_df, free_time_df, strategy=DEFAULT_STRATEGY):
+    """
+    Schedule one set of inputs with a registered strategy and summarize the outcome.
+    
+    Returns:
+        dict: ids of late tasks, unallocated hours and free hours left over
+    """
+    working_free_time_df = prepare_free_time(free_time_df)
+    _, _, unallocated_tasks = get_strategy(strategy)(tasks_df.copy(deep=False), working_free_time_df)
+    return {
+        'late': {tasks_df.at[task['Task Index'], 'id'] for task in unallocated_tasks},
+        'unallocated_hours': float(sum(task['Unallocated Hours'] for task in unallocated_tasks)),
+        'free_hours_left': float(working_free_time_df['Available Hours'].fillna(0).sum())
+    }
+
+def evaluate_resolutions(tasks_df, free_time_df, selected_task, strategy=DEFAULT_STRATEGY, parallel=None):
+    """
+    Evaluate every resolution option for an under-allocated task side by side.
+    
+    The candidates are scheduled in parallel in a process pool when the inputs
+    are large enough to be worth it.
+    
+    Args:
+        tasks_df (pandas.DataFrame): Tasks as loaded
+        free_time_df (pandas.DataFrame): Free time as loaded
+        selected_task (dict): Entry from schedule_tasks()'s unallocated list
+        strategy (str, optional): Name of the scheduling strategy to compare with
+        parallel (bool, optional): Force (or prevent) using the process pool
+    
+    Returns:
+        pandas.DataFrame: One row per resolution with its impact versus doing nothing
+    """
+    candidates = build_candidates(tasks_df, free_time_df, selected_task)
+    inputs = [(tasks_df, free_time_df, strategy)] + [
+        (tasks, free_time, strategy) for _, _, tasks, free_time in candidates
+    ]
+    
+    if parallel is None:
+        parallel = len(tasks_df) * max(1, len(free_time_df)) >= PARALLEL_THRESHOLD
+    
+    if parallel:
+        executor = get_executor()
+        outcomes = list(executor.map(evaluate_schedule, *zip(*inputs)))
+    else:
+        outcomes = [evaluate_schedule(*candidate) for candidate in inputs]
+    
+    baseline = outcomes[0]
+    rows = []
+    for (resolution, description, _, _), outcome in zip(candidates, outcomes[1:]):
+        rows.append({
+            'Resolution': resolution,
+            'Change': description,
+            'Newly On Time': len(baseline['late'] - outcome['late']),
+            'Newly Late': len(outcome['late'] - baseline['late']),
+            'Unallocated Hours': outcome['unallocated_hours'],
+            'Hours Freed': baseline['unallocated_hours'] - outcome['unallocated_hours'],
+            'Free Hours Left': outcome['free_hours_left']
+        })
+    
+    return pd.DataFrame(rows)
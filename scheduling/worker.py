@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+import pandas as pd
+from models.task import load_active_tasks
+from models.free_time import load_free_time
+from scheduling.engine import prepare_free_time, create_daily_summary
+from scheduling.strategies import get_strategy, DEFAULT_STRATEGY
+from scheduling.lazy import LazySchedule, SCHEDULE_HORIZON_DAYS
+from utils.db_utils import get_write_generation
+from utils.instrumentation import instrumented, rerun_metrics, current_metrics
+
+# Everything the scheduler tab needs to render one finished run
+ScheduleResult = namedtuple('ScheduleResult', [
+    'generation',          # write generation the inputs were read at
+    'tasks_df',
+    'daily_summary',
+    'scheduled_tasks',
+    'warnings',
+    'unallocated_tasks',
+    'total_free_time',
+    'total_estimated_time',
+    'computed_at',
+    'duration',            # seconds spent scheduling
+    'error',               # exception message if the run failed, else None
+    'lazy_schedule',       # LazySchedule shared by all readers; extend a copy() of it, or None
+])
+
+@instrumented
+def compute_schedule(generation, strategy=DEFAULT_STRATEGY):
+    """
+    Load the current data and run a registered scheduling strategy on it.
+    """
+    started = time.perf_counter()
+    tasks_df = load_active_tasks()
+    free_time_df = load_free_time()
+    
+    working_free_time_df = prepare_free_time(free_time_df)
+    daily_summary = create_daily_summary(working_free_time_df)
+    total_free_time = float(working_free_time_df['Available Hours'].fillna(0).sum())
+    total_estimated_time = tasks_df['Estimated Time'].sum() if not tasks_df.empty else 0
+    
+    scheduled_tasks, warnings, unallocated_tasks = [], [], []
+    lazy_schedule = None
+    if not tasks_df.empty and strategy == DEFAULT_STRATEGY:
+        # Only commit the next few weeks; the tab extends it on request
+        lazy_schedule = LazySchedule(tasks_df, working_free_time_df)
+        lazy_schedule.extend_to(pd.Timestamp(datetime.today().date()) + pd.Timedelta(days=SCHEDULE_HORIZON_DAYS))
+        scheduled_tasks, warnings, unallocated_tasks = lazy_schedule.result()
+    elif not tasks_df.empty:
+        scheduled_tasks, warnings, unallocated_tasks = get_strategy(strategy)(tasks_df, working_free_time_df)
+    
+    return ScheduleResult(
+        generation, tasks_df, daily_summary, scheduled_tasks, warnings, unallocated_tasks,
+        total_free_time, total_estimated_time, datetime.now(), time.perf_counter() - started, None,
+        lazy_schedule
+    )
+
+class ScheduleWorker:
+    """
+    Recomputes schedules in one background thread whenever the data changes.
+    
+    The thread polls the storage layer's write generation. When it moves past
+    the generation of a strategy's latest result, that strategy is recomputed
+    only if it was requested since that result was computed, so a strategy
+    nobody looks at any more is recomputed at most once more. Readers always
+    get the latest finished result immediately, without waiting for a run.
+    
+    Each run's timings are added to the metrics of the first rerun that gets
+    its result. Runs never profile memory themselves, so they don't disturb
+    the tracemalloc peak a profiled rerun is measuring.
+    """
+    
+    def __init__(self, poll_interval=1.0):
+        self.poll_interval = poll_interval
+        self._results = {}
+        self._requested = {}   # strategy -> write generation it was last requested at
+        self._running = None
+        self._unclaimed = {}   # strategy -> RerunMetrics of the run no rerun has received yet
+        self._condition = threading.Condition()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="schedule-worker", daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while True:
+            generation = get_write_generation()
+            for strategy in self._due(generation):
+                with self._condition:
+                    self._running = strategy
+                with rerun_metrics(f"schedule worker ({strategy})", profile_memory=False) as metrics:
+                    try:
+                        result = compute_schedule(generation, strategy)
+                    except Exception as e:
+                        result = ScheduleResult(
+                            generation, None, None, [], [], [], 0, 0, datetime.now(), 0, str(e), None
+                        )
+                with self._condition:
+                    self._results[strategy] = result
+                    self._unclaimed[strategy] = metrics
+                    self._running = None
+                    self._condition.notify_all()
+            
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+    
+    def _due(self, generation):
+        # Stale strategies requested since their last result, most recently requested first
+        with self._condition:
+            due = [
+                strategy for strategy, requested_at in self._requested.items()
+                if strategy not in self._results
+                or (self._results[strategy].generation != generation
+                    and requested_at >= self._results[strategy].generation)
+            ]
+            return sorted(due, key=self._requested.get, reverse=True)
+    
+    def _request(self, strategy, generation):
+        with self._condition:
+            self._requested[strategy] = max(self._requested.get(strategy, generation), generation)
+        self._wake.set()
+    
+    def latest(self, strategy=DEFAULT_STRATEGY):
+        """
+        Get the latest finished result for a strategy and whether a fresh run is pending.
+        
+        Returns:
+            tuple: (ScheduleResult or None, is_recomputing)
+        """
+        generation = get_write_generation()
+        self._request(strategy, generation)
+        with self._condition:
+            result = self._results.get(strategy)
+            running = self._running == strategy
+        self._claim(strategy)
+        is_stale = result is None or result.generation != generation
+        return result, running or is_stale
+    
+    def wait_for_current(self, strategy=DEFAULT_STRATEGY, timeout=2.0):
+        """
+        Wait up to timeout seconds for a result of a strategy that reflects the current data.
+        
+        Returns:
+            ScheduleResult or None: The latest result, fresh or not
+        """
+        generation = get_write_generation()
+        self._request(strategy, generation)
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while strategy not in self._results or self._results[strategy].generation < generation:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            result = self._results.get(strategy)
+        self._claim(strategy)
+        return result
+    
+    def _claim(self, strategy):
+        # Record the run behind the latest result under the calling rerun, once
+        requester = current_metrics()
+        if requester is None:
+            return
+        with self._condition:
+            metrics = self._unclaimed.pop(strategy, None)
+        if metrics is not None:
+            requester.add_background(metrics)
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def get_schedule_worker():
+    """
+    Get the process-wide schedule worker, starting it on first use.
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = ScheduleWorker()
+        return _worker
@@ -0,0 +1,17 @@
+import os
+import sys
+import pytest
+
+# The app imports its packages from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import db_utils
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    Point all database access at a fresh database file for one test.
+    """
+    previous = db_utils.use_database(str(tmp_path / 'task_scheduler.db'))
+    yield db_utils.DB_FILE
+    db_utils.use_database(previous)
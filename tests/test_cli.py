@@ -0,0 +1,46 @@
+import json
+import sqlite3
+import pandas as pd
+from models.task import add_task
+from models.free_time import add_free_time
+from scheduling.cli import main
+
+def create_baseline_database(path):
+    # The schema the app had before completion dates, versions and dependencies
+    with sqlite3.connect(path) as conn:
+        conn.execute('''
+            CREATE TABLE tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, Project TEXT, Task TEXT, "Estimated Time" REAL,
+                "Due Date" TEXT, Importance INTEGER, Complexity INTEGER, "Focus Sessions" INTEGER,
+                "Session Length" REAL
+            )
+            ''')
+        conn.execute('CREATE TABLE free_time (id INTEGER PRIMARY KEY AUTOINCREMENT, Date TEXT, "Available Hours" REAL)')
+        conn.execute('''
+            CREATE TABLE backlog (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, Idea TEXT, Category TEXT, Description TEXT,
+                "Creation Date" TEXT, Status TEXT
+            )
+            ''')
+        conn.execute('INSERT INTO tasks (Task, "Estimated Time") VALUES (?, ?)', ('Write report', 2.0))
+    conn.close()
+
+def test_baseline_database_fails_without_being_changed(database, tmp_path, capsys):
+    path = str(tmp_path / 'baseline.db')
+    create_baseline_database(path)
+    with open(path, 'rb') as file:
+        before = file.read()
+    
+    assert main([path]) == 1
+    assert 'needs migration' in capsys.readouterr().err
+    with open(path, 'rb') as file:
+        assert file.read() == before
+
+def test_migrated_database_is_scheduled(database, capsys):
+    add_task({'Task': 'Write report', 'Estimated Time': 2.0, 'Due Date': pd.Timestamp.today().normalize() + pd.Timedelta(days=3)})
+    add_free_time(pd.Timestamp.today(), 4)
+    
+    assert main([database]) == 0
+    output = capsys.readouterr().out
+    assert 'Write report' in output
+    json.loads(output)
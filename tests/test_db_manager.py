@@ -0,0 +1,25 @@
+import sys
+import pytest
+
+pytest.importorskip('streamlit')
+from streamlit.testing.v1 import AppTest
+from models.task import add_task
+from utils.backup import create_backup_archive
+
+def show_page():
+    from components.db_manager import show_db_manager
+    show_db_manager()
+
+def test_page_renders_with_a_backup_to_download(database, monkeypatch):
+    # AppTest runs the page as __main__ and leaves it there; process pools would re-import it
+    monkeypatch.setitem(sys.modules, '__main__', sys.modules['__main__'])
+    add_task({'Task': 'Write report', 'Estimated Time': 2.0})
+    with create_backup_archive() as archive:
+        data = archive.read()
+    
+    app = AppTest.from_function(show_page)
+    app.session_state['db_backup'] = ('task_scheduler_backup.zip', data)
+    app.run()
+    
+    assert not app.exception
+    assert app.session_state['db_backup'][1] == data
@@ -0,0 +1,37 @@
+import threading
+import pytest
+from utils import db_utils
+
+def test_connections_wait_for_the_migration(database, monkeypatch):
+    migrate = db_utils._initialize_database
+    columns = []
+    others = []
+    
+    def slow_migration():
+        # Another session connects while this one is migrating
+        other = threading.Thread(target=lambda: columns.append(db_utils.get_table_columns(db_utils.connect(), 'tasks')))
+        other.start()
+        other.join(0.2)
+        others.append(other)
+        assert not columns
+        migrate()
+    
+    monkeypatch.setattr(db_utils, '_initialize_database', slow_migration)
+    db_utils.connect().close()
+    others[0].join()
+    
+    assert 'Completed Date' in columns[0]
+    assert database in db_utils._initialized_databases
+
+def test_failed_migration_is_retried(database, monkeypatch):
+    def failing_migration():
+        raise RuntimeError("disk full")
+    
+    monkeypatch.setattr(db_utils, '_initialize_database', failing_migration)
+    with pytest.raises(RuntimeError):
+        db_utils.connect()
+    assert database not in db_utils._initialized_databases
+    
+    monkeypatch.undo()
+    db_utils.connect().close()
+    assert database in db_utils._initialized_databases
@@ -0,0 +1,21 @@
+from models.task import add_task
+from scheduling.dependencies import get_dependency_graph, add_dependency, remove_dependency
+
+def test_graphs_handed_out_are_never_changed(database):
+    first, second, third = (add_task({'Task': name}) for name in ('Draft', 'Review', 'Publish'))
+    add_dependency(second, first)
+    graph = get_dependency_graph()
+    
+    add_dependency(third, second)
+    remove_dependency(second, first)
+    
+    assert graph.successors[first] == {second}
+    assert third not in graph.successors.get(second, set())
+    assert get_dependency_graph().successors[second] == {third}
+    assert get_dependency_graph().successors[first] == set()
+
+def test_cycles_are_refused(database):
+    first, second = add_task({'Task': 'Draft'}), add_task({'Task': 'Review'})
+    assert add_dependency(second, first)
+    assert not add_dependency(first, second)
+    assert get_dependency_graph().topological_order() == [first, second]
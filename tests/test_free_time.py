@@ -0,0 +1,52 @@
+import sqlite3
+import pandas as pd
+from models.free_time import (
+    add_free_time, subtract_free_time, delete_free_time, load_free_time, load_free_time_slots, add_free_time_slot
+)
+from scheduling.engine import prepare_free_time
+from scheduling.timeblocks import build_free_slots
+from utils.db_utils import to_sql_timestamp
+
+DAY = pd.Timestamp.today().normalize() + pd.Timedelta(days=14)
+
+def add_duplicate_rows(database, hours):
+    # Dates could be entered twice before free time was kept per date
+    add_free_time(DAY, hours[0])
+    with sqlite3.connect(database) as conn:
+        for extra in hours[1:]:
+            conn.execute('INSERT INTO free_time (Date, "Available Hours") VALUES (?, ?)', (to_sql_timestamp(DAY), extra))
+    conn.close()
+
+def add_slots():
+    add_free_time_slot(DAY + pd.Timedelta(hours=9), DAY + pd.Timedelta(hours=11))
+    add_free_time_slot(DAY + pd.Timedelta(hours=13), DAY + pd.Timedelta(hours=14))
+
+def slot_times():
+    slots = load_free_time_slots()
+    return list(zip(pd.to_datetime(slots['Start']).dt.hour, pd.to_datetime(slots['End']).dt.hour))
+
+def test_hours_are_added_once_to_a_date_with_duplicate_rows(database):
+    add_duplicate_rows(database, [2.0, 3.0])
+    add_free_time(DAY, 1.0)
+    assert load_free_time()['Available Hours'].sum() == 6.0
+
+def test_hours_are_subtracted_once_across_duplicate_rows(database):
+    add_duplicate_rows(database, [2.0, 3.0])
+    assert subtract_free_time(DAY, 3.0)
+    assert load_free_time()['Available Hours'].tolist() == [2.0]
+
+def test_subtracting_from_a_date_without_free_time_fails(database):
+    assert not subtract_free_time(DAY, 1.0)
+
+def test_subtracting_hours_trims_the_latest_slots(database):
+    add_slots()
+    assert subtract_free_time(DAY, 2.0)
+    assert slot_times() == [(9, 10)]
+
+def test_time_blocks_see_no_slots_for_a_deleted_day(database):
+    add_slots()
+    entry = load_free_time().iloc[0]
+    assert delete_free_time(entry['id'], expected_version=entry['version'])
+    
+    assert load_free_time_slots().empty
+    assert len(build_free_slots(prepare_free_time(load_free_time()))) == 0
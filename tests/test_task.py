@@ -0,0 +1,25 @@
+from models.task import (
+    add_task, load_tasks, split_task, replace_with_iterative_project, add_planning_task, update_task_fields
+)
+
+def add_loaded_task():
+    task_id = add_task({'Task': 'Write report', 'Estimated Time': 8.0})
+    return load_tasks().set_index('id').loc[task_id]
+
+def test_split_is_refused_when_the_task_changed_since_it_was_loaded(database):
+    task = add_loaded_task()
+    update_task_fields(task.name, {'Estimated Time': 10.0})
+    
+    assert split_task(task.name, [{'Task': 'Part 1'}, {'Task': 'Part 2'}], expected_version=task['version']) is None
+    assert load_tasks()['Task'].tolist() == ['Write report']
+
+def test_wizard_operations_apply_to_the_loaded_version(database):
+    task = add_loaded_task()
+    assert len(split_task(task.name, [{'Task': 'Part 1'}, {'Task': 'Part 2'}], expected_version=task['version'])) == 2
+    
+    task = load_tasks().iloc[0]
+    assert replace_with_iterative_project(task['id'], 1.0, expected_version=task['version']) is not None
+    
+    task = load_tasks().iloc[0]
+    assert add_planning_task(task['id'], {'Task': 'Plan'}, expected_version=task['version']) is not None
+    assert add_planning_task(task['id'], {'Task': 'Plan again'}, expected_version=task['version']) is None
@@ -0,0 +1,44 @@
+import io
+import sqlite3
+import pytest
+from models.task import load_tasks, update_task_fields
+from models.backlog import load_backlog
+from models.task_import import import_tasks
+from utils.journal import undo, redo, get_undo_action, JournalConflict
+
+CSV = "\n".join(
+    ["Project,Task,Estimated Time,Due Date,Importance,Complexity"]
+    + [f"P,task {i},1,2026-11-01,3,2" for i in range(200)]
+    + ["P,idea,,,2,"]
+)
+
+def journal_rows(database):
+    with sqlite3.connect(database) as conn:
+        return conn.execute("SELECT COUNT(*) FROM journal").fetchone()[0]
+
+def test_import_is_one_journal_entry_per_table(database):
+    result = import_tasks(io.StringIO(CSV))
+    
+    assert (result.tasks, result.backlog) == (200, 1)
+    assert journal_rows(database) == 2
+    assert get_undo_action().changes == {'tasks': {'inserted': 200}, 'backlog': {'inserted': 1}}
+
+def test_import_is_undone_and_redone_in_one_step(database):
+    import_tasks(io.StringIO(CSV))
+    tasks = load_tasks()
+    
+    undo()
+    assert load_tasks().empty and load_backlog().empty
+    
+    redo()
+    assert load_tasks()[['id', 'Task']].equals(tasks[['id', 'Task']])
+    assert len(load_backlog()) == 1
+
+def test_undoing_an_import_is_refused_after_its_rows_changed(database):
+    import_tasks(io.StringIO(CSV))
+    update_task_fields(int(load_tasks()['id'].iloc[5]), {'Estimated Time': 3.0})
+    undo()
+    
+    with pytest.raises(JournalConflict):
+        undo()
+    assert len(load_tasks()) == 200
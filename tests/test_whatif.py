@@ -0,0 +1,43 @@
+import pandas as pd
+import pandas.testing
+from models.task import add_task, load_active_tasks
+from models.free_time import add_free_time, load_free_time
+from scheduling.dependencies import add_dependency
+from scheduling.engine import prepare_free_time
+from scheduling.strategies import get_strategy
+from scheduling.whatif import evaluate_resolutions, evaluate_schedule, get_executor, shutdown_executor
+
+# Reads the dependencies from the database, as the workers must too
+STRATEGY = "Respect dependencies"
+
+def add_dependent_tasks():
+    # The review is due first, but can't start before the draft is done
+    today = pd.Timestamp.today().normalize()
+    draft = add_task({'Task': 'Draft', 'Estimated Time': 4.0, 'Due Date': today + pd.Timedelta(days=10), 'Importance': 1})
+    review = add_task({'Task': 'Review', 'Estimated Time': 2.0, 'Due Date': today + pd.Timedelta(days=1), 'Importance': 5})
+    add_dependency(review, draft)
+    for day in range(3):
+        add_free_time(today + pd.Timedelta(days=day), 2.0)
+    return review
+
+def test_pool_workers_schedule_with_the_same_database(database):
+    review = add_dependent_tasks()
+    tasks_df, free_time_df = load_active_tasks(), load_free_time()
+    try:
+        outcome = get_executor().submit(evaluate_schedule, tasks_df, free_time_df, STRATEGY).result()
+    finally:
+        shutdown_executor()
+    assert outcome['late'] == {review}
+    assert outcome == evaluate_schedule(tasks_df, free_time_df, STRATEGY)
+
+def test_parallel_evaluation_matches_in_process(database):
+    add_dependent_tasks()
+    tasks_df, free_time_df = load_active_tasks(), load_free_time()
+    _, _, unallocated = get_strategy(STRATEGY)(tasks_df.copy(), prepare_free_time(free_time_df))
+    
+    try:
+        parallel = evaluate_resolutions(tasks_df, free_time_df, unallocated[0], STRATEGY, parallel=True)
+    finally:
+        shutdown_executor()
+    in_process = evaluate_resolutions(tasks_df, free_time_df, unallocated[0], STRATEGY, parallel=False)
+    pandas.testing.assert_frame_equal(parallel, in_process)
@@ -0,0 +1,558 @@
+import csv
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import zipfile
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from utils import db_utils
+from utils.db_utils import (
+    INTERNAL_TABLES, CHANGE_LOGGED_TABLES, TABLE_DEFINITIONS, DATE_COLUMNS,
+    quote_identifier, transaction, parse_date_text, to_sql_timestamps, fts_sync_suspended, journal_suspended
+)
+from utils.journal import clear_journal
+
+# Database pages copied per backup step; writers can get in between steps
+BACKUP_PAGES_PER_STEP = 256
+
+# Seconds to pause between backup steps, so writers aren't starved
+BACKUP_STEP_SLEEP = 0.005
+
+# A write by another connection restarts a paged backup; after this many restarts
+# the rest is copied in one step, which in WAL mode still doesn't block writers
+MAX_BACKUP_RESTARTS = 3
+
+# Archives up to this size stay in memory; larger ones spill to a temporary file
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Rows read or written at a time when copying tables
+ROWS_PER_BATCH = 1000
+
+# CSV rows parsed, validated and inserted at a time when restoring
+RESTORE_CHUNK_ROWS = 10000
+
+# Outcome of restoring one table from CSV; rejected rows failed validation
+TableRestore = namedtuple('TableRestore', ['table_name', 'restored', 'rejected', 'ignored_columns'])
+
+# Archive entry describing a backup: its kind, database and write generation
+MANIFEST_NAME = 'manifest.json'
+
+def snapshot_database(target_path, progress=None):
+    """
+    Copy the live database to target_path with the SQLite backup API.
+    
+    The copy is made a few pages at a time, so other connections keep reading
+    and writing while it runs, and the result is a consistent snapshot. If
+    writes keep restarting it, the rest is copied in a single step.
+    
+    Args:
+        target_path (str): File to write the snapshot to
+        progress (callable, optional): Called with (remaining, total) pages after each step
+    """
+    restarts = 0
+    copied = 0
+    
+    def step(status, remaining, total):
+        nonlocal restarts, copied
+        if total - remaining < copied:
+            restarts += 1
+            if restarts > MAX_BACKUP_RESTARTS:
+                raise _BackupRestarted()
+        copied = total - remaining
+        if progress:
+            progress(remaining, total)
+    
+    source = sqlite3.connect(db_utils.DB_FILE)
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            source.backup(target, pages=BACKUP_PAGES_PER_STEP, progress=step, sleep=BACKUP_STEP_SLEEP)
+        except _BackupRestarted:
+            source.backup(target)
+            if progress:
+                progress(0, copied)
+    finally:
+        target.close()
+        source.close()
+
+class _BackupRestarted(Exception):
+    pass
+
+def write_table_csv(conn, table_name, file):
+    """
+    Write a table as CSV, reading it a batch of rows at a time.
+    """
+    cursor = conn.execute(f"SELECT * FROM {quote_identifier(table_name)}")
+    writer = csv.writer(file)
+    writer.writerow([column[0] for column in cursor.description])
+    while True:
+        rows = cursor.fetchmany(ROWS_PER_BATCH)
+        if not rows:
+            break
+        writer.writerows(rows)
+
+def create_backup_archive(progress=None):
+    """
+    Create a zip backup of the database without holding it in memory.
+    
+    The archive holds a snapshot of the database file plus a CSV copy of
+    each table for easier inspection, all taken from the same snapshot.
+    Incremental backups taken afterwards build on this one.
+    
+    Args:
+        progress (callable, optional): Called with a fraction between 0 and 1
+    
+    Returns:
+        tempfile.SpooledTemporaryFile: The zip archive, positioned at the start
+    """
+    report = progress or (lambda fraction: None)
+    descriptor, snapshot_path = tempfile.mkstemp(suffix='.db')
+    os.close(descriptor)
+    archive = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    try:
+        # The snapshot is most of the work
+        snapshot_database(snapshot_path, lambda remaining, total: report(0.8 * (1 - remaining / total) if total else 0.8))
+        
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.write(snapshot_path, arcname=os.path.basename(db_utils.DB_FILE))
+            report(0.9)
+            
+            conn = sqlite3.connect(snapshot_path)
+            try:
+                manifest = {
+                    'kind': 'full',
+                    'file': os.path.basename(db_utils.DB_FILE),
+                    'database_id': read_meta(conn, 'database_id'),
+                    'generation': read_meta(conn, 'write_generation'),
+                }
+                zip_file.writestr(MANIFEST_NAME, json.dumps(manifest))
+                for table_name in TABLE_DEFINITIONS:
+                    if table_name in INTERNAL_TABLES:
+                        continue
+                    with zip_file.open(f"{table_name}.csv", 'w') as entry:
+                        with io.TextIOWrapper(entry, encoding='utf-8', newline='') as text:
+                            write_table_csv(conn, table_name, text)
+            finally:
+                conn.close()
+    except Exception:
+        archive.close()
+        raise
+    finally:
+        os.remove(snapshot_path)
+    
+    mark_backed_up(manifest['generation'])
+    report(1.0)
+    archive.seek(0)
+    return archive
+
+def create_incremental_archive(progress=None):
+    """
+    Create a zip backup of only the rows changed since the last backup.
+    
+    Changed rows are found through the trigger-maintained change_log, so the
+    cost is proportional to the changes, not to the size of the database.
+    For each table the archive holds the current values of changed rows as
+    JSON lines and the ids of deleted rows; restore_backup_chain() applies it
+    on top of the previous backup.
+    
+    Args:
+        progress (callable, optional): Called with a fraction between 0 and 1
+    
+    Returns:
+        tempfile.SpooledTemporaryFile: The zip archive, positioned at the start
+    
+    Raises:
+        ValueError: If there is no earlier backup to build on
+    """
+    report = progress or (lambda fraction: None)
+    conn = sqlite3.connect(db_utils.DB_FILE, isolation_level=None)
+    archive = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    try:
+        # Read everything from one snapshot while writers carry on
+        conn.execute("BEGIN")
+        base_generation = read_meta(conn, 'backup_generation')
+        if base_generation is None:
+            raise ValueError("Create a full backup before an incremental one.")
+        manifest = {
+            'kind': 'incremental',
+            'database_id': read_meta(conn, 'database_id'),
+            'base_generation': base_generation,
+            'generation': read_meta(conn, 'write_generation'),
+        }
+        
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr(MANIFEST_NAME, json.dumps(manifest))
+            for position, table_name in enumerate(CHANGE_LOGGED_TABLES):
+                # A row logged in the base generation may already be in the base; resending it is harmless
+                cursor = conn.execute(
+                    f"SELECT t.* FROM change_log c JOIN {quote_identifier(table_name)} t ON t.id = c.row_id "
+                    f"WHERE c.table_name = ? AND c.generation >= ?",
+                    (table_name, base_generation)
+                )
+                columns = [column[0] for column in cursor.description]
+                with zip_file.open(f"{table_name}.jsonl", 'w') as entry:
+                    with io.TextIOWrapper(entry, encoding='utf-8') as text:
+                        while True:
+                            rows = cursor.fetchmany(ROWS_PER_BATCH)
+                            if not rows:
+                                break
+                            text.writelines(json.dumps(dict(zip(columns, row))) + '\n' for row in rows)
+                
+                deleted = conn.execute(
+                    f"SELECT c.row_id FROM change_log c WHERE c.table_name = ? AND c.generation >= ? "
+                    f"AND NOT EXISTS (SELECT 1 FROM {quote_identifier(table_name)} t WHERE t.id = c.row_id)",
+                    (table_name, base_generation)
+                ).fetchall()
+                zip_file.writestr(f"{table_name}.deleted.json", json.dumps([row[0] for row in deleted]))
+                report((position + 1) / len(CHANGE_LOGGED_TABLES))
+        conn.execute("COMMIT")
+    except Exception:
+        archive.close()
+        raise
+    finally:
+        conn.close()
+    
+    mark_backed_up(manifest['generation'])
+    archive.seek(0)
+    return archive
+
+def read_meta(conn, key):
+    row = conn.execute("SELECT value FROM db_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def mark_backed_up(generation):
+    """
+    Record that everything up to generation is in a backup and trim the change log.
+    
+    Rows changed in generation itself stay logged, since a write that
+    commits at that generation may not be in the backup yet. This is
+    bookkeeping, not a data change, so the write generation isn't bumped.
+    """
+    with sqlite3.connect(db_utils.DB_FILE) as conn:
+        conn.execute("INSERT OR REPLACE INTO db_meta (key, value) VALUES ('backup_generation', ?)", (generation,))
+        conn.execute("DELETE FROM change_log WHERE generation < ?", (generation,))
+
+def read_manifest(file):
+    """
+    Read the manifest of a backup archive, or None for archives without one.
+    """
+    with zipfile.ZipFile(file) as zip_file:
+        if MANIFEST_NAME not in zip_file.namelist():
+            return None
+        return json.loads(zip_file.read(MANIFEST_NAME))
+
+def restore_backup_chain(files, progress=None):
+    """
+    Restore the database from a full backup plus the incremental backups taken after it.
+    
+    The files can be given in any order; they are chained by their manifests.
+    The chain is applied to a temporary copy, which then replaces the live
+    database through the backup API, so a broken chain changes nothing.
+    A single archive from before manifests were added is restored the same way.
+    
+    Args:
+        files (list): Backup archives (paths or file objects)
+        progress (callable, optional): Called with a fraction between 0 and 1
+    
+    The restored database gets a new write generation, and the next
+    incremental backup needs a new full backup to build on.
+    
+    Returns:
+        int: Write generation of the restored database
+    
+    Raises:
+        ValueError: If the files don't form one unbroken chain from a full backup
+    """
+    report = progress or (lambda fraction: None)
+    manifests = []
+    for file in files:
+        manifest = read_manifest(file)
+        if manifest is None:
+            if len(files) > 1:
+                raise ValueError("A backup without a manifest can only be restored on its own.")
+            manifest = legacy_manifest(file)
+        if hasattr(file, 'seek'):
+            file.seek(0)
+        manifests.append((manifest, file))
+    
+    full = [item for item in manifests if item[0]['kind'] == 'full']
+    if len(full) != 1:
+        raise ValueError("Exactly one full backup is needed to start the chain.")
+    chain = [full[0]]
+    incrementals = {manifest['base_generation']: (manifest, file) for manifest, file in manifests if manifest['kind'] == 'incremental'}
+    while chain[-1][0]['generation'] in incrementals and len(chain) < len(manifests):
+        chain.append(incrementals.pop(chain[-1][0]['generation']))
+    if len(chain) != len(manifests):
+        raise ValueError("The incremental backups don't continue the full backup without gaps.")
+    if any(manifest['database_id'] != chain[0][0]['database_id'] for manifest, _ in chain):
+        raise ValueError("The backups come from different databases.")
+    
+    descriptor, restore_path = tempfile.mkstemp(suffix='.db')
+    os.close(descriptor)
+    try:
+        with zipfile.ZipFile(chain[0][1]) as zip_file:
+            with zip_file.open(chain[0][0]['file']) as source, open(restore_path, 'wb') as target:
+                shutil.copyfileobj(source, target)
+        
+        report(0.2)
+        
+        conn = sqlite3.connect(restore_path)
+        live = sqlite3.connect(db_utils.DB_FILE)
+        try:
+            # Never hand out a generation again, or cached results of other data would look current
+            live_generation = read_meta(live, 'write_generation') or 0
+            generation = max(live_generation, chain[-1][0]['generation']) + 1
+            with conn:
+                for position, (_, file) in enumerate(chain[1:]):
+                    apply_incremental(conn, file)
+                    report(0.2 + 0.6 * (position + 1) / len(chain))
+                # Backups from before manifests may predate these tables
+                conn.execute(TABLE_DEFINITIONS['db_meta'])
+                conn.execute(TABLE_DEFINITIONS['change_log'])
+                conn.execute("INSERT OR REPLACE INTO db_meta (key, value) VALUES ('write_generation', ?)", (generation,))
+                # Incremental backups of the restored database start from a new full backup
+                conn.execute("DELETE FROM db_meta WHERE key = 'backup_generation'")
+                conn.execute("DELETE FROM change_log")
+            conn.backup(live)
+        finally:
+            live.close()
+            conn.close()
+    finally:
+        os.remove(restore_path)
+    
+    db_utils.initialize_database()
+    # The history belongs to the data before the restore
+    clear_journal()
+    report(1.0)
+    return generation
+
+def legacy_manifest(file):
+    """
+    The manifest a full backup from before manifests were added would have had.
+    
+    Raises:
+        ValueError: If the archive doesn't hold a database file
+    """
+    name = os.path.basename(db_utils.DB_FILE)
+    with zipfile.ZipFile(file) as zip_file:
+        if name not in zip_file.namelist():
+            raise ValueError(f"The backup doesn't contain {name}.")
+    return {'kind': 'full', 'file': name, 'database_id': None, 'generation': 0}
+
+def apply_incremental(conn, file):
+    """
+    Apply one incremental backup inside an open transaction.
+    """
+    with zipfile.ZipFile(file) as zip_file:
+        names = set(zip_file.namelist())
+        for table_name in CHANGE_LOGGED_TABLES:
+            if f"{table_name}.deleted.json" in names:
+                deleted = json.loads(zip_file.read(f"{table_name}.deleted.json"))
+                conn.executemany(f"DELETE FROM {quote_identifier(table_name)} WHERE id = ?", [(row_id,) for row_id in deleted])
+            if f"{table_name}.jsonl" not in names:
+                continue
+            with zip_file.open(f"{table_name}.jsonl") as entry:
+                batch, columns = [], None
+                for line in io.TextIOWrapper(entry, encoding='utf-8'):
+                    row = json.loads(line)
+                    if columns is None:
+                        columns = list(row)
+                    batch.append([row.get(column) for column in columns])
+                    if len(batch) >= ROWS_PER_BATCH:
+                        _upsert_rows(conn, table_name, columns, batch)
+                        batch = []
+                if batch:
+                    _upsert_rows(conn, table_name, columns, batch)
+
+def _upsert_rows(conn, table_name, columns, rows):
+    column_list = ', '.join(quote_identifier(column) for column in columns)
+    placeholders = ', '.join('?' for _ in columns)
+    conn.executemany(f"INSERT OR REPLACE INTO {quote_identifier(table_name)} ({column_list}) VALUES ({placeholders})", rows)
+
+def restore_csv_archive(file, progress=None):
+    """
+    Restore tables from the CSV files in a backup archive.
+    
+    Each CSV is streamed in chunks of RESTORE_CHUNK_ROWS rows, coerced to the
+    column types of the table's schema and bulk-inserted, replacing the
+    table's rows in one transaction per table. The schema itself, with its
+    primary key, indexes and triggers, is left as it is. Rows with values
+    that don't fit their column are skipped and counted; columns the schema
+    doesn't have are ignored.
+    
+    Args:
+        file: Zip archive (path or file object) with <table>.csv entries
+        progress (callable, optional): Called with a fraction between 0 and 1
+    
+    Returns:
+        list: TableRestore for each table restored, in restore order
+    """
+    report = progress or (lambda fraction: None)
+    results = []
+    with zipfile.ZipFile(file) as zip_file:
+        # Tasks before their dependencies, whose rows go when a task is deleted
+        entries = [
+            zip_file.getinfo(f"{table_name}.csv") for table_name in CHANGE_LOGGED_TABLES
+            if f"{table_name}.csv" in zip_file.namelist()
+        ]
+        total = sum(entry.file_size for entry in entries) or 1
+        done = 0
+        for entry in entries:
+            with zip_file.open(entry) as source:
+                reader = _CountingReader(source, lambda count: report((done + count) / total))
+                results.append(restore_table_csv(os.path.splitext(entry.filename)[0], reader))
+            done += entry.file_size
+    # The history belongs to the data before the restore
+    clear_journal()
+    report(1.0)
+    return results
+
+def restore_table_csv(table_name, file):
+    """
+    Replace a table's rows with the rows of a CSV file, in one transaction.
+    
+    Returns:
+        TableRestore: How many rows were restored and rejected
+    """
+    restored = rejected = 0
+    ignored_columns = []
+    with transaction() as conn:
+        schema = conn.execute(f"PRAGMA table_info({quote_identifier(table_name)})").fetchall()
+        if not schema:
+            raise ValueError(f"Unknown table: {table_name}")
+        with fts_sync_suspended(conn, table_name), journal_suspended(conn):
+            conn.execute(f"DELETE FROM {quote_identifier(table_name)}")
+            
+            schema_columns = {column[1] for column in schema}
+            chunks = pd.read_csv(file, dtype=str, keep_default_na=False, na_values=[''], chunksize=RESTORE_CHUNK_ROWS)
+            for chunk in chunks:
+                ignored_columns = [col for col in chunk.columns if col not in schema_columns]
+                values, valid = coerce_to_schema(chunk, schema)
+                frame = pd.DataFrame(values)[valid].astype(object)
+                frame = frame.where(frame.notna(), None)
+                column_list = ', '.join(quote_identifier(col) for col in frame.columns)
+                placeholders = ', '.join('?' for _ in frame.columns)
+                rows = list(frame.itertuples(index=False, name=None))
+                conn.executemany(f"INSERT INTO {quote_identifier(table_name)} ({column_list}) VALUES ({placeholders})", rows)
+                restored += len(rows)
+                rejected += int((~valid).sum())
+    return TableRestore(table_name, restored, rejected, ignored_columns)
+
+def coerce_to_schema(chunk, schema):
+    """
+    Convert a chunk of CSV text to the column types of a table.
+    
+    Args:
+        chunk (pandas.DataFrame): CSV values as strings, NaN where empty
+        schema (list): Rows of PRAGMA table_info for the table
+    
+    Returns:
+        tuple: (dict of column -> converted values, boolean mask of the rows that are valid)
+    """
+    values = {}
+    valid = np.ones(len(chunk), dtype=bool)
+    for _, name, declared_type, not_null, default, primary_key in schema:
+        required = not_null and default is None and not primary_key
+        if name not in chunk.columns:
+            if required:
+                raise ValueError(f"Required column '{name}' is missing")
+            continue
+        
+        text = chunk[name]
+        declared_type = (declared_type or '').upper()
+        if name in DATE_COLUMNS:
+            column = to_sql_timestamps(parse_date_text(text))
+        elif 'INT' in declared_type:
+            column = pd.to_numeric(text, errors='coerce')
+            column = column.where(column == column.round()).astype('Int64').astype(object)
+        elif 'REAL' in declared_type:
+            column = pd.to_numeric(text, errors='coerce').astype(object)
+        else:
+            column = text.astype(object)
+        
+        # A value that didn't convert, or a missing required value, rejects the row
+        valid &= ~(text.notna() & column.isna()).to_numpy()
+        if required:
+            valid &= column.notna().to_numpy()
+        elif not_null and default is not None:
+            column = column.where(column.notna(), _sql_literal(default))
+        values[name] = column
+    return values, valid
+
+def _sql_literal(text):
+    # Value of a column default as PRAGMA table_info reports it
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text.strip("'")
+
+class _CountingReader:
+    # Reports how many bytes have been read from a file, for progress
+    def __init__(self, file, callback):
+        self.file = file
+        self.callback = callback
+        self.count = 0
+    
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.count += len(data)
+        self.callback(self.count)
+        return data
+    
+    def __iter__(self):
+        return iter(self.file)
+
+class BackgroundJob:
+    """
+    Runs a backup or restore function in a background thread.
+    
+    The app stays responsive while the job runs; progress and the result
+    (or the error) can be read from any thread. The function is called with
+    a progress keyword argument.
+    """
+    
+    def __init__(self, function, *args):
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self._thread = threading.Thread(target=self._run, args=(function, args), daemon=True)
+    
+    def start(self):
+        self._thread.start()
+        return self
+    
+    def done(self):
+        return not self._thread.is_alive()
+    
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.done()
+    
+    def _run(self, function, args):
+        try:
+            self.result = function(*args, progress=self._set_progress)
+        except Exception as e:
+            self.error = str(e)
+    
+    def _set_progress(self, fraction):
+        self.progress = fraction
+
+class BackupJob(BackgroundJob):
+    """
+    Creates a full or incremental backup archive in a background thread.
+    """
+    
+    def __init__(self, incremental=False):
+        super().__init__(create_incremental_archive if incremental else create_backup_archive)
+        self.incremental = incremental
+    
+    @property
+    def archive(self):
+        return self.result
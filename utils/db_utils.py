@@ -1,20 +1,28 @@
 import sqlite3
 import os
+import re
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime
 import pandas as pd
+from utils.instrumentation import instrumented, trace_connection, record_frame
 
 # Database file path
 DB_FILE = 'task_scheduler.db'
 
-def initialize_database():
-    """
-    Initialize the SQLite database with necessary tables if they don't exist.
-    """
-    # Create the database file if it doesn't exist
-    with sqlite3.connect(DB_FILE) as conn:
-        cursor = conn.cursor()
-        
-        # Create tasks table
-        cursor.execute('''
+# Set by use_database(read_only=True): connections can't write and the database isn't migrated
+READ_ONLY = False
+
+# Database files initialize_database() has finished migrating in this process
+_initialized_databases = set()
+_initialize_lock = threading.RLock()
+# The database this thread is migrating; its own connections go ahead, everyone else's wait
+_initializing = threading.local()
+
+# Declared schema for each table managed by the app
+TABLE_DEFINITIONS = {
+    'tasks': '''
         CREATE TABLE IF NOT EXISTS tasks (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             Project TEXT,
@@ -24,33 +32,539 @@ def initialize_database():
             Importance INTEGER,
             Complexity INTEGER,
             "Focus Sessions" INTEGER,
-            "Session Length" REAL
+            "Session Length" REAL,
+            "Completed Date" TEXT,
+            version INTEGER NOT NULL DEFAULT 1
         )
-        ''')
-        
-        # Create free_time table
-        cursor.execute('''
+        ''',
+    # Completed and stale tasks moved out of tasks by archive_tasks(); ids are kept
+    'tasks_archive': '''
+        CREATE TABLE IF NOT EXISTS tasks_archive (
+            id INTEGER PRIMARY KEY,
+            Project TEXT,
+            Task TEXT,
+            "Estimated Time" REAL,
+            "Due Date" TEXT,
+            Importance INTEGER,
+            Complexity INTEGER,
+            "Focus Sessions" INTEGER,
+            "Session Length" REAL,
+            "Completed Date" TEXT,
+            "Archived Date" TEXT,
+            "Archive Reason" TEXT,
+            version INTEGER NOT NULL DEFAULT 1
+        )
+        ''',
+    'free_time': '''
         CREATE TABLE IF NOT EXISTS free_time (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             Date TEXT,
-            "Available Hours" REAL
+            "Available Hours" REAL,
+            version INTEGER NOT NULL DEFAULT 1
         )
-        ''')
-        
-        # Create backlog table
-        cursor.execute('''
+        ''',
+    # Concrete free intervals within a day; their hours are also counted in free_time
+    'free_time_slots': '''
+        CREATE TABLE IF NOT EXISTS free_time_slots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            Start TEXT,
+            "End" TEXT,
+            version INTEGER NOT NULL DEFAULT 1
+        )
+        ''',
+    'backlog': '''
         CREATE TABLE IF NOT EXISTS backlog (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             Idea TEXT,
             Category TEXT,
             Description TEXT,
             "Creation Date" TEXT,
-            Status TEXT
+            Status TEXT,
+            version INTEGER NOT NULL DEFAULT 1
+        )
+        ''',
+    # Edges of the task dependency graph: task_id can't start before depends_on is done
+    'task_dependencies': '''
+        CREATE TABLE IF NOT EXISTS task_dependencies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            depends_on INTEGER NOT NULL,
+            version INTEGER NOT NULL DEFAULT 1,
+            UNIQUE (task_id, depends_on)
+        )
+        ''',
+    # Rows changed since the last backup, maintained by triggers; one entry per row
+    'change_log': '''
+        CREATE TABLE IF NOT EXISTS change_log (
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            generation INTEGER NOT NULL,
+            PRIMARY KEY (table_name, row_id)
         )
+        ''',
+    # Row-level history for undo and redo: each changed row with its images
+    # before and after, grouped into actions by write generation, and the
+    # version the row was left at (NULL if deleted) by the action, an undo or a redo.
+    # A bulk insert is one entry for rows row_id to last_row_id, its after_image
+    # a JSON array of their images (see journal_batched())
+    'journal': '''
+        CREATE TABLE IF NOT EXISTS journal (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            generation INTEGER NOT NULL,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            operation TEXT NOT NULL,
+            before_image TEXT,
+            after_image TEXT,
+            undo_sequence INTEGER,
+            version INTEGER,
+            last_row_id INTEGER
+        )
+        ''',
+    # Internal bookkeeping such as the write generation
+    'db_meta': '''
+        CREATE TABLE IF NOT EXISTS db_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        )
+        ''',
+}
+
+# Indexes backing the filters that are pushed down to SQL
+INDEX_DEFINITIONS = [
+    'CREATE INDEX IF NOT EXISTS idx_backlog_category ON backlog (Category)',
+    'CREATE INDEX IF NOT EXISTS idx_backlog_status ON backlog (Status)',
+    'CREATE INDEX IF NOT EXISTS idx_backlog_creation_date ON backlog ("Creation Date")',
+    'CREATE INDEX IF NOT EXISTS idx_task_dependencies_depends_on ON task_dependencies (depends_on)',
+    'CREATE INDEX IF NOT EXISTS idx_free_time_slots_start ON free_time_slots (Start)',
+    'CREATE INDEX IF NOT EXISTS idx_change_log_generation ON change_log (generation)',
+    'CREATE INDEX IF NOT EXISTS idx_tasks_archive_archived_date ON tasks_archive ("Archived Date")',
+    'CREATE INDEX IF NOT EXISTS idx_journal_generation ON journal (generation)',
+    'CREATE INDEX IF NOT EXISTS idx_journal_row ON journal (table_name, row_id, generation)',
+]
+
+# Bookkeeping tables: no row versions, no change logging, not part of table exports
+INTERNAL_TABLES = ('change_log', 'journal', 'db_meta')
+
+# Tables whose changed rows are recorded in change_log for incremental backups
+CHANGE_LOGGED_TABLES = [name for name in TABLE_DEFINITIONS if name not in INTERNAL_TABLES]
+
+# Triggers that keep related tables consistent however a row is deleted
+TRIGGER_DEFINITIONS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS tasks_dependencies_ad AFTER DELETE ON tasks BEGIN
+        DELETE FROM task_dependencies WHERE task_id = old.id OR depends_on = old.id;
+    END
+    ''',
+] + [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {table_name}_change_log_{event.lower()} AFTER {event} ON {table_name} BEGIN
+        INSERT INTO change_log (table_name, row_id, generation)
+        VALUES ('{table_name}', {row}.id, (SELECT value FROM db_meta WHERE key = 'write_generation'))
+        ON CONFLICT (table_name, row_id) DO UPDATE SET generation = excluded.generation;
+    END
+    '''
+    for table_name in CHANGE_LOGGED_TABLES
+    for event, row in [('INSERT', 'new'), ('UPDATE', 'new'), ('DELETE', 'old')]
+]
+
+# Columns indexed for full-text search, most important column first
+FTS_COLUMNS = {
+    'backlog': ['Idea', 'Description'],
+    'tasks': ['Task', 'Project'],
+}
+
+# Text columns that hold dates, parsed when tables are read
+DATE_COLUMNS = ["Due Date", "Date", "Creation Date", "Start", "End", "Completed Date", "Archived Date"]
+
+# Result of save_changes(); conflicts lists rows another session changed first
+SaveResult = namedtuple('SaveResult', ['inserted', 'updated', 'deleted', 'conflicts'])
+
+# Set by initialize_database() if this SQLite build ships the FTS5 extension
+FTS_ENABLED = False
+
+# Set by initialize_database() if this SQLite build has the JSON functions the journal needs
+JOURNAL_ENABLED = False
+
+# Undoable actions kept in the journal; older ones are compacted away
+JOURNAL_KEEP_ACTIONS = 50
+
+# Compact the journal after every this many transactions
+JOURNAL_COMPACT_INTERVAL = 100
+
+def connect():
+    """
+    Open a connection to the database, with its statements counted by the instrumentation.
+    
+    The database is created and migrated on the first connection to it in
+    this process, unless it was opened read-only.
+    """
+    if (not READ_ONLY and DB_FILE not in _initialized_databases
+            and getattr(_initializing, 'path', None) != DB_FILE):
+        with _initialize_lock:
+            if DB_FILE not in _initialized_databases:
+                initialize_database()
+    conn = trace_connection(sqlite3.connect(DB_FILE))
+    if READ_ONLY:
+        conn.execute("PRAGMA query_only = ON")
+    return conn
+
+def quote_identifier(name):
+    """
+    Quote a column or table name for use in a SQL statement.
+    """
+    return '"' + str(name).replace('"', '""') + '"'
+
+def get_table_columns(conn, table_name):
+    """
+    Return the column names of a table, or an empty list if it doesn't exist.
+    """
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({quote_identifier(table_name)})")]
+
+def ensure_columns(conn, table_name, columns):
+    """
+    Add any columns the table doesn't have yet (e.g. 'Fixed Event' added by the wizard).
+    """
+    existing = set(get_table_columns(conn, table_name))
+    added = False
+    for column in columns:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {quote_identifier(table_name)} ADD COLUMN {quote_identifier(column)}")
+            existing.add(column)
+            added = True
+    
+    # Row images in the journal list every column
+    if added and JOURNAL_ENABLED and table_name in CHANGE_LOGGED_TABLES:
+        create_journal_triggers(conn, table_name)
+
+def migrate_legacy_table(conn, table_name):
+    """
+    Rebuild a table whose declared schema was dropped by an older full-table save.
+
+    Earlier versions saved DataFrames with pandas' ``if_exists='replace'``, which
+    recreates the table without its primary key or indexes.
+    """
+    info = conn.execute(f"PRAGMA table_info({quote_identifier(table_name)})").fetchall()
+    if not info or any(col[1] == 'id' and col[5] for col in info):
+        return
+    
+    legacy_name = f"{table_name}_legacy"
+    columns = [col[1] for col in info]
+    column_list = ', '.join(quote_identifier(col) for col in columns)
+    
+    conn.execute(f"ALTER TABLE {table_name} RENAME TO {legacy_name}")
+    conn.execute(TABLE_DEFINITIONS[table_name])
+    ensure_columns(conn, table_name, columns)
+    conn.execute(f"INSERT INTO {table_name} ({column_list}) SELECT {column_list} FROM {legacy_name} ORDER BY rowid")
+    conn.execute(f"DROP TABLE {legacy_name}")
+
+def create_fts_index(conn, table_name):
+    """
+    Create an FTS5 index over a table, kept in sync by triggers.
+    
+    The index is an external-content table, so the text is stored only once.
+    """
+    fts_name = f"{table_name}_fts"
+    columns = FTS_COLUMNS[table_name]
+    column_list = ', '.join(quote_identifier(col) for col in columns)
+    new_values = ', '.join(f"new.{quote_identifier(col)}" for col in columns)
+    old_values = ', '.join(f"old.{quote_identifier(col)}" for col in columns)
+    
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_name,)
+    ).fetchone()
+    
+    conn.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_name} USING fts5("
+        f"{column_list}, content='{table_name}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+    )
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts_name}_insert AFTER INSERT ON {table_name} BEGIN
+            INSERT INTO {fts_name} (rowid, {column_list}) VALUES (new.id, {new_values});
+        END
+        ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts_name}_delete AFTER DELETE ON {table_name} BEGIN
+            INSERT INTO {fts_name} ({fts_name}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+        END
         ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts_name}_update AFTER UPDATE OF {column_list} ON {table_name} BEGIN
+            INSERT INTO {fts_name} ({fts_name}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {fts_name} (rowid, {column_list}) VALUES (new.id, {new_values});
+        END
+        ''')
+    
+    # Index rows that existed before the index did
+    if not exists:
+        conn.execute(f"INSERT INTO {fts_name} ({fts_name}) VALUES ('rebuild')")
+
+@contextmanager
+def fts_sync_suspended(conn, table_name):
+    """
+    Bulk-write a table inside an open transaction without updating its
+    full-text index row by row; the index is rebuilt once at the end.
+    """
+    if not FTS_ENABLED or table_name not in FTS_COLUMNS:
+        yield
+        return
+    
+    fts_name = f"{table_name}_fts"
+    for event in ('insert', 'delete', 'update'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {fts_name}_{event}")
+    yield
+    create_fts_index(conn, table_name)
+    conn.execute(f"INSERT INTO {fts_name} ({fts_name}) VALUES ('rebuild')")
+
+def create_journal_triggers(conn, table_name):
+    """
+    (Re)create the triggers that record a table's row changes in the journal.
+    
+    Row images are JSON objects of the table's current columns, so the
+    triggers are recreated whenever a column is added.
+    """
+    columns = get_table_columns(conn, table_name)
+    
+    def image(row):
+        return row_image_sql(columns, row)
+    
+    for event, row, before, after, version in [
+        ('insert', 'new', 'NULL', image('new'), 'new.version'),
+        ('update', 'new', image('old'), image('new'), 'new.version'),
+        ('delete', 'old', image('old'), 'NULL', 'NULL'),
+    ]:
+        conn.execute(f"DROP TRIGGER IF EXISTS {table_name}_journal_{event}")
+        conn.execute(f'''
+            CREATE TRIGGER {table_name}_journal_{event} AFTER {event.upper()} ON {table_name}
+            WHEN (SELECT value FROM db_meta WHERE key = 'journal_suspended') IS NOT 1 BEGIN
+                INSERT INTO journal (generation, table_name, row_id, operation, before_image, after_image, version)
+                VALUES ((SELECT value FROM db_meta WHERE key = 'write_generation'), '{table_name}', {row}.id, '{event}', {before}, {after}, {version});
+            END
+            ''')
+
+def row_image_sql(columns, row):
+    """
+    SQL expression for the JSON image of a row in the journal, e.g. of 'new' in a trigger.
+    """
+    pairs = ', '.join(f"'{col.replace(chr(39), chr(39) * 2)}', {row}.{quote_identifier(col)}" for col in columns)
+    return f"json_object({pairs})"
+
+@contextmanager
+def journal_suspended(conn):
+    """
+    Write inside an open transaction without recording the changes in the journal.
+    
+    Nested uses leave journaling suspended until the outermost one ends.
+    """
+    if conn.execute("SELECT 1 FROM db_meta WHERE key = 'journal_suspended'").fetchone():
+        yield
+        return
+    conn.execute("INSERT OR REPLACE INTO db_meta (key, value) VALUES ('journal_suspended', 1)")
+    try:
+        yield
+    finally:
+        conn.execute("DELETE FROM db_meta WHERE key = 'journal_suspended'")
+
+@contextmanager
+def journal_batched(conn, table_name):
+    """
+    Bulk-insert into a table inside an open transaction, recording the new
+    rows in the journal as one entry at the end rather than one per row.
+    
+    Only inserts may be made to the table inside the block. Undo deletes the
+    rows again; it is refused if any of them was changed since, even if that
+    change was undone.
+    """
+    if not JOURNAL_ENABLED or table_name not in CHANGE_LOGGED_TABLES:
+        yield
+        return
+    
+    table = quote_identifier(table_name)
+    first_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+    with journal_suspended(conn):
+        yield
+    
+    # Ids of one transaction's inserts are consecutive
+    image = row_image_sql(get_table_columns(conn, table_name), table)
+    conn.execute(
+        f'''
+        INSERT INTO journal (generation, table_name, row_id, last_row_id, operation, before_image, after_image, version)
+        SELECT (SELECT value FROM db_meta WHERE key = 'write_generation'), ?, MIN(id), MAX(id), 'insert', NULL,
+            json_group_array({image}), MAX(version)
+        FROM (SELECT * FROM {table} WHERE id >= ? ORDER BY id) AS {table}
+        HAVING COUNT(*) > 0
+        ''',
+        (table_name, first_id)
+    )
+
+def compact_journal(conn, keep_actions=JOURNAL_KEEP_ACTIONS):
+    """
+    Drop journal entries that can no longer be undone or redone, inside an open transaction.
+    
+    Only the newest keep_actions actions stay undoable; actions undone before
+    a newer action was made can't be redone any more.
+    """
+    conn.execute('''
+        DELETE FROM journal WHERE undo_sequence IS NOT NULL
+        AND generation < (SELECT COALESCE(MAX(generation), 0) FROM journal WHERE undo_sequence IS NULL)
+        ''')
+    conn.execute('''
+        DELETE FROM journal WHERE undo_sequence IS NULL AND generation < (
+            SELECT MIN(generation) FROM (
+                SELECT DISTINCT generation FROM journal WHERE undo_sequence IS NULL
+                ORDER BY generation DESC LIMIT ?
+            )
+        )
+        ''', (int(keep_actions),))
+
+def initialize_database():
+    """
+    Initialize the SQLite database with necessary tables if they don't exist.
+    
+    Other threads connecting meanwhile wait until the migration is done.
+    """
+    path = DB_FILE
+    with _initialize_lock:
+        _initializing.path = path
+        try:
+            _initialize_database()
+        finally:
+            _initializing.path = None
+        _initialized_databases.add(path)
+
+def _initialize_database():
+    # Create the database file if it doesn't exist
+    with connect() as conn:
+        # Let readers keep going while another session writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        
+        for table_name, definition in TABLE_DEFINITIONS.items():
+            if table_name not in INTERNAL_TABLES:
+                migrate_legacy_table(conn, table_name)
+            conn.execute(definition)
+            
+            # Row versions for optimistic concurrency control
+            if table_name not in INTERNAL_TABLES and 'version' not in get_table_columns(conn, table_name):
+                conn.execute(f"ALTER TABLE {table_name} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        
+        # Completion state, added after the tasks table was first released
+        if 'Completed Date' not in get_table_columns(conn, 'tasks'):
+            conn.execute('ALTER TABLE tasks ADD COLUMN "Completed Date" TEXT')
+        
+        conn.execute("INSERT OR IGNORE INTO db_meta (key, value) VALUES ('write_generation', 0)")
+        # Tells backups of different databases apart
+        conn.execute("INSERT OR IGNORE INTO db_meta (key, value) VALUES ('database_id', abs(random()))")
+        
+        # An upsert on a table overrides OR REPLACE in its triggers, so
+        # change log triggers written that way fail on the second change to a row
+        legacy_triggers = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND sql LIKE '%INSERT OR REPLACE INTO change_log%'"
+        ).fetchall()
+        for (trigger_name,) in legacy_triggers:
+            conn.execute(f"DROP TRIGGER {quote_identifier(trigger_name)}")
+        
+        for definition in INDEX_DEFINITIONS + TRIGGER_DEFINITIONS:
+            conn.execute(definition)
+        
+        global JOURNAL_ENABLED
+        try:
+            conn.execute("SELECT json_object('key', 1)")
+            JOURNAL_ENABLED = True
+        except sqlite3.OperationalError:
+            # SQLite was built without JSON functions; changes can't be undone
+            JOURNAL_ENABLED = False
+        if JOURNAL_ENABLED:
+            # Row versions, added to the journal after undo was first released
+            if 'version' not in get_table_columns(conn, 'journal'):
+                conn.execute("ALTER TABLE journal ADD COLUMN version INTEGER")
+                conn.execute("UPDATE journal SET version = json_extract(after_image, '$.version')")
+            # Bulk insert entries, added after undo was first released
+            if 'last_row_id' not in get_table_columns(conn, 'journal'):
+                conn.execute("ALTER TABLE journal ADD COLUMN last_row_id INTEGER")
+            for table_name in CHANGE_LOGGED_TABLES:
+                create_journal_triggers(conn, table_name)
+        
+        global FTS_ENABLED
+        try:
+            for table_name in FTS_COLUMNS:
+                create_fts_index(conn, table_name)
+            FTS_ENABLED = True
+        except sqlite3.OperationalError:
+            # SQLite was built without FTS5; search falls back to LIKE
+            FTS_ENABLED = False
         
         conn.commit()
 
+def use_database(path, read_only=False):
+    """
+    Point all database access in this process at another SQLite file.
+    
+    The file is created and migrated like the default one when it is first
+    connected to. A read-only database is used as it is: nothing is migrated
+    and connections refuse to write (e.g. for exporting schedules).
+    
+    Args:
+        path (str): Path of the SQLite database file
+        read_only (bool): Open the database without ever writing to it
+        
+    Returns:
+        str: The path that was in use before
+    """
+    global DB_FILE, READ_ONLY
+    previous, DB_FILE, READ_ONLY = DB_FILE, path, read_only
+    return previous
+
+def missing_schema(table_names=None):
+    """
+    Find the declared tables and columns the database doesn't have yet, e.g.
+    because it was last migrated by an older version and is now opened read-only.
+    
+    Args:
+        table_names (list, optional): Tables to check; all declared tables if None
+        
+    Returns:
+        list: Missing tables as 'table' and missing columns as 'table.column'
+    """
+    declared = sqlite3.connect(':memory:')
+    missing = []
+    try:
+        with connect() as conn:
+            for table_name in table_names or TABLE_DEFINITIONS:
+                declared.execute(TABLE_DEFINITIONS[table_name])
+                existing = get_table_columns(conn, table_name)
+                if not existing:
+                    missing.append(table_name)
+                    continue
+                missing.extend(
+                    f"{table_name}.{column}" for column in get_table_columns(declared, table_name)
+                    if column not in existing
+                )
+    finally:
+        declared.close()
+    return missing
+
+def bump_write_generation(conn):
+    """
+    Mark that the data changed, inside the same transaction as the change.
+    
+    Returns:
+        int: The new write generation
+    """
+    conn.execute("UPDATE db_meta SET value = value + 1 WHERE key = 'write_generation'")
+    row = conn.execute("SELECT value FROM db_meta WHERE key = 'write_generation'").fetchone()
+    return row[0] if row else 0
+
+def get_write_generation():
+    """
+    Get the write generation, a counter that increases with every committed write.
+    
+    Comparing two readings is a cheap way to tell whether anything changed.
+    """
+    with connect() as conn:
+        row = conn.execute("SELECT value FROM db_meta WHERE key = 'write_generation'").fetchone()
+    return row[0] if row else 0
+
+@instrumented
 def execute_query(query, params=None, fetch=False):
     """
     Execute a SQL query and optionally fetch results.
@@ -63,9 +577,13 @@ def execute_query(query, params=None, fetch=False):
     Returns:
         List of results if fetch=True, otherwise None
     """
-    with sqlite3.connect(DB_FILE) as conn:
+    with connect() as conn:
         cursor = conn.cursor()
         
+        # Bumped first, so the journal files this change under its own generation
+        if not fetch:
+            bump_write_generation(conn)
+        
         if params:
             cursor.execute(query, params)
         else:
@@ -77,6 +595,16 @@ def execute_query(query, params=None, fetch=False):
         conn.commit()
     return None
 
+def parse_date_columns(df):
+    """
+    Convert date strings to datetime objects where appropriate.
+    """
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_date_text(df[col])
+    return df
+
+@instrumented
 def table_to_df(table_name):
     """
     Convert a table to a pandas DataFrame.
@@ -87,17 +615,10 @@ def table_to_df(table_name):
     Returns:
         pandas.DataFrame: DataFrame containing the table data
     """
-    with sqlite3.connect(DB_FILE) as conn:
+    with connect() as conn:
         try:
             df = pd.read_sql(f"SELECT * FROM {table_name}", conn)
-            
-            # Convert date strings to datetime objects where appropriate
-            date_columns = ["Due Date", "Date", "Creation Date"]
-            for col in date_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col], errors='coerce')
-            
-            return df
+            return parse_date_columns(df)
         except pd.errors.DatabaseError:
             # Table doesn't exist or is empty
             if table_name == 'tasks':
@@ -107,6 +628,349 @@ def table_to_df(table_name):
             elif table_name == 'backlog':
                 return pd.DataFrame(columns=['Idea', 'Category', 'Description', 'Creation Date', 'Status'])
 
+@instrumented
+def query_to_df(query, params=None):
+    """
+    Run a parameterized SELECT and return the result as a DataFrame.
+    
+    Args:
+        query (str): SQL query to execute
+        params (list, optional): Parameters for the query placeholders
+        
+    Returns:
+        pandas.DataFrame: DataFrame containing the matching rows
+    """
+    with connect() as conn:
+        df = pd.read_sql(query, conn, params=params)
+    return parse_date_columns(df)
+
+def iter_query(query, params=None, chunk_size=1000, index_col=None):
+    """
+    Run a parameterized SELECT and yield the result in DataFrames of chunk_size rows.
+    
+    Only one chunk is in memory at a time, so results larger than memory can
+    be processed in a single pass.
+    
+    Args:
+        query (str): SQL query to execute
+        params (list, optional): Parameters for the query placeholders
+        chunk_size (int): Rows per DataFrame
+        index_col (str, optional): Column to use as the index
+    
+    Yields:
+        pandas.DataFrame: The next chunk of matching rows
+    """
+    conn = connect()
+    try:
+        for chunk in pd.read_sql(query, conn, params=params, chunksize=chunk_size, index_col=index_col):
+            chunk = parse_date_columns(chunk)
+            record_frame('iter_query', chunk)
+            yield chunk
+    finally:
+        conn.close()
+
+def build_fts_query(text):
+    """
+    Turn free text into an FTS5 query that matches every word as a prefix.
+    
+    Each word is quoted so punctuation typed by the user can't break the query syntax.
+    """
+    words = re.findall(r"\w+", str(text))
+    return ' '.join(f'"{word}"*' for word in words)
+
+def search_table(table_name, text, limit=20):
+    """
+    Full-text search a table, best matches first.
+    
+    Args:
+        table_name (str): Table with an FTS index ('backlog' or 'tasks')
+        text (str): Words to search for
+        limit (int, optional): Maximum number of matches to return
+        
+    Returns:
+        pandas.DataFrame: Matching rows with an extra 'Snippet' column
+    """
+    match = build_fts_query(text)
+    if not match:
+        return query_to_df(f"SELECT *, '' AS Snippet FROM {table_name} WHERE 0")
+    
+    if not FTS_ENABLED:
+        columns = FTS_COLUMNS[table_name]
+        conditions = ' OR '.join(f"{quote_identifier(col)} LIKE ?" for col in columns)
+        return query_to_df(
+            f"SELECT *, {quote_identifier(columns[0])} AS Snippet FROM {table_name} "
+            f"WHERE {conditions} ORDER BY id LIMIT ?",
+            [f"%{text}%"] * len(columns) + [limit]
+        )
+    
+    fts_name = f"{table_name}_fts"
+    # Weight the title column (Idea / Task) above the secondary one
+    return query_to_df(
+        f"SELECT t.*, snippet({fts_name}, -1, '**', '**', '…', 12) AS Snippet "
+        f"FROM {fts_name} JOIN {table_name} t ON t.id = {fts_name}.rowid "
+        f"WHERE {fts_name} MATCH ? ORDER BY bm25({fts_name}, 10.0, 1.0) LIMIT ?",
+        [match, limit]
+    )
+
+# The one text format dates are written in, so text comparisons in SQL sort correctly
+SQL_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def to_sql_timestamp(value):
+    """
+    Format a date the way every date column is stored.
+    """
+    return pd.Timestamp(value).strftime(SQL_TIMESTAMP_FORMAT)
+
+def parse_date_text(values):
+    """
+    Parse a Series of date strings, ISO formats fast and anything else one by one.
+    
+    Returns:
+        pandas.Series: Timestamps, NaT where a value isn't a date
+    """
+    parsed = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    retry = (parsed.isna() & values.notna()).to_numpy()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], errors='coerce', format='mixed')
+    return parsed
+
+def to_sql_timestamps(values):
+    """
+    Vectorized to_sql_timestamp() for a Series of Timestamps; None where missing.
+    """
+    return values.dt.strftime(SQL_TIMESTAMP_FORMAT).astype(object).where(values.notna(), None)
+
+def to_sql_dates(values):
+    """
+    Write a date column's values in the stored timestamp format, whether they
+    are Timestamps or date strings; text that isn't a date is kept as it is.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return to_sql_timestamps(values)
+    values = values.astype(object).where(values.notna(), None)
+    parsed = parse_date_text(values)
+    return to_sql_timestamps(parsed).where(parsed.notna(), values)
+
+def to_sql_value(value):
+    """
+    Convert a pandas/numpy value into something sqlite3 can bind.
+    """
+    if value is None or (not isinstance(value, (str, bytes)) and pd.isna(value)):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return to_sql_timestamp(value)
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+def to_sql_column_value(column, value):
+    """
+    to_sql_value() for a value of the given column; date strings in
+    DATE_COLUMNS are written in the stored timestamp format too.
+    """
+    if column in DATE_COLUMNS and isinstance(value, str):
+        parsed = pd.to_datetime(value, errors='coerce', format='mixed')
+        if pd.notna(parsed):
+            return to_sql_timestamp(parsed)
+    return to_sql_value(value)
+
+@contextmanager
+def transaction():
+    """
+    Open a connection whose statements commit together, or not at all.
+    
+    Usage:
+        with transaction() as conn:
+            conn.execute(...)
+            conn.execute(...)
+    """
+    conn = connect()
+    try:
+        with conn:
+            generation = bump_write_generation(conn)
+            yield conn
+        if JOURNAL_ENABLED and generation % JOURNAL_COMPACT_INTERVAL == 0:
+            with conn:
+                compact_journal(conn)
+    finally:
+        conn.close()
+
+def insert_row(conn, table_name, row):
+    """
+    Insert a single row inside an open transaction.
+    
+    Args:
+        conn (sqlite3.Connection): Connection from transaction()
+        table_name (str): Name of the table
+        row (dict): Column values; 'id' is assigned by the database if missing
+        
+    Returns:
+        int: The id of the new row
+    """
+    row = {
+        key: value for key, value in row.items()
+        if key != 'version' and (key != 'id' or to_sql_value(value) is not None)
+    }
+    ensure_columns(conn, table_name, row.keys())
+    column_list = ', '.join(quote_identifier(col) for col in row)
+    placeholders = ', '.join('?' for _ in row)
+    cursor = conn.execute(
+        f"INSERT INTO {table_name} ({column_list}) VALUES ({placeholders})",
+        [to_sql_column_value(col, value) for col, value in row.items()]
+    )
+    return cursor.lastrowid
+
+def insert_rows(conn, table_name, df):
+    """
+    Insert all rows of a DataFrame inside an open transaction with one executemany.
+    
+    Args:
+        conn (sqlite3.Connection): Connection from transaction()
+        table_name (str): Name of the table
+        df (pandas.DataFrame): Rows to insert; ids are assigned by the database
+        
+    Returns:
+        int: Number of rows inserted
+    """
+    df = df.drop(columns=[col for col in ('id', 'version') if col in df.columns])
+    if df.empty:
+        return 0
+    ensure_columns(conn, table_name, df.columns)
+    values = pd.DataFrame(index=df.index)
+    for column in df.columns:
+        if column in DATE_COLUMNS or pd.api.types.is_datetime64_any_dtype(df[column]):
+            values[column] = to_sql_dates(df[column])
+        else:
+            values[column] = df[column].astype(object).where(df[column].notna(), None)
+    column_list = ', '.join(quote_identifier(col) for col in df.columns)
+    placeholders = ', '.join('?' for _ in df.columns)
+    conn.executemany(
+        f"INSERT INTO {table_name} ({column_list}) VALUES ({placeholders})",
+        values.itertuples(index=False, name=None)
+    )
+    return len(df)
+
+def fetch_row(conn, table_name, row_id):
+    """
+    Fetch a single row by id inside an open transaction.
+    
+    Returns:
+        dict: Column values, or None if the row doesn't exist
+    """
+    cursor = conn.execute(f"SELECT * FROM {table_name} WHERE id = ?", (int(row_id),))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip([col[0] for col in cursor.description], row))
+
+def update_row(conn, table_name, row_id, values, expected_version=None):
+    """
+    Update some columns of a single row inside an open transaction.
+    
+    Every update bumps the row's version. Passing expected_version turns the
+    update into a compare-and-swap that only applies if nobody else changed
+    the row since it was read.
+    
+    Args:
+        conn (sqlite3.Connection): Connection from transaction()
+        table_name (str): Name of the table
+        row_id: id of the row to update
+        values (dict): Columns to change
+        expected_version (int, optional): Version the caller last read
+        
+    Returns:
+        bool: True if the row was updated, False if it is missing or was changed by someone else
+    """
+    values = {key: value for key, value in values.items() if key not in ('id', 'version')}
+    ensure_columns(conn, table_name, values.keys())
+    assignments = ''.join(f"{quote_identifier(col)} = ?, " for col in values)
+    params = [to_sql_column_value(col, value) for col, value in values.items()] + [int(row_id)]
+    
+    query = f"UPDATE {table_name} SET {assignments}version = version + 1 WHERE id = ?"
+    if expected_version is not None:
+        query += " AND version = ?"
+        params.append(int(expected_version))
+    
+    return conn.execute(query, params).rowcount > 0
+
+def delete_row(conn, table_name, row_id, expected_version=None):
+    """
+    Delete a single row inside an open transaction, optionally as a compare-and-swap.
+    
+    Returns:
+        bool: True if the row was deleted
+    """
+    query = f"DELETE FROM {table_name} WHERE id = ?"
+    params = [int(row_id)]
+    if expected_version is not None:
+        query += " AND version = ?"
+        params.append(int(expected_version))
+    return conn.execute(query, params).rowcount > 0
+
+def save_changes(table_name, original_df, edited_df):
+    """
+    Save only the rows that differ between a loaded table and its edited copy.
+    
+    Updates and deletes are compare-and-swap on each row's version, so a row
+    that another session changed since original_df was loaded is reported as a
+    conflict instead of being overwritten. Rows without conflicts are still saved.
+    
+    Args:
+        table_name (str): Name of the table
+        original_df (pandas.DataFrame): Rows as loaded, including 'id' and 'version'
+        edited_df (pandas.DataFrame): Rows after editing; new rows have no id
+        
+    Returns:
+        SaveResult: Counts of inserted/updated/deleted rows and a list of conflicts.
+        Each conflict is a dict with the row 'id', its 'current' values (None if
+        the row was deleted) and the 'edited' values that weren't saved.
+    """
+    original_rows = {
+        int(row['id']): row for row in original_df.to_dict('records') if pd.notnull(row.get('id'))
+    }
+    inserted = updated = deleted = 0
+    conflicts = []
+    
+    with transaction() as conn:
+        edited_ids = set()
+        for row in edited_df.to_dict('records'):
+            if pd.isnull(row.get('id')):
+                insert_row(conn, table_name, row)
+                inserted += 1
+                continue
+            
+            row_id = int(row['id'])
+            edited_ids.add(row_id)
+            original = original_rows.get(row_id)
+            if original is None:
+                continue
+            
+            changes = {
+                key: value for key, value in row.items()
+                if key not in ('id', 'version')
+                and to_sql_column_value(key, value) != to_sql_column_value(key, original.get(key))
+            }
+            if not changes:
+                continue
+            
+            if update_row(conn, table_name, row_id, changes, expected_version=original['version']):
+                updated += 1
+            else:
+                conflicts.append({'id': row_id, 'current': fetch_row(conn, table_name, row_id), 'edited': row})
+        
+        for row_id, original in original_rows.items():
+            if row_id in edited_ids:
+                continue
+            if delete_row(conn, table_name, row_id, expected_version=original['version']):
+                deleted += 1
+            else:
+                current = fetch_row(conn, table_name, row_id)
+                if current is not None:
+                    conflicts.append({'id': row_id, 'current': current, 'edited': None})
+    
+    return SaveResult(inserted, updated, deleted, conflicts)
+
+@instrumented
 def df_to_table(df, table_name, if_exists='replace'):
     """
     Save a DataFrame to a table.
@@ -119,9 +983,58 @@ def df_to_table(df, table_name, if_exists='replace'):
     Returns:
         bool: True if successful
     """
-    with sqlite3.connect(DB_FILE) as conn:
+    if if_exists == 'replace' and table_name in TABLE_DEFINITIONS:
+        with transaction() as conn:
+            sync_table(conn, table_name, df)
+        return True
+    
+    df = df.copy()
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = to_sql_dates(df[col])
+    # Bumped first by transaction(), so the journal files the rows under this write
+    with transaction() as conn:
         df.to_sql(table_name, conn, if_exists=if_exists, index=False)
     return True
 
-# Initialize the database when the module is imported
-initialize_database()
+def sync_table(conn, table_name, df):
+    """
+    Make a table's rows match a DataFrame while touching only the rows that differ.
+    
+    Rows are upserted by id (unchanged rows are left alone, changed rows get a
+    new version) and rows whose id is missing from the DataFrame are deleted.
+    The declared schema, primary key and indexes are kept.
+    """
+    columns = [col for col in df.columns if col not in ('id', 'version')]
+    ensure_columns(conn, table_name, columns)
+    
+    column_list = ', '.join(quote_identifier(col) for col in columns)
+    placeholders = ', '.join('?' for _ in columns)
+    assignments = ''.join(f"{quote_identifier(col)} = excluded.{quote_identifier(col)}, " for col in columns)
+    changed = ' OR '.join(
+        f"{quote_identifier(col)} IS NOT excluded.{quote_identifier(col)}" for col in columns
+    ) or '0'
+    
+    ids = df['id'].tolist() if 'id' in df.columns else [None] * len(df)
+    records = [
+        [to_sql_column_value(col, value) for col, value in zip(columns, values)]
+        for values in df[columns].itertuples(index=False, name=None)
+    ]
+    new_rows = [values for row_id, values in zip(ids, records) if pd.isnull(row_id)]
+    existing_rows = [[int(row_id)] + values for row_id, values in zip(ids, records) if pd.notnull(row_id)]
+    
+    # Drop rows that are no longer in the DataFrame
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_ids (id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM keep_ids")
+    conn.executemany("INSERT OR IGNORE INTO keep_ids (id) VALUES (?)", [(row[0],) for row in existing_rows])
+    conn.execute(f"DELETE FROM {table_name} WHERE id NOT IN (SELECT id FROM keep_ids)")
+    
+    if existing_rows:
+        conn.executemany(
+            f"INSERT INTO {table_name} (id, {column_list}) VALUES (?, {placeholders}) "
+            f"ON CONFLICT(id) DO UPDATE SET {assignments}version = version + 1 WHERE {changed}",
+            existing_rows
+        )
+    if new_rows:
+        conn.executemany(f"INSERT INTO {table_name} ({column_list}) VALUES ({placeholders})", new_rows)
+
@@ -0,0 +1,308 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+import pandas as pd
+
+# Show the developer panel with per-rerun timings (set TASK_SCHEDULER_DEV=1)
+DEV_PANEL_ENABLED = os.environ.get('TASK_SCHEDULER_DEV') == '1'
+
+# Also trace memory per call and size the DataFrames the storage layer hands out
+# (set TASK_SCHEDULER_PROFILE_MEMORY=1); this slows every rerun down noticeably
+MEMORY_PROFILING_ENABLED = os.environ.get('TASK_SCHEDULER_PROFILE_MEMORY') == '1'
+
+# Allocation sites listed per profiled rerun, by memory still held at its end
+TOP_ALLOCATIONS = 10
+
+# Stack frames kept per allocation, enough to get from pandas back to the line in this app
+TRACEMALLOC_FRAMES = 25
+
+# Allocations are attributed to the innermost line under this directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Completed reruns kept for the developer panel
+RERUN_HISTORY = 20
+
+# One structured line per rerun is logged here at INFO level
+logger = logging.getLogger('task_scheduler.instrumentation')
+
+# Recorder of the rerun running in this context, if any
+_current_rerun = ContextVar('current_rerun', default=None)
+
+# tracemalloc's peak is process-wide, so memory-profiled reruns take turns
+_memory_profiling_lock = threading.RLock()
+
+class RerunMetrics:
+    """
+    Wall time, row counts and SQL statement counts of one rerun, per instrumented call.
+    
+    With profile_memory, each call also gets the most memory it had allocated
+    at once ('peak_bytes'), what it still held when it returned
+    ('retained_bytes') and the deep size of the DataFrames it returned
+    ('frame_bytes'); memory then holds the same for the whole rerun.
+    """
+    
+    def __init__(self, label, profile_memory=False):
+        self.label = label
+        self.started = time.time()
+        self.wall_ms = 0.0
+        self.statements = 0
+        self.spans = {}
+        self.profile_memory = profile_memory
+        self.frames = []
+        self.memory = None
+        self._stack = []
+        self._memory_stack = []
+    
+    def enter(self, name):
+        self._stack.append(name)
+        span = self.spans.setdefault(name, {'calls': 0, 'wall_ms': 0.0, 'rows': 0, 'statements': 0})
+        span['calls'] += 1
+        if self.profile_memory:
+            for key in ('peak_bytes', 'retained_bytes', 'frame_bytes'):
+                span.setdefault(key, 0)
+            self._memory_stack.append(_MemoryMark())
+    
+    def exit(self, name, wall_ms, rows):
+        self._stack.pop()
+        span = self.spans[name]
+        span['wall_ms'] += wall_ms
+        span['rows'] += rows
+        if self.profile_memory:
+            parent = self._memory_stack[-2] if len(self._memory_stack) > 1 else None
+            peak, retained = self._memory_stack.pop().measure(parent)
+            span['peak_bytes'] = max(span['peak_bytes'], peak)
+            span['retained_bytes'] += retained
+    
+    def record_frame(self, name, df):
+        """
+        Add the deep memory usage of a DataFrame handed out by a call.
+        """
+        size = int(df.memory_usage(deep=True).sum())
+        self.frames.append({'call': name, 'rows': len(df), 'bytes': size})
+        if name in self.spans:
+            self.spans[name]['frame_bytes'] += size
+    
+    def count_statement(self, statement):
+        # Statements run by triggers are reported as comments; they belong to the statement that fired them
+        if statement.startswith('--'):
+            return
+        self.statements += 1
+        # Counted for every open span, so a span includes the calls nested in it
+        for name in set(self._stack):
+            self.spans[name]['statements'] += 1
+    
+    def add_background(self, other):
+        """
+        Add the calls another recorder made in a background thread on behalf of
+        this rerun (e.g. the schedule worker's run), under its label.
+        """
+        self.statements += other.statements
+        runs = {other.label: {'calls': 1, 'wall_ms': other.wall_ms, 'rows': 0, 'statements': other.statements}}
+        runs.update((f"{other.label} > {name}", span) for name, span in other.spans.items())
+        for name, span in runs.items():
+            merged = self.spans.setdefault(name, {'calls': 0, 'wall_ms': 0.0, 'rows': 0, 'statements': 0})
+            if self.profile_memory:
+                for key in ('peak_bytes', 'retained_bytes', 'frame_bytes'):
+                    merged.setdefault(key, 0)
+            for key, value in span.items():
+                merged[key] = max(merged.get(key, 0), value) if key == 'peak_bytes' else merged.get(key, 0) + value
+    
+    def to_dict(self):
+        return {
+            'label': self.label,
+            'started': self.started,
+            'wall_ms': round(self.wall_ms, 2),
+            'statements': self.statements,
+            'memory': self.memory,
+            'spans': {
+                name: dict(span, wall_ms=round(span['wall_ms'], 2)) for name, span in self.spans.items()
+            },
+        }
+    
+    def to_frame(self):
+        """
+        The spans as a DataFrame, slowest first.
+        """
+        columns = ['calls', 'wall_ms', 'rows', 'statements']
+        if self.profile_memory:
+            columns += ['peak_bytes', 'retained_bytes', 'frame_bytes']
+        frame = pd.DataFrame.from_dict(self.spans, orient='index', columns=columns)
+        frame.index.name = 'call'
+        return frame.sort_values('wall_ms', ascending=False).reset_index()
+
+class _MemoryMark:
+    """
+    Traced memory when a call started; tracemalloc's peak is reset for the
+    call, so the peak before it is kept here for the caller.
+    """
+    
+    def __init__(self):
+        self.current, self.peak_before = tracemalloc.get_traced_memory()
+        self.child_peak = 0
+        tracemalloc.reset_peak()
+    
+    def measure(self, parent):
+        """
+        Returns:
+            tuple: (peak bytes above the start, bytes still held)
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, self.child_peak)
+        if parent is not None:
+            parent.child_peak = max(parent.child_peak, self.peak_before, peak)
+        return max(peak - self.current, 0), current - self.current
+
+@contextmanager
+def rerun_metrics(label='rerun', profile_memory=MEMORY_PROFILING_ENABLED):
+    """
+    Record the instrumented calls made until the block ends, then log them.
+    
+    With profile_memory, tracemalloc is started if it isn't tracing yet and
+    snapshots taken before and after the block find the lines of this app
+    that allocated the memory still held at the end. tracemalloc measures
+    the whole process, so profiled reruns wait for each other; background
+    threads working meanwhile (like the schedule worker) are counted in.
+    
+    Usage:
+        with rerun_metrics('app') as metrics:
+            ...
+    """
+    metrics = RerunMetrics(label, profile_memory)
+    if profile_memory:
+        _memory_profiling_lock.acquire()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        start_snapshot = tracemalloc.take_snapshot()
+        mark = _MemoryMark()
+    token = _current_rerun.set(metrics)
+    started = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.wall_ms = (time.perf_counter() - started) * 1000
+        _current_rerun.reset(token)
+        if profile_memory:
+            try:
+                peak, retained = mark.measure(None)
+                metrics.memory = {
+                    'peak_bytes': peak,
+                    'retained_bytes': retained,
+                    'frame_bytes': sum(frame['bytes'] for frame in metrics.frames),
+                    'top_allocations': _top_allocations(start_snapshot, tracemalloc.take_snapshot()),
+                }
+            finally:
+                _memory_profiling_lock.release()
+        logger.info(json.dumps(metrics.to_dict(), sort_keys=True))
+
+def current_metrics():
+    """
+    The RerunMetrics being recorded in this context, or None.
+    """
+    return _current_rerun.get()
+
+def instrumented(function=None, name=None):
+    """
+    Decorator recording wall time, rows and SQL statements of each call in the current rerun.
+    
+    Rows are the length of the DataFrame or list the function returns, or of
+    its first DataFrame argument (e.g. for df_to_table()). Outside of a rerun
+    the function runs as it is.
+    """
+    if function is None:
+        return lambda function: instrumented(function, name)
+    span_name = name or function.__qualname__
+    
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        metrics = _current_rerun.get()
+        if metrics is None:
+            return function(*args, **kwargs)
+        
+        metrics.enter(span_name)
+        started = time.perf_counter()
+        result = None
+        try:
+            result = function(*args, **kwargs)
+            return result
+        finally:
+            wall_ms = (time.perf_counter() - started) * 1000
+            metrics.exit(span_name, wall_ms, _count_rows(result, args))
+            if metrics.profile_memory and isinstance(result, pd.DataFrame):
+                metrics.record_frame(span_name, result)
+    return wrapper
+
+def record_frame(name, df):
+    """
+    Size a DataFrame handed out outside of an instrumented call (e.g. a
+    chunk from a generator) if memory is being profiled.
+    """
+    metrics = _current_rerun.get()
+    if metrics is not None and metrics.profile_memory:
+        metrics.record_frame(name, df)
+
+def dataframe_bytes(value, depth=3):
+    """
+    Deep memory usage of the distinct DataFrames in a value, looking into
+    dicts, lists, tuples and namedtuples, e.g. to size st.session_state.
+    
+    Returns:
+        int: Total bytes
+    """
+    frames = {}
+    
+    def collect(value, depth):
+        if isinstance(value, pd.DataFrame):
+            frames[id(value)] = value
+        elif depth > 0 and isinstance(value, dict):
+            for item in value.values():
+                collect(item, depth - 1)
+        elif depth > 0 and isinstance(value, (list, tuple)):
+            for item in value:
+                collect(item, depth - 1)
+    
+    collect(value, depth)
+    return int(sum(frame.memory_usage(deep=True).sum() for frame in frames.values()))
+
+def trace_connection(conn):
+    """
+    Count the statements a connection runs in the current rerun, if there is one.
+    """
+    metrics = _current_rerun.get()
+    if metrics is not None:
+        conn.set_trace_callback(metrics.count_statement)
+    return conn
+
+def _top_allocations(before, after):
+    """
+    Lines of this app holding the most memory allocated between two snapshots,
+    counting what they allocated through pandas and other libraries.
+    """
+    by_line = {}
+    for change in after.compare_to(before, 'traceback'):
+        if change.size_diff <= 0:
+            continue
+        # Tracebacks are ordered most recent call first
+        frame = next(
+            (frame for frame in change.traceback if frame.filename.startswith(PROJECT_ROOT)),
+            change.traceback[0]
+        )
+        line = f"{os.path.relpath(frame.filename, PROJECT_ROOT)}:{frame.lineno}"
+        by_line[line] = by_line.get(line, 0) + change.size_diff
+    top = sorted(by_line.items(), key=lambda item: item[1], reverse=True)[:TOP_ALLOCATIONS]
+    return [{'line': line, 'bytes': size} for line, size in top]
+
+def _count_rows(result, args):
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    if isinstance(result, (pd.DataFrame, list)):
+        return len(result)
+    for arg in args:
+        if isinstance(arg, pd.DataFrame):
+            return len(arg)
+    return 0
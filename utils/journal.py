@@ -0,0 +1,261 @@
+import json
+from collections import namedtuple
+from utils import db_utils
+from utils.db_utils import transaction, quote_identifier, get_table_columns, journal_suspended
+
+# One undoable action: everything written under one write generation
+# changes maps each table to counts of rows 'inserted', 'updated' and 'deleted'
+JournalAction = namedtuple('JournalAction', ['generation', 'changes'])
+
+# How each journal operation is counted in JournalAction.changes
+OPERATION_COUNTS = {'insert': 'inserted', 'update': 'updated', 'delete': 'deleted'}
+
+# Rows looked up per statement when checking versions
+VERSION_CHECK_CHUNK = 500
+
+class JournalConflict(Exception):
+    """
+    Raised by undo() and redo() when rows of the action were changed since, e.g. by
+    another session; nothing is written.
+    
+    Attributes:
+        action (JournalAction): The action that couldn't be undone or redone
+        rows (list): (table_name, row_id) of the rows that were changed
+    """
+    
+    def __init__(self, action, rows):
+        super().__init__(f"{len(rows)} row(s) changed since generation {action.generation}")
+        self.action = action
+        self.rows = rows
+
+def get_undo_action(conn=None):
+    """
+    The action undo() would revert, or None if there is nothing to undo.
+    """
+    return _with_connection(conn, lambda conn: _describe(conn, _undo_generation(conn)))
+
+def get_redo_action(conn=None):
+    """
+    The action redo() would apply again, or None if there is nothing to redo.
+    """
+    return _with_connection(conn, lambda conn: _describe(conn, _redo_generation(conn)))
+
+def undo():
+    """
+    Revert the most recent action that hasn't been undone, in one transaction.
+    
+    Each row the action touched is put back to its image from before the
+    action: rows it inserted are deleted, rows it deleted are inserted again
+    with their ids, and rows it updated get their old values and a new version.
+    Undo and redo themselves aren't recorded as actions.
+    
+    Returns:
+        JournalAction: The action that was undone, or None if there was none
+        
+    Raises:
+        JournalConflict: If a row was changed after the action; nothing is undone
+    """
+    with transaction() as conn:
+        action = _describe(conn, _undo_generation(conn))
+        if action is None:
+            return None
+        _restore_images(conn, action, undoing=True)
+        sequence = conn.execute("SELECT COALESCE(MAX(undo_sequence), 0) + 1 FROM journal").fetchone()[0]
+        conn.execute("UPDATE journal SET undo_sequence = ? WHERE generation = ?", (sequence, action.generation))
+    return action
+
+def redo():
+    """
+    Apply the most recently undone action again, in one transaction.
+    
+    Actions undone before another change was made can't be redone.
+    
+    Returns:
+        JournalAction: The action that was redone, or None if there was none
+        
+    Raises:
+        JournalConflict: If a row was changed after the undo; nothing is redone
+    """
+    with transaction() as conn:
+        action = _describe(conn, _redo_generation(conn))
+        if action is None:
+            return None
+        _restore_images(conn, action, undoing=False)
+        conn.execute("UPDATE journal SET undo_sequence = NULL WHERE generation = ?", (action.generation,))
+    return action
+
+def clear_journal():
+    """
+    Forget all undo and redo history, e.g. after the data was replaced by a restore.
+    """
+    with transaction() as conn:
+        conn.execute("DELETE FROM journal")
+
+def _with_connection(conn, function):
+    # Reading doesn't need a transaction, which would count as a write
+    if conn is not None:
+        return function(conn)
+    with db_utils.connect() as conn:
+        return function(conn)
+
+def _undo_generation(conn):
+    row = conn.execute("SELECT MAX(generation) FROM journal WHERE undo_sequence IS NULL").fetchone()
+    return row[0]
+
+def _redo_generation(conn):
+    # The last action undone, unless something was done after it
+    row = conn.execute(
+        '''
+        SELECT generation FROM journal
+        WHERE undo_sequence IS NOT NULL
+        AND generation > (SELECT COALESCE(MAX(generation), 0) FROM journal WHERE undo_sequence IS NULL)
+        ORDER BY undo_sequence DESC LIMIT 1
+        '''
+    ).fetchone()
+    return row[0] if row else None
+
+def _describe(conn, generation):
+    if generation is None:
+        return None
+    changes = {}
+    for table_name, operation, count in conn.execute(
+        """
+        SELECT table_name, operation, SUM(COALESCE(last_row_id - row_id + 1, 1))
+        FROM journal WHERE generation = ? GROUP BY table_name, operation
+        """,
+        (generation,)
+    ):
+        changes.setdefault(table_name, {})[OPERATION_COUNTS[operation]] = count
+    return JournalAction(generation, changes)
+
+def _restore_images(conn, action, undoing):
+    """
+    Put each row of an action back to its image from before the action
+    (undoing) or after it (redoing), inside the open transaction.
+    
+    Every row must still have the version the action, or the undo or redo
+    before this one, left it at; otherwise JournalConflict is raised before
+    anything is written. Rows are deleted if the image is empty, updated if
+    they exist and inserted otherwise.
+    
+    The versions the rows are left at are recorded for this action and for
+    the actions that undo or redo would reach next, so those check against them.
+    Bulk insert entries keep one version for all their rows, so they aren't
+    updated for the actions next to them.
+    """
+    # Per row: the image to restore, and the latest entry with the version the row should have
+    targets = {}
+    for entry_id, table_name, row_id, last_row_id, before_image, after_image, version in conn.execute(
+        """
+        SELECT id, table_name, row_id, last_row_id, before_image, after_image, version
+        FROM journal WHERE generation = ? ORDER BY id
+        """,
+        (action.generation,)
+    ):
+        if last_row_id is None:
+            images = [(row_id, _load_image(before_image), _load_image(after_image))]
+        else:
+            # A bulk insert, with the images of all its rows
+            images = [(image['id'], None, image) for image in json.loads(after_image)]
+        for row_id, before, after in images:
+            key = (table_name, row_id)
+            if key not in targets:
+                targets[key] = [before if undoing else None, None, None]
+            if not undoing:
+                targets[key][0] = after
+            targets[key][1:] = [entry_id, version]
+    
+    conflicts = [
+        key for key, current in _current_versions(conn, targets).items()
+        if current != targets[key][2]
+    ]
+    if conflicts:
+        raise JournalConflict(action, conflicts)
+    
+    new_versions = []
+    with journal_suspended(conn):
+        # Deletes first, so rows they take with them (like a task's
+        # dependencies) are put back by the inserts after them
+        for (table_name, row_id), (image, entry_id, version) in targets.items():
+            if image is None:
+                conn.execute(f"DELETE FROM {quote_identifier(table_name)} WHERE id = ?", (row_id,))
+                new_versions.append((None, entry_id, table_name, row_id))
+        
+        columns_by_table = {}
+        for (table_name, row_id), (image, entry_id, version) in targets.items():
+            if image is None:
+                continue
+            if table_name not in columns_by_table:
+                columns_by_table[table_name] = set(get_table_columns(conn, table_name))
+            values = {
+                column: value for column, value in image.items()
+                if column in columns_by_table[table_name] and column not in ('id', 'version')
+            }
+            # Versions only ever increase, even for rows that are inserted again
+            new_version = (version if version is not None else image.get('version') or 0) + 1
+            table = quote_identifier(table_name)
+            cursor = None
+            if version is not None:
+                assignments = ''.join(f"{quote_identifier(column)} = ?, " for column in values)
+                cursor = conn.execute(
+                    f"UPDATE {table} SET {assignments}version = ? WHERE id = ? AND version = ?",
+                    list(values.values()) + [new_version, row_id, version]
+                )
+            # Also taken for rows that a delete above took with it
+            if cursor is None or cursor.rowcount == 0:
+                column_list = ', '.join([quote_identifier(column) for column in values] + ['id', 'version'])
+                placeholders = ', '.join('?' for _ in range(len(values) + 2))
+                conn.execute(
+                    f"INSERT INTO {table} ({column_list}) VALUES ({placeholders})",
+                    list(values.values()) + [row_id, new_version]
+                )
+            new_versions.append((new_version, entry_id, table_name, row_id))
+    
+    conn.executemany(
+        "UPDATE journal SET version = ? WHERE id = ?",
+        {(new_version, entry_id) for new_version, entry_id, _, _ in new_versions}
+    )
+    neighbours = [(new_version, table_name, row_id, action.generation) for new_version, _, table_name, row_id in new_versions]
+    if undoing:
+        # The row is back in the state the previous action on it left it in
+        conn.executemany(
+            '''
+            UPDATE journal SET version = ? WHERE id = (
+                SELECT MAX(id) FROM journal WHERE table_name = ? AND row_id = ? AND generation < ?
+                AND undo_sequence IS NULL AND last_row_id IS NULL
+            )
+            ''',
+            neighbours
+        )
+    else:
+        # Actions undone after this one start from the state it left the row in
+        conn.executemany(
+            """
+            UPDATE journal SET version = ? WHERE table_name = ? AND row_id = ? AND generation > ?
+            AND undo_sequence IS NOT NULL AND last_row_id IS NULL
+            """,
+            neighbours
+        )
+
+def _load_image(image):
+    return json.loads(image) if image is not None else None
+
+def _current_versions(conn, targets):
+    """
+    Versions the target rows have now, None for rows that don't exist.
+    """
+    row_ids_by_table = {}
+    for table_name, row_id in targets:
+        row_ids_by_table.setdefault(table_name, []).append(row_id)
+    
+    versions = {}
+    for table_name, row_ids in row_ids_by_table.items():
+        for start in range(0, len(row_ids), VERSION_CHECK_CHUNK):
+            chunk = row_ids[start:start + VERSION_CHECK_CHUNK]
+            placeholders = ', '.join('?' for _ in chunk)
+            found = dict(conn.execute(
+                f"SELECT id, version FROM {quote_identifier(table_name)} WHERE id IN ({placeholders})", chunk
+            ))
+            for row_id in chunk:
+                versions[(table_name, row_id)] = found.get(row_id)
+    return versions
@@ -21,8 +21,8 @@ def initialize_session_state():
     # Initialize backlog conversion state
     if 'converting_item' not in st.session_state:
         st.session_state.converting_item = None
-    if 'converting_idx' not in st.session_state:
-        st.session_state.converting_idx = None
+    if 'converting_id' not in st.session_state:
+        st.session_state.converting_id = None
     
     # Initialize task resolution state
     if 'resolving_task' not in st.session_state:
@@ -57,7 +57,7 @@ def clear_conversion_state():
     Clear state related to backlog item conversion.
     """
     st.session_state.converting_item = None
-    st.session_state.converting_idx = None
+    st.session_state.converting_id = None
 
 def clear_resolution_state():
     """